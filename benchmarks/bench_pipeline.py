@@ -0,0 +1,444 @@
+"""
+Seraphine detection pipeline benchmark
+Times every stage of the screenshot pipeline (decode, YOLO, OCR, BBoxMerger, Seraphine
+grouping, group image generation and - optionally - Gemini against the local fake server)
+over a fixed corpus, and writes p50/p95 per stage, peak RSS and images/sec as JSON so
+runs can be compared across commits.
+
+Run from the project root:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --iterations 5 --synthetic 4 --gemini
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/<old>.json
+"""
+import os
+import sys
+import json
+import glob
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+import tempfile
+import contextlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable
+
+import cv2
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "utils"))
+
+from seraphine_pipeline.helpers import load_configuration
+from seraphine_pipeline.yolo_detector import YOLODetector, YOLOConfig
+from seraphine_pipeline.ocr_detector import OCRDetector, OCRDetConfig
+from seraphine_pipeline.bbox_merger import BBoxMerger
+from seraphine_pipeline.seraphine_processor import FinalSeraphineProcessor
+from seraphine_pipeline.seraphine_generator import FinalGroupImageGenerator
+
+STAGES = ('decode', 'yolo', 'ocr', 'merge', 'grouping', 'group_images', 'gemini', 'total')
+
+# Synthetic dense UI layouts: (name, width, height, rows, columns)
+SYNTHETIC_LAYOUTS = (
+    ("dense_1080p", 1920, 1080, 28, 22),
+    ("dense_1440p", 2560, 1440, 36, 28),
+    ("dense_retina", 2880, 1800, 44, 32),
+    ("toolbar_strip", 1920, 240, 4, 48),
+)
+
+def create_synthetic_ui(path: str, width: int, height: int, rows: int, columns: int, seed: int = 0) -> str:
+    """Draw a dense grid of buttons, icons and text labels - worst case for grouping"""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 245, dtype=np.uint8)
+    cell_w, cell_h = width // columns, height // rows
+
+    for row in range(rows):
+        for column in range(columns):
+            x, y = column * cell_w + 4, row * cell_h + 4
+            w, h = cell_w - 8, cell_h - 8
+            if w < 8 or h < 8:
+                continue
+
+            kind = rng.integers(0, 3)
+            color = tuple(int(c) for c in rng.integers(30, 200, size=3))
+            if kind == 0:  # Icon
+                side = min(w, h)
+                cv2.rectangle(image, (x, y), (x + side, y + side), color, -1)
+                cv2.circle(image, (x + side // 2, y + side // 2), max(2, side // 4), (255, 255, 255), -1)
+            elif kind == 1:  # Button with label
+                cv2.rectangle(image, (x, y), (x + w, y + h), color, 1)
+                cv2.putText(image, f"B{row}{column}", (x + 3, y + h - 4), cv2.FONT_HERSHEY_SIMPLEX,
+                            max(0.3, h / 40), (20, 20, 20), 1, cv2.LINE_AA)
+            else:  # Plain text
+                cv2.putText(image, "Item", (x, y + h - 4), cv2.FONT_HERSHEY_SIMPLEX,
+                            max(0.3, h / 40), (20, 20, 20), 1, cv2.LINE_AA)
+
+    cv2.imwrite(path, image)
+    return path
+
+def build_corpus(synthetic_dir: str, num_synthetic: int, max_app_images: int = 8,
+                 extra_images: Optional[List[str]] = None) -> List[str]:
+    """
+    apps/*/screenshots/*.png (+ extra images) followed by the synthetic dense layouts
+    App screenshots are sampled evenly across the sorted list so the corpus stays fixed per checkout.
+    """
+    corpus = []
+    app_images = sorted(glob.glob(str(PROJECT_ROOT / "apps" / "*" / "screenshots" / "*.png")))
+    if max_app_images and len(app_images) > max_app_images:
+        app_images = [app_images[int(i * len(app_images) / max_app_images)] for i in range(max_app_images)]
+    corpus.extend(app_images if max_app_images else [])
+    corpus.extend(extra_images or [])
+
+    for i, (name, width, height, rows, columns) in enumerate(SYNTHETIC_LAYOUTS[:num_synthetic]):
+        path = os.path.join(synthetic_dir, f"synthetic_{name}.png")
+        corpus.append(create_synthetic_ui(path, width, height, rows, columns, seed=i))
+    return corpus
+
+def build_detector_configs(config: Dict[str, Any]):
+    """Same config.json keys as seraphine.setup_detector_configs, with per-stage timing prints off"""
+    yolo_config = YOLOConfig(
+        model_path=config.get("yolo_model_path", "models/model_dynamic.onnx"),
+        model_variant=config.get("yolo_model_variant", "fp32"),
+        conf_threshold=config.get("yolo_conf_threshold", 0.1),
+        iou_threshold=config.get("yolo_iou_threshold", 0.1),
+        tile_mode=config.get("yolo_tile_mode", "off"),
+        tile_size=config.get("yolo_tile_size", 1280),
+        tile_overlap=config.get("yolo_tile_overlap", 256),
+        enable_timing=False,
+        enable_debug=False
+    )
+    ocr_config = OCRDetConfig(
+        model_path=config.get("ocr_model_path", "models/ch_PP-OCRv3_det_infer.onnx"),
+        model_variant=config.get("ocr_model_variant", "fp32"),
+        det_threshold=config.get("ocr_det_threshold", 0.3),
+        max_side_len=config.get("ocr_max_side_len", 960),
+        enable_timing=False,
+        enable_debug=False,
+        use_dilation=config.get("ocr_use_dilation", True)
+    )
+    return yolo_config, ocr_config
+
+def to_seraphine_format(merged_detections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Same fields as seraphine.convert_merged_to_seraphine_format
+    (seraphine.py itself is not imported - it pulls in the GUI controller)
+    """
+    seraphine_detections = []
+    for i, detection in enumerate(merged_detections):
+        m_id = detection.get('m_id', f"M{i+1:03d}")
+        seraphine_detections.append({
+            'bbox': detection['bbox'],
+            'id': m_id,
+            'merged_id': m_id,
+            'type': detection.get('type', 'unknown'),
+            'source': detection.get('source', 'merged'),
+            'confidence': detection.get('confidence', 1.0),
+            'y_id': detection.get('y_id', 'NA'),
+            'o_id': detection.get('o_id', 'NA')
+        })
+    return seraphine_detections
+
+def stub_supergroup_analysis(seraphine_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Offline stand-in for the Gemini supergroup pass: every group is explore=True"""
+    bbox_processor = seraphine_analysis['bbox_processor']
+    group_details = seraphine_analysis.setdefault('analysis', {}).setdefault('group_details', {})
+    for group_id in bbox_processor.final_groups:
+        group_details.setdefault(group_id, {})['explore'] = True
+    return seraphine_analysis
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    try:
+        import psutil
+        memory = psutil.Process().memory_info()
+        if hasattr(memory, 'peak_wset'):  # Windows
+            return memory.peak_wset / (1024 * 1024)
+    except ImportError:
+        pass
+
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024  # bytes vs KiB
+    except ImportError:
+        return 0.0
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    values = np.asarray(samples, dtype=np.float64) * 1000.0
+    return {
+        'count': int(values.size),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'mean_ms': float(values.mean()),
+        'min_ms': float(values.min()),
+        'max_ms': float(values.max())
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+class PipelineBenchmark:
+    """
+    Runs the pipeline stages on one image at a time and records wall time per stage
+
+    Stages that cannot run in this environment (e.g. a missing YOLO model) are
+    reported as skipped instead of failing the whole benchmark.
+    """
+
+    def __init__(self, config: Dict[str, Any], output_dir: str, run_gemini: bool = False, verbose: bool = False):
+        self.config = config
+        self.output_dir = output_dir
+        self.run_gemini = run_gemini
+        self.verbose = verbose
+        self.skipped: Dict[str, str] = {}
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+        yolo_config, ocr_config = build_detector_configs(config)
+        self.yolo_detector = YOLODetector(yolo_config) if os.path.exists(yolo_config.model_path) else None
+        if self.yolo_detector is None:
+            self.skipped['yolo'] = f"model not found: {yolo_config.model_path}"
+        self.ocr_detector = OCRDetector(ocr_config) if os.path.exists(ocr_config.model_path) else None
+        if self.ocr_detector is None:
+            self.skipped['ocr'] = f"model not found: {ocr_config.model_path}"
+
+        self.merger = BBoxMerger(iou_threshold=config.get("merger_iou_threshold", 0.1), enable_timing=False)
+        self.group_generator = FinalGroupImageGenerator(output_dir=output_dir, enable_timing=False, save_mapping=False)
+
+        self.fake_server = None
+        self.analyzer = None
+        if run_gemini:
+            self._start_fake_gemini()
+        else:
+            self.skipped['gemini'] = "disabled (pass --gemini to run against the local fake server)"
+
+    def _start_fake_gemini(self):
+        try:
+            from seraphine_pipeline.gemini_fake_server import FakeGeminiServer
+            from seraphine_pipeline.gemini_analyzer import GeminiIconAnalyzer
+
+            self.fake_server = FakeGeminiServer().start()
+            os.environ.setdefault("GEMINI_API_KEY", "benchmark-offline")
+            self.analyzer = GeminiIconAnalyzer(
+                output_dir=self.output_dir,
+                max_concurrent_requests=self.config.get("gemini_max_concurrent", 4),
+                save_results=False,
+                requests_per_minute=60000,  # The fake server has no quota
+                base_url=self.fake_server.base_url
+            )
+        except Exception as e:
+            self.skipped['gemini'] = f"unavailable: {e}"
+            self.close()
+
+    def close(self):
+        if self.fake_server:
+            self.fake_server.stop()
+            self.fake_server = None
+
+    def _timed(self, timings: Dict[str, float], stage: str, func: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    def run_image(self, image_path: str) -> Dict[str, Any]:
+        """One full pass over one image; returns per-stage seconds and result counts"""
+        if self.verbose:
+            return self._run_image(image_path)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return self._run_image(image_path)  # The generator prints per group
+
+    def _run_image(self, image_path: str) -> Dict[str, Any]:
+        timings: Dict[str, float] = {}
+        total_start = time.perf_counter()
+
+        img_bgr = self._timed(timings, 'decode', cv2.imread, image_path, cv2.IMREAD_COLOR)
+        if img_bgr is None:
+            raise ValueError(f"Could not load image: {image_path}")
+
+        yolo_detections = self._timed(timings, 'yolo', self.yolo_detector.detect, img_bgr) if self.yolo_detector else []
+        ocr_detections = self._timed(timings, 'ocr', self.ocr_detector.detect, img_bgr) if self.ocr_detector else []
+
+        for i, detection in enumerate(yolo_detections):
+            detection['y_id'] = f"Y{i+1:03d}"
+        for i, detection in enumerate(ocr_detections):
+            detection['o_id'] = f"O{i+1:03d}"
+
+        merged_detections, _ = self._timed(timings, 'merge', self.merger.merge_detections, yolo_detections, ocr_detections)
+        for i, detection in enumerate(merged_detections):
+            detection['m_id'] = f"M{i+1:03d}"
+
+        counts = {
+            'yolo': len(yolo_detections),
+            'ocr': len(ocr_detections),
+            'merged': len(merged_detections),
+            'groups': 0,
+            'composites': 0,
+            'gemini_icons': 0
+        }
+
+        if merged_detections:
+            # Fresh processor per image, like run_seraphine_grouping (it keeps group state)
+            seraphine_analysis = self._timed(timings, 'grouping', lambda detections: FinalSeraphineProcessor(
+                enable_timing=False, enable_debug=False
+            ).process_detections(detections), to_seraphine_format(merged_detections))
+            stub_supergroup_analysis(seraphine_analysis)
+            counts['groups'] = len(seraphine_analysis['bbox_processor'].final_groups)
+
+            filename_base = Path(image_path).stem
+            grouped = self._timed(timings, 'group_images', self.group_generator.create_grouped_images,
+                                  image_path, seraphine_analysis, filename_base, return_direct_images=True)
+            direct_images = grouped.get('direct_images', []) if isinstance(grouped, dict) else []
+            counts['composites'] = len(direct_images)
+
+            if self.analyzer and direct_images:
+                gemini_results = self._timed(timings, 'gemini', asyncio.run, self.analyzer.analyze_grouped_images(
+                    grouped_image_paths=None, filename_base=filename_base, direct_images=direct_images
+                ))
+                counts['gemini_icons'] = gemini_results.get('total_icons_found', 0)
+
+        timings['total'] = time.perf_counter() - total_start
+        return {'timings': timings, 'counts': counts, 'size': [int(img_bgr.shape[1]), int(img_bgr.shape[0])]}
+
+    def run(self, corpus: List[str], iterations: int = 3, warmup: int = 1) -> Dict[str, Any]:
+        """Warm up (model loads, caches) on the first image, then time every image `iterations` times"""
+        for _ in range(warmup):
+            if corpus:
+                self.run_image(corpus[0])
+
+        per_image = []
+        measured_time = 0.0
+        measured_images = 0
+
+        for image_path in corpus:
+            image_timings = {stage: [] for stage in STAGES}
+            record = None
+            for _ in range(iterations):
+                record = self.run_image(image_path)
+                for stage, seconds in record['timings'].items():
+                    self.samples[stage].append(seconds)
+                    image_timings[stage].append(seconds)
+                measured_time += record['timings']['total']
+                measured_images += 1
+
+            print(f"  {Path(image_path).name}: {record['size'][0]}x{record['size'][1]}, "
+                  f"{record['counts']['merged']} merged, {record['counts']['groups']} groups, "
+                  f"p50 total {np.median(image_timings['total']) * 1000:.1f} ms")
+
+            per_image.append({
+                'image': os.path.relpath(image_path, PROJECT_ROOT) if str(image_path).startswith(str(PROJECT_ROOT)) else Path(image_path).name,
+                'size': record['size'],
+                'counts': record['counts'],
+                'p50_ms': {stage: float(np.median(values) * 1000) for stage, values in image_timings.items() if values}
+            })
+
+        return {
+            'meta': {
+                'timestamp': datetime.now().isoformat(),
+                'git_commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'processor': platform.processor(),
+                'cpu_count': os.cpu_count(),
+                'iterations': iterations,
+                'warmup': warmup,
+                'images': len(corpus)
+            },
+            'stages': {stage: summarize(samples) for stage, samples in self.samples.items() if samples},
+            'skipped_stages': self.skipped,
+            'throughput': {
+                'images': measured_images,
+                'total_seconds': measured_time,
+                'images_per_sec': measured_images / measured_time if measured_time else 0.0
+            },
+            'peak_rss_mb': peak_rss_mb(),
+            'per_image': per_image
+        }
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.10) -> bool:
+    """Print p50/p95 deltas per stage; returns False if any stage regressed by more than threshold"""
+    ok = True
+    print(f"\n📊 Comparison with {baseline['meta'].get('git_commit')} ({baseline['meta'].get('timestamp')})")
+    for key in ('images', 'iterations', 'platform'):
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            print(f"  ⚠️  {key} differs: {baseline['meta'].get(key)} vs {current['meta'].get(key)} - numbers are not like for like")
+    for stage, stats in current['stages'].items():
+        old = baseline.get('stages', {}).get(stage)
+        if not old:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            change = (stats[key] - old[key]) / old[key] if old[key] else 0.0
+            regressed = change > threshold
+            ok = ok and not regressed
+            status = "❌" if regressed else "✅"
+            print(f"  {status} {stage:13s} {key}: {old[key]:9.2f} → {stats[key]:9.2f} ms ({change:+.1%})")
+
+    old_ips = baseline.get('throughput', {}).get('images_per_sec', 0.0)
+    new_ips = current['throughput']['images_per_sec']
+    print(f"  images/sec: {old_ips:.2f} → {new_ips:.2f} | peak RSS: "
+          f"{baseline.get('peak_rss_mb', 0.0):.0f} → {current['peak_rss_mb']:.0f} MB")
+    return ok
+
+def print_summary(results: Dict[str, Any]):
+    print(f"\n⏱️  Stage latency over {results['throughput']['images']} image runs")
+    for stage, stats in results['stages'].items():
+        print(f"  {stage:13s} p50 {stats['p50_ms']:9.2f} ms | p95 {stats['p95_ms']:9.2f} ms | n={stats['count']}")
+    for stage, reason in results['skipped_stages'].items():
+        print(f"  {stage:13s} skipped - {reason}")
+    print(f"  🚀 {results['throughput']['images_per_sec']:.2f} images/sec | peak RSS {results['peak_rss_mb']:.0f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Seraphine detection pipeline stage by stage")
+    parser.add_argument("--iterations", type=int, default=3, help="Timed runs per image")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs before measuring (model loading)")
+    parser.add_argument("--synthetic", type=int, default=len(SYNTHETIC_LAYOUTS), help="Number of synthetic dense UIs to add")
+    parser.add_argument("--max-app-images", type=int, default=8, help="apps/*/screenshots images to sample (0 = none)")
+    parser.add_argument("--images", nargs="*", default=[], help="Extra images to include")
+    parser.add_argument("--gemini", action="store_true", help="Also time Gemini analysis against the local fake server")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's own console output")
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument("--compare", help="Baseline result JSON to compare against")
+    parser.add_argument("--regression-threshold", type=float, default=0.10, help="Relative p50/p95 slowdown counted as a regression")
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_ROOT)  # Model and config paths in config.json are project-relative
+    config = load_configuration() or {}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = build_corpus(temp_dir, args.synthetic, max_app_images=args.max_app_images, extra_images=args.images)
+        if not corpus:
+            print("❌ Empty corpus - add --images or synthetic layouts")
+            return 1
+
+        print(f"🏁 Benchmarking {len(corpus)} images x {args.iterations} iterations")
+        benchmark = PipelineBenchmark(config, output_dir=os.path.join(temp_dir, "outputs"), run_gemini=args.gemini,
+                                      verbose=args.verbose)
+        try:
+            results = benchmark.run(corpus, iterations=args.iterations, warmup=args.warmup)
+        finally:
+            benchmark.close()
+
+    print_summary(results)
+
+    output_path = args.output or str(PROJECT_ROOT / "benchmarks" / "results" /
+                                     f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{results['meta']['git_commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved: {output_path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare_results(results, baseline, args.regression_threshold):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+INT8 accuracy guardrail
+Runs YOLO and OCR with the FP32 models and with their quantized variants on the same
+screenshots, then compares the detections per detector and after BBoxMerger: box recall
+(FP32 boxes found again by the variant) and precision at several IoU thresholds, plus
+per-image latency for both. Exits non-zero when merged recall at --guard-iou falls below
+--min-recall, so a variant is only switched on in config.json once it passes.
+
+Run from the project root after building the variants:
+    PYTHONPATH=utils python -m seraphine_pipeline.quantization --variant all
+    python benchmarks/eval_quantization.py
+    python benchmarks/eval_quantization.py --yolo-variant int8_dynamic --ocr-variant int8_static --synthetic 4
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any
+
+import cv2
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "utils"))
+sys.path.append(str(PROJECT_ROOT / "benchmarks"))
+
+from seraphine_pipeline.helpers import load_configuration
+from seraphine_pipeline.yolo_detector import YOLODetector
+from seraphine_pipeline.ocr_detector import OCRDetector
+from seraphine_pipeline.bbox_merger import BBoxMerger
+from seraphine_pipeline.session_pool import MODEL_VARIANTS, model_variant_path
+from bench_pipeline import SYNTHETIC_LAYOUTS, build_corpus, build_detector_configs, summarize, git_commit
+
+IOU_THRESHOLDS = (0.5, 0.75, 0.9)
+STAGES = ('yolo', 'ocr', 'merged')
+
+def box_iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """(N, M) IoU between two sets of [x1, y1, x2, y2] boxes"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)))
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+def count_matches(reference: List[Dict[str, Any]], candidate: List[Dict[str, Any]],
+                  thresholds=IOU_THRESHOLDS) -> Dict[float, int]:
+    """One-to-one matches per IoU threshold (greedy, highest IoU first)"""
+    boxes_ref = np.array([d['bbox'][:4] for d in reference], dtype=np.float64).reshape(-1, 4)
+    boxes_cand = np.array([d['bbox'][:4] for d in candidate], dtype=np.float64).reshape(-1, 4)
+    iou = box_iou_matrix(boxes_ref, boxes_cand)
+
+    rows, columns = np.nonzero(iou >= min(thresholds))
+    order = np.argsort(-iou[rows, columns], kind='stable')
+    used_ref, used_cand, matched_ious = set(), set(), []
+    for index in order:
+        row, column = rows[index], columns[index]
+        if row in used_ref or column in used_cand:
+            continue
+        used_ref.add(row)
+        used_cand.add(column)
+        matched_ious.append(iou[row, column])
+
+    matched_ious = np.asarray(matched_ious)
+    return {threshold: int(np.sum(matched_ious >= threshold)) for threshold in thresholds}
+
+class QuantizationEvaluator:
+    """Detects every image with both model sets and accumulates match counts and latency"""
+
+    def __init__(self, config: Dict[str, Any], yolo_variant: str, ocr_variant: str):
+        yolo_fp32, ocr_fp32 = build_detector_configs(config)
+        yolo_fp32, ocr_fp32 = replace(yolo_fp32, model_variant="fp32"), replace(ocr_fp32, model_variant="fp32")
+        self.skipped: Dict[str, str] = {}
+        self.detectors: Dict[str, Dict[str, Any]] = {'fp32': {}, 'variant': {}}
+        self.variants = {'yolo': yolo_variant, 'ocr': ocr_variant}
+
+        for role, fp32_config, detector_class in (('yolo', yolo_fp32, YOLODetector), ('ocr', ocr_fp32, OCRDetector)):
+            variant_path = model_variant_path(fp32_config.model_path, self.variants[role])
+            if not os.path.exists(fp32_config.model_path):
+                self.skipped[role] = f"model not found: {fp32_config.model_path}"
+            elif not os.path.exists(variant_path):
+                self.skipped[role] = f"variant not built: {variant_path}"
+            else:
+                self.detectors['fp32'][role] = detector_class(fp32_config)
+                self.detectors['variant'][role] = detector_class(replace(fp32_config, model_variant=self.variants[role]))
+
+        self.merger = BBoxMerger(iou_threshold=config.get("merger_iou_threshold", 0.1), enable_timing=False)
+        self.latency: Dict[str, Dict[str, List[float]]] = {
+            model_set: {role: [] for role in self.detectors[model_set]} for model_set in self.detectors
+        }
+        self.totals = {stage: {'reference': 0, 'candidate': 0, 'matched': {t: 0 for t in IOU_THRESHOLDS}}
+                       for stage in STAGES}
+
+    def _detect(self, model_set: str, img_bgr: np.ndarray, record: bool) -> Dict[str, List[Dict[str, Any]]]:
+        detections = {}
+        for role in ('yolo', 'ocr'):
+            detector = self.detectors[model_set].get(role)
+            start = time.perf_counter()
+            detections[role] = detector.detect(img_bgr) if detector else []
+            if detector and record:
+                self.latency[model_set][role].append(time.perf_counter() - start)
+        detections['merged'] = self.merger.merge_detections(detections['yolo'], detections['ocr'])[0]
+        return detections
+
+    def warm_up(self, img_bgr: np.ndarray):
+        """Load every session pool before timing"""
+        for model_set in self.detectors:
+            self._detect(model_set, img_bgr, record=False)
+
+    def evaluate_image(self, image_path: str) -> Dict[str, Any]:
+        img_bgr = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if img_bgr is None:
+            raise ValueError(f"Could not load image: {image_path}")
+
+        reference = self._detect('fp32', img_bgr, record=True)
+        candidate = self._detect('variant', img_bgr, record=True)
+
+        per_image = {}
+        for stage in STAGES:
+            matched = count_matches(reference[stage], candidate[stage])
+            totals = self.totals[stage]
+            totals['reference'] += len(reference[stage])
+            totals['candidate'] += len(candidate[stage])
+            for threshold, count in matched.items():
+                totals['matched'][threshold] += count
+            per_image[stage] = {'fp32': len(reference[stage]), 'variant': len(candidate[stage]),
+                                'matched@0.5': matched[0.5]}
+        return per_image
+
+    def report(self) -> Dict[str, Any]:
+        accuracy = {}
+        for stage, totals in self.totals.items():
+            accuracy[stage] = {
+                'fp32_boxes': totals['reference'],
+                'variant_boxes': totals['candidate'],
+                # Nothing to find counts as full recall; nothing reported as full precision
+                'recall': {str(t): m / totals['reference'] if totals['reference'] else 1.0
+                           for t, m in totals['matched'].items()},
+                'precision': {str(t): m / totals['candidate'] if totals['candidate'] else 1.0
+                              for t, m in totals['matched'].items()}
+            }
+
+        latency = {}
+        for role in self.latency['fp32']:
+            fp32, variant = summarize(self.latency['fp32'][role]), summarize(self.latency['variant'][role])
+            latency[role] = {'fp32': fp32, 'variant': variant, 'speedup_p50': fp32['p50_ms'] / max(variant['p50_ms'], 1e-9)}
+        return {'accuracy': accuracy, 'latency': latency}
+
+def print_report(results: Dict[str, Any]):
+    print(f"\n🎯 Variant vs FP32 on {results['meta']['images']} images "
+          f"(yolo={results['meta']['yolo_variant']}, ocr={results['meta']['ocr_variant']})")
+    for stage, accuracy in results['accuracy'].items():
+        recall = " ".join(f"R@{t}={value:.3f}" for t, value in accuracy['recall'].items())
+        precision = " ".join(f"P@{t}={value:.3f}" for t, value in accuracy['precision'].items())
+        print(f"  {stage:<7} {accuracy['fp32_boxes']:>6} -> {accuracy['variant_boxes']:<6} {recall} | {precision}")
+    for role, latency in results['latency'].items():
+        print(f"  ⏱️  {role}: p50 {latency['fp32']['p50_ms']:.1f} ms -> {latency['variant']['p50_ms']:.1f} ms "
+              f"({latency['speedup_p50']:.2f}x)")
+    for role, reason in results['skipped'].items():
+        print(f"  ⏭️  {role}: {reason}")
+
+def check_guardrail(results: Dict[str, Any], guard_iou: float, min_recall: float) -> bool:
+    """Merged recall at guard_iou must reach min_recall (per detector values are informational)"""
+    recall = results['accuracy']['merged']['recall'][str(guard_iou)]
+    if recall < min_recall:
+        print(f"❌ Merged recall@{guard_iou} {recall:.3f} < {min_recall:.3f} - keep the FP32 models")
+        return False
+    print(f"✅ Merged recall@{guard_iou} {recall:.3f} >= {min_recall:.3f}")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare quantized detection models against the FP32 baseline")
+    parser.add_argument("--yolo-variant", choices=MODEL_VARIANTS, default="int8_static", help="YOLO variant to evaluate")
+    parser.add_argument("--ocr-variant", choices=MODEL_VARIANTS, default="int8_static", help="OCR variant to evaluate")
+    parser.add_argument("--max-app-images", type=int, default=32, help="apps/*/screenshots images to sample (0 = none)")
+    parser.add_argument("--synthetic", type=int, default=0, help=f"Synthetic dense UIs to add (max {len(SYNTHETIC_LAYOUTS)})")
+    parser.add_argument("--images", nargs="*", default=[], help="Extra images to include")
+    parser.add_argument("--guard-iou", type=float, choices=IOU_THRESHOLDS, default=0.5, help="IoU of the recall guardrail")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Minimum merged recall at --guard-iou")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's own console output")
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/quantization_<timestamp>_<commit>.json)")
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_ROOT)  # Model paths in config.json are project-relative
+    config = load_configuration() or {}
+
+    evaluator = QuantizationEvaluator(config, args.yolo_variant, args.ocr_variant)
+    if not evaluator.detectors['variant']:
+        for role, reason in evaluator.skipped.items():
+            print(f"❌ {role}: {reason}")
+        print("   Build the variants first: PYTHONPATH=utils python -m seraphine_pipeline.quantization --variant all")
+        return 1
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = build_corpus(temp_dir, args.synthetic, max_app_images=args.max_app_images, extra_images=args.images)
+        if not corpus:
+            print("❌ Empty corpus - add --images or synthetic layouts")
+            return 1
+
+        print(f"🔬 Evaluating {len(corpus)} images")
+        with open(os.devnull, "w") as devnull, \
+                (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+            evaluator.warm_up(cv2.imread(corpus[0], cv2.IMREAD_COLOR))
+            per_image = {path: evaluator.evaluate_image(path) for path in corpus}
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'images': len(per_image),
+            'yolo_variant': args.yolo_variant,
+            'ocr_variant': args.ocr_variant
+        },
+        'skipped': evaluator.skipped,
+        **evaluator.report(),
+        'per_image': per_image
+    }
+    print_report(results)
+
+    output_path = args.output or str(PROJECT_ROOT / "benchmarks" / "results" /
+                                     f"quantization_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{results['meta']['git_commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved: {output_path}")
+
+    return 0 if check_guardrail(results, args.guard_iou, args.min_recall) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
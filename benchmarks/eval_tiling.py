@@ -0,0 +1,179 @@
+"""
+Tiled YOLO guardrail
+Runs YOLO on the same screenshots with tile_mode "off" (whole frame resized to max_resolution)
+and "on" (detect_tiled), then compares the detections directly and after BBoxMerger: recall
+(resized boxes found again by the tiled run) and how many extra boxes tiling adds, plus per-image
+latency. Exits non-zero when merged recall at --guard-iou falls below --min-recall, so
+yolo_tile_mode is only switched away from "off" in config.json once it passes.
+
+Run from the project root:
+    python benchmarks/eval_tiling.py
+    python benchmarks/eval_tiling.py --synthetic 4 --images path/to/4k_capture.png
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any
+
+import cv2
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "utils"))
+sys.path.append(str(PROJECT_ROOT / "benchmarks"))
+
+from seraphine_pipeline.helpers import load_configuration
+from seraphine_pipeline.yolo_detector import YOLODetector
+from seraphine_pipeline.ocr_detector import OCRDetector
+from seraphine_pipeline.bbox_merger import BBoxMerger
+from bench_pipeline import SYNTHETIC_LAYOUTS, build_corpus, build_detector_configs, summarize, git_commit
+from eval_quantization import IOU_THRESHOLDS, count_matches
+
+STAGES = ('yolo', 'merged')
+MODES = ('off', 'on')
+
+class TilingEvaluator:
+    """Detects every image resized and tiled and accumulates match counts and latency"""
+
+    def __init__(self, config: Dict[str, Any]):
+        yolo_config, ocr_config = build_detector_configs(config)
+        self.yolo = {mode: YOLODetector(replace(yolo_config, tile_mode=mode)) for mode in MODES}
+        self.ocr = OCRDetector(ocr_config) if os.path.exists(ocr_config.model_path) else None
+        self.merger = BBoxMerger(iou_threshold=config.get("merger_iou_threshold", 0.1), enable_timing=False)
+        self.latency: Dict[str, List[float]] = {mode: [] for mode in MODES}
+        self.totals = {stage: {'reference': 0, 'candidate': 0, 'matched': {t: 0 for t in IOU_THRESHOLDS}}
+                       for stage in STAGES}
+
+    def _detect(self, mode: str, img_bgr, ocr_detections, record: bool) -> Dict[str, List[Dict[str, Any]]]:
+        start = time.perf_counter()
+        yolo_detections = self.yolo[mode].detect(img_bgr)
+        if record:
+            self.latency[mode].append(time.perf_counter() - start)
+        return {'yolo': yolo_detections,
+                'merged': self.merger.merge_detections(yolo_detections, ocr_detections)[0]}
+
+    def warm_up(self, img_bgr):
+        """Load the session pools before timing"""
+        for mode in MODES:
+            self.yolo[mode].detect(img_bgr)
+
+    def evaluate_image(self, image_path: str) -> Dict[str, Any]:
+        img_bgr = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if img_bgr is None:
+            raise ValueError(f"Could not load image: {image_path}")
+
+        # OCR does not tile - run it once and merge both YOLO runs with the same text boxes
+        ocr_detections = self.ocr.detect(img_bgr) if self.ocr else []
+        reference = self._detect('off', img_bgr, ocr_detections, record=True)
+        candidate = self._detect('on', img_bgr, ocr_detections, record=True)
+
+        per_image = {'size': [img_bgr.shape[1], img_bgr.shape[0]]}
+        for stage in STAGES:
+            matched = count_matches(reference[stage], candidate[stage])
+            totals = self.totals[stage]
+            totals['reference'] += len(reference[stage])
+            totals['candidate'] += len(candidate[stage])
+            for threshold, count in matched.items():
+                totals['matched'][threshold] += count
+            per_image[stage] = {'resized': len(reference[stage]), 'tiled': len(candidate[stage]),
+                                'matched@0.5': matched[0.5]}
+        return per_image
+
+    def report(self) -> Dict[str, Any]:
+        accuracy = {}
+        for stage, totals in self.totals.items():
+            accuracy[stage] = {
+                'resized_boxes': totals['reference'],
+                'tiled_boxes': totals['candidate'],
+                # Nothing to find counts as full recall
+                'recall': {str(t): m / totals['reference'] if totals['reference'] else 1.0
+                           for t, m in totals['matched'].items()},
+                'tiled_only': {str(t): totals['candidate'] - m for t, m in totals['matched'].items()}
+            }
+
+        resized, tiled = summarize(self.latency['off']), summarize(self.latency['on'])
+        latency = {'resized': resized, 'tiled': tiled, 'slowdown_p50': tiled['p50_ms'] / max(resized['p50_ms'], 1e-9)}
+        return {'accuracy': accuracy, 'latency': latency}
+
+def print_report(results: Dict[str, Any]):
+    print(f"\n🧩 Tiled vs resized YOLO on {results['meta']['images']} images")
+    for stage, accuracy in results['accuracy'].items():
+        recall = " ".join(f"R@{t}={value:.3f}" for t, value in accuracy['recall'].items())
+        extra = " ".join(f"+{value}@{t}" for t, value in accuracy['tiled_only'].items())
+        print(f"  {stage:<7} {accuracy['resized_boxes']:>6} -> {accuracy['tiled_boxes']:<6} {recall} | tiled only {extra}")
+    latency = results['latency']
+    print(f"  ⏱️  yolo: p50 {latency['resized']['p50_ms']:.1f} ms -> {latency['tiled']['p50_ms']:.1f} ms "
+          f"({latency['slowdown_p50']:.2f}x)")
+
+def check_guardrail(results: Dict[str, Any], guard_iou: float, min_recall: float) -> bool:
+    """Merged recall at guard_iou must reach min_recall (YOLO-only values are informational)"""
+    recall = results['accuracy']['merged']['recall'][str(guard_iou)]
+    if recall < min_recall:
+        print(f"❌ Merged recall@{guard_iou} {recall:.3f} < {min_recall:.3f} - keep yolo_tile_mode off")
+        return False
+    print(f"✅ Merged recall@{guard_iou} {recall:.3f} >= {min_recall:.3f}")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tiled YOLO detection against the resized baseline")
+    parser.add_argument("--max-app-images", type=int, default=32, help="apps/*/screenshots images to sample (0 = none)")
+    parser.add_argument("--synthetic", type=int, default=0, help=f"Synthetic dense UIs to add (max {len(SYNTHETIC_LAYOUTS)})")
+    parser.add_argument("--images", nargs="*", default=[], help="Extra images to include")
+    parser.add_argument("--guard-iou", type=float, choices=IOU_THRESHOLDS, default=0.5, help="IoU of the recall guardrail")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Minimum merged recall at --guard-iou")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's own console output")
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/tiling_<timestamp>_<commit>.json)")
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_ROOT)  # Model paths in config.json are project-relative
+    config = load_configuration() or {}
+
+    yolo_config, _ = build_detector_configs(config)
+    if not os.path.exists(yolo_config.model_path):
+        print(f"❌ yolo: model not found: {yolo_config.model_path}")
+        return 1
+
+    evaluator = TilingEvaluator(config)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus = build_corpus(temp_dir, args.synthetic, max_app_images=args.max_app_images, extra_images=args.images)
+        if not corpus:
+            print("❌ Empty corpus - add --images or synthetic layouts")
+            return 1
+
+        print(f"🔬 Evaluating {len(corpus)} images")
+        with open(os.devnull, "w") as devnull, \
+                (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+            evaluator.warm_up(cv2.imread(corpus[0], cv2.IMREAD_COLOR))
+            per_image = {path: evaluator.evaluate_image(path) for path in corpus}
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'images': len(per_image),
+            'tile_size': yolo_config.tile_size,
+            'tile_overlap': yolo_config.tile_overlap,
+            'max_resolution': list(yolo_config.max_resolution)
+        },
+        **evaluator.report(),
+        'per_image': per_image
+    }
+    print_report(results)
+
+    output_path = args.output or str(PROJECT_ROOT / "benchmarks" / "results" /
+                                     f"tiling_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{results['meta']['git_commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved: {output_path}")
+
+    return 0 if check_guardrail(results, args.guard_iou, args.min_recall) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
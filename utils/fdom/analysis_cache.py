@@ -0,0 +1,274 @@
+"""
+AnalysisCache - Persistent content-addressed cache for Seraphine screenshot analysis
+Maps an exact pixel hash + pipeline version fingerprint to the JSON-safe analysis result
+(merged detections, seraphine groups and Gemini labels), with size-bounded LRU eviction
+"""
+import hashlib
+import json
+import os
+import sys
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Any, Iterable
+
+# Add utils directory to path for seraphine_pipeline imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from seraphine_pipeline.frame_store import load_frame_pil
+from seraphine_pipeline.session_pool import model_variant_path
+
+# Bump when the cached payload layout changes
+CACHE_SCHEMA_VERSION = 1
+
+# Only these result fields are stored - debug mode results also carry live objects
+CACHEABLE_FIELDS = ('total_time', 'total_icons_found', 'seraphine_gemini_groups', 'seraphine_groups', 'merged_detections')
+
+def compute_image_hash(image_path: str) -> str:
+    """
+    Exact pixel hash of a screenshot
+    Hashes decoded RGB pixels plus size, so the same screen saved twice (different
+    file name, PNG metadata or compression) maps to the same key.
+    """
+    rgb = load_frame_pil(image_path)
+    hash_obj = hashlib.sha256(f"{rgb.size[0]}x{rgb.size[1]}".encode('utf-8'))
+    hash_obj.update(rgb.tobytes())
+    return hash_obj.hexdigest()
+
+def _file_fingerprint(path: str) -> str:
+    """Cheap identity of a model/prompt file: path, size and mtime"""
+    try:
+        stat = os.stat(path)
+        return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return f"{path}:missing"
+
+def compute_pipeline_version(seraphine_config: Optional[Dict[str, Any]], extra_files: Iterable[str] = ()) -> str:
+    """
+    Version fingerprint of everything that can change an analysis result
+    Covers the seraphine config.json, the YOLO/OCR model files and the Gemini prompts -
+    any change produces a new version and old entries stop matching.
+    """
+    seraphine_config = seraphine_config or {}
+    pipeline_dir = Path(__file__).resolve().parent.parent / "seraphine_pipeline"
+
+    yolo_model = seraphine_config.get("yolo_model_path", "models/model_dynamic.onnx")
+    ocr_model = seraphine_config.get("ocr_model_path", "models/ch_PP-OCRv3_det_infer.onnx")
+    files = [
+        yolo_model,
+        ocr_model,
+        model_variant_path(yolo_model, seraphine_config.get("yolo_model_variant", "fp32")),
+        model_variant_path(ocr_model, seraphine_config.get("ocr_model_variant", "fp32")),
+        str(pipeline_dir / "prompt.txt"),
+        str(pipeline_dir / "preprocessor_prompt.txt"),
+        *extra_files
+    ]
+
+    hash_obj = hashlib.sha256(f"schema:{CACHE_SCHEMA_VERSION}".encode('utf-8'))
+    hash_obj.update(json.dumps(seraphine_config, sort_keys=True, default=str).encode('utf-8'))
+    for path in files:
+        hash_obj.update(_file_fingerprint(path).encode('utf-8'))
+    return hash_obj.hexdigest()[:16]
+
+class AnalysisCache:
+    """
+    SQLite-backed LRU cache of screenshot analysis results
+    One row per (image_hash, version); last_access drives eviction once the total
+    payload size exceeds max_size_mb. Entries from other versions are purged on open.
+    """
+
+    def __init__(self, cache_path: str, version: str, max_size_mb: float = 500, purge_on_open: bool = True):
+        self.cache_path = Path(cache_path)
+        self.version = version
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                image_hash TEXT NOT NULL,
+                version TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (image_hash, version)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_access ON analysis_cache(last_access)")
+        self._conn.commit()
+
+        if purge_on_open:
+            self.purge_stale()
+
+    def get(self, image_hash: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of the cached result, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM analysis_cache WHERE image_hash = ? AND version = ?",
+                (image_hash, self.version)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE analysis_cache SET last_access = ? WHERE image_hash = ? AND version = ?",
+                (time.time(), image_hash, self.version)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def put(self, image_hash: str, result: Dict[str, Any]) -> bool:
+        """
+        Store the JSON-safe part of an analysis result
+
+        Returns:
+            True if stored, False if the result had nothing cacheable or was too large
+        """
+        cacheable = {key: result[key] for key in CACHEABLE_FIELDS if key in result}
+        if not cacheable:
+            return False
+
+        try:
+            payload = json.dumps(cacheable)
+        except (TypeError, ValueError):
+            return False
+
+        size_bytes = len(payload.encode('utf-8'))
+        if size_bytes > self.max_size_bytes:
+            return False
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (image_hash, self.version, payload, size_bytes, now, now)
+            )
+            self._evict_locked()
+            self._conn.commit()
+        return True
+
+    def _evict_locked(self) -> int:
+        """Drop least recently used entries until the cache fits max_size_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM analysis_cache").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return 0
+
+        evicted = 0
+        rows = self._conn.execute(
+            "SELECT image_hash, version, size_bytes FROM analysis_cache ORDER BY last_access ASC"
+        ).fetchall()
+        for image_hash, version, size_bytes in rows:
+            if total <= self.max_size_bytes:
+                break
+            self._conn.execute(
+                "DELETE FROM analysis_cache WHERE image_hash = ? AND version = ?",
+                (image_hash, version)
+            )
+            total -= size_bytes
+            evicted += 1
+        return evicted
+
+    def set_version(self, version: str) -> None:
+        """Switch to a new pipeline version, purging entries from the old one"""
+        if version != self.version:
+            self.version = version
+            self.purge_stale()
+
+    def invalidate(self, image_hash: str) -> None:
+        """Forget one screenshot (e.g. after a known-bad analysis)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_cache WHERE image_hash = ?", (image_hash,))
+            self._conn.commit()
+
+    def purge_stale(self) -> int:
+        """Delete entries written by a different pipeline version (models, config or prompts changed)"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM analysis_cache WHERE version != ?", (self.version,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, stored size and hit/miss counters for this process"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM analysis_cache"
+            ).fetchone()
+        return {
+            'entries': count,
+            'size_mb': total / (1024 * 1024),
+            'max_size_mb': self.max_size_bytes / (1024 * 1024),
+            'hits': self.hits,
+            'misses': self.misses,
+            'version': self.version
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def test_cache() -> bool:
+    """Round-trip, LRU eviction and version invalidation on a throwaway database"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_path = os.path.join(temp_dir, "analysis_cache.db")
+        entry = {'total_time': 1.0, 'total_icons_found': 3, 'seraphine_gemini_groups': {'H0': {'H0_1': {'bbox': [0, 0, 10, 10]}}}}
+
+        cache = AnalysisCache(cache_path, version="v1", max_size_mb=len(json.dumps(entry)) * 2.5 / (1024 * 1024))
+        assert cache.get("a") is None
+        assert cache.put("a", {**entry, 'config': object()})  # Non-cacheable fields are dropped
+        assert cache.get("a") == entry
+
+        time.sleep(0.01)
+        cache.put("b", entry)
+        time.sleep(0.01)
+        cache.get("a")  # "a" is now most recently used
+        time.sleep(0.01)
+        cache.put("c", entry)  # Over budget -> evicts "b"
+        assert cache.get("b") is None and cache.get("a") == entry and cache.get("c") == entry
+        cache.close()
+
+        cache = AnalysisCache(cache_path, version="v2")  # New models/prompts -> old entries purged
+        assert cache.get("a") is None and cache.stats()['entries'] == 0
+        cache.close()
+
+    print("✅ AnalysisCache round-trip, LRU eviction and invalidation passed")
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seraphine analysis cache")
+    parser.add_argument("--test-cache", action="store_true", help="Run the cache self-test")
+    parser.add_argument("--stats", help="Show stats for an app's analysis cache (app name)")
+    parser.add_argument("--clear", help="Clear an app's analysis cache (app name)")
+    args = parser.parse_args()
+
+    app_name = args.stats or args.clear
+    if args.test_cache:
+        exit(0 if test_cache() else 1)
+    elif app_name:
+        project_root = Path(__file__).parent.parent.parent
+        cache = AnalysisCache(str(project_root / "apps" / app_name / "cache" / "analysis_cache.db"), version="", purge_on_open=False)
+        if args.clear:
+            cache.clear()
+            print(f"Cleared analysis cache for {app_name}")
+        print(cache.stats())
+        cache.close()
+    else:
+        print("Usage: python analysis_cache.py --test-cache | --stats APP | --clear APP")
@@ -681,13 +681,9 @@ class AutoCaptioner:
     def _update_fdom_with_results(self) -> None:
         """Update fdom.json with gemini results and mark all nodes as processed"""
         try:
-            # Load current fdom
-            if not self.fdom_path.exists():
-                self.console.print("[red]❌ fdom.json not found![/red]")
-                return
-            
-            with open(self.fdom_path, 'r', encoding='utf-8') as f:
-                fdom_data = json.load(f)
+            # The in-memory fdom is saved after every change, so it matches the file
+            state_manager = self.element_interactor.state_manager
+            model = state_manager.model
             
             updates_made = 0
             gemini_updates_made = 0
@@ -704,11 +700,8 @@ class AutoCaptioner:
                     actual_node_id = node_id
                 
                 # Navigate to the node
-                if (state_name in fdom_data.get("states", {}) and 
-                    actual_node_id in fdom_data["states"][state_name].get("nodes", {})):
-                    
-                    node_data = fdom_data["states"][state_name]["nodes"][actual_node_id]
-                    
+                node_data = model.node(model.key(state_name, actual_node_id))
+                if node_data is not None:
                     # Mark as processed (for all nodes, including HL)
                     node_data["autocaptioning"] = "done"
                     updates_made += 1
@@ -721,7 +714,9 @@ class AutoCaptioner:
                         original_icon_name = node_data.get("g_icon_name", "")
                         new_icon_name = gemini_result.get("icon_name", "")
                         if new_icon_name:
-                            node_data["g_icon_name"] = f"{new_icon_name}, {original_icon_name}"
+                            # Through the model, so the name-based duplicate index follows the rename
+                            model.update_node(model.key(state_name, actual_node_id),
+                                              g_icon_name=f"{new_icon_name}, {original_icon_name}")
                             gemini_updates_made += 1
                             
                             if gemini_updates_made <= 3:  # Show first 3 updates
@@ -732,13 +727,9 @@ class AutoCaptioner:
                         if new_usage:
                             node_data["g_brief"] = new_usage  # Direct overwrite, no comma
             
-            # Save updated fdom
+            # Save updated fdom - only the touched nodes are logged
             if updates_made > 0:
-                with open(self.fdom_path, 'w', encoding='utf-8') as f:
-                    json.dump(fdom_data, f, indent=2, ensure_ascii=False)
-                
-                self.element_interactor.state_manager.fdom_data = fdom_data
-                self.element_interactor.state_manager._rebuild_tracking_sets()
+                state_manager.save_fdom_to_file()
                 self.console.print(f"[green]✅ Updated fdom.json - {updates_made} nodes marked as processed, {gemini_updates_made} got Gemini updates[/green]")
             
         except Exception as e:
@@ -749,12 +740,7 @@ class AutoCaptioner:
     def _is_node_already_processed(self, node_id: str) -> bool:
         """Check if node already has autocaptioning done"""
         try:
-            # Load current fdom
-            if not self.fdom_path.exists():
-                return False
-            
-            with open(self.fdom_path, 'r', encoding='utf-8') as f:
-                fdom_data = json.load(f)
+            model = self.element_interactor.state_manager.model
             
             # Parse node ID
             if "::" in node_id:
@@ -764,13 +750,8 @@ class AutoCaptioner:
                 actual_node_id = node_id
             
             # Check if node exists and has autocaptioning done
-            if (state_name in fdom_data.get("states", {}) and 
-                actual_node_id in fdom_data["states"][state_name].get("nodes", {})):
-                
-                node_data = fdom_data["states"][state_name]["nodes"][actual_node_id]
-                return node_data.get("autocaptioning") == "done"
-            
-            return False
+            node_data = model.node(model.key(state_name, actual_node_id))
+            return node_data is not None and node_data.get("autocaptioning") == "done"
             
         except Exception:
             return False
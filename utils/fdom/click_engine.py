@@ -62,6 +62,9 @@ class ClickEngine:
         
         self.console.print(f"[cyan]🎯 Centroids: C1{abs_centroids[0]} C2{abs_centroids[1]} C3{abs_centroids[2]}[/cyan]")
         
+        # Screenshots cover the window: click points map back to screenshot pixels through its origin
+        self._window_origin = (window_pos['left'], window_pos['top'])
+        
         # Take before screenshot
         before_screenshot = self.screenshot_manager.take_screenshot("before_click")
         if not before_screenshot:
@@ -140,7 +143,7 @@ class ClickEngine:
                     return False
 
                 self.console.print(f"[green]✅ Window focused: {message}[/green]")
-                time.sleep(1.5)  # Allow time for focus to take effect
+                self.screenshot_manager.wait_for_ui_settle(timeout=1.5)  # Allow time for focus to take effect
 
             elif sys.platform == "win32":
                 window_info = self.app_controller.gui_api.get_window_info(window_id)
@@ -153,7 +156,7 @@ class ClickEngine:
                 
                 if focus_success:
                     self.console.print(f"[green]🎯 Window focused successfully: {focus_message}[/green]")
-                    time.sleep(2)
+                    self.screenshot_manager.wait_for_ui_settle(timeout=2)
                 else:
                     self.console.print(f"[red]❌ Smart foreground failed: {focus_message}[/red]")
                     return False
@@ -194,18 +197,19 @@ class ClickEngine:
             self.app_controller.gui_api.click(abs_x, abs_y)
             self.console.print(f"[green]✅ {label} click sent to ({abs_x}, {abs_y})[/green]")
             
-            # Wait for UI response
-            self.console.print(f"[yellow]⏱️ Waiting {wait_time}s for UI response...[/yellow]")
-            time.sleep(wait_time)
+            # Wait for UI response: until the window changed and settled, at most wait_time
+            self.console.print(f"[yellow]⏱️ Waiting up to {wait_time}s for UI response...[/yellow]")
+            self.screenshot_manager.wait_for_ui_settle(timeout=wait_time, reference_screenshot=before_screenshot)
             
             # Check for change
             after_screenshot = self.screenshot_manager.take_screenshot(f"after_{label}_wait_{wait_time}s")
             if not after_screenshot:
                 return False
             
-            after_hash = self.visual_differ.calculate_image_hash(after_screenshot)
-            
-            if before_hash != after_hash:
+            # Perceptual comparison - a caret blink no longer triggers the region extraction,
+            # while pixels around the click are compared exactly so a toggled checkbox still counts
+            focus = (abs_x - self._window_origin[0], abs_y - self._window_origin[1])
+            if self.visual_differ.has_changed(before_screenshot, after_screenshot, focus=focus):
                 self.console.print(f"[green]🎯 Hash change detected with {label} - validating visual changes...[/green]")
                 
                 # Validate meaningful changes
@@ -217,7 +221,7 @@ class ClickEngine:
                 if diff_result["success"] and diff_result.get("regions"):
                     self.console.print(f"[bold green]🎉 MEANINGFUL STATE CHANGE with {label}![/bold green]")
                     self._temp_after_screenshot = after_screenshot
-                    self._temp_after_hash = after_hash
+                    self._temp_after_hash = self.visual_differ.calculate_image_hash(after_screenshot)
                     self._temp_diff_result = diff_result
                     return True
                 else:
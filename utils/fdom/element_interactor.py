@@ -150,33 +150,25 @@ class ElementInteractor:
             self._auto_run_captioner_on_first_launch()
 
     def _load_existing_fdom(self) -> None:
-        """Load existing fDOM file if it exists"""
-        app_dir = Path(__file__).parent.parent.parent / "apps" / self.app_name
-        fdom_path = app_dir / "fdom.json"
-        
-        if fdom_path.exists():
-            try:
-                with open(fdom_path, 'r', encoding='utf-8') as f:
-                    existing_fdom = json.load(f)
-                
-                self.state_manager.fdom_data = existing_fdom
-                
-                # CRITICAL: Always rebuild tracking sets after loading
-                self.state_manager._rebuild_tracking_sets()
-                
-                # Set current state to latest state
-                states = existing_fdom.get("states", {})
-                if states:
-                    state_ids = sorted(states.keys())
-                    self.current_state_id = state_ids[-1]
-                
-                self.console.print(f"[green]📂 Loaded existing fDOM: {len(states)} states[/green]")
-                
-                # DEBUG: Show what was loaded
-                self.console.print(f"[cyan]🔍 DEBUG: Loaded {len(self.state_manager.pending_nodes)} pending nodes[/cyan]")
-                
-            except Exception as e:
-                self.console.print(f"[yellow]⚠️ Could not load existing fDOM: {e}[/yellow]")
+        """Load existing fDOM file (snapshot plus write-ahead log) if it exists"""
+        try:
+            existing_fdom = self.state_manager.load_fdom_from_file()
+            if existing_fdom is None:
+                return
+            
+            # Set current state to latest state
+            states = existing_fdom.get("states", {})
+            if states:
+                state_ids = sorted(states.keys())
+                self.current_state_id = state_ids[-1]
+            
+            self.console.print(f"[green]📂 Loaded existing fDOM: {len(states)} states[/green]")
+            
+            # DEBUG: Show what was loaded
+            self.console.print(f"[cyan]🔍 DEBUG: Loaded {len(self.state_manager.pending_nodes)} pending nodes[/cyan]")
+            
+        except Exception as e:
+            self.console.print(f"[yellow]⚠️ Could not load existing fDOM: {e}[/yellow]")
     
     def click_element(self, node_id: str) -> Dict:
         """Execute click with comprehensive interaction workflow"""
@@ -341,18 +333,7 @@ class ElementInteractor:
 
     def _find_node_in_fdom(self, node_id: str) -> Optional[Dict]:
         """Find node data in fDOM - handles both state::node_id and old format"""
-        # NEW FORMAT: state::node_id
-        if "::" in node_id:
-            state_name, actual_node_id = node_id.split("::", 1)
-            state_data = self.state_manager.fdom_data.get("states", {}).get(state_name, {})
-            return state_data.get("nodes", {}).get(actual_node_id)
-        
-        # OLD FORMAT: search all states (fallback)
-        for state_data in self.state_manager.fdom_data.get("states", {}).values():
-            nodes = state_data.get("nodes", {})
-            if node_id in nodes:
-                return nodes[node_id]
-        return None
+        return self.state_manager.model.node(node_id)
 
     def _get_current_window_position(self) -> Optional[Dict]:
         """Get current app window position on screen"""
@@ -382,20 +363,7 @@ class ElementInteractor:
 
     def _find_node_state(self, unique_node_id: str) -> Optional[str]:
         """Find which state contains the node - handle state::node_id format"""
-        # NEW FORMAT: state::node_id
-        if "::" in unique_node_id:
-            state_name, node_id = unique_node_id.split("::", 1)
-            # Verify the node exists in that state
-            state_data = self.state_manager.fdom_data.get("states", {}).get(state_name, {})
-            if node_id in state_data.get("nodes", {}):
-                return state_name
-            return None
-        
-        # OLD FORMAT: search all states (fallback)
-        for state_id, state_data in self.state_manager.fdom_data.get("states", {}).items():
-            if unique_node_id in state_data.get("nodes", {}):
-                return state_id
-        return None
+        return self.state_manager.model.node_state(unique_node_id)
 
     # =====================================================================
     # INTERACTIVE MODE (Delegate to InteractiveCLI)
@@ -668,8 +636,7 @@ class ElementInteractor:
         """
         if state_id is None:
             state_id = self.current_state_id
-        state = self.state_manager.fdom_data.get("states", {}).get(state_id, {})
-        node_data = state.get("nodes", {}).get(node_id)
+        node_data = self.state_manager.model.node(self.state_manager.model.key(state_id, node_id))
         if not node_data:
             self.console.print(f"[red]Node {node_id} not found in state {state_id}![/red]")
             return
@@ -697,7 +664,6 @@ class ElementInteractor:
         All clicks are direct, no focus/minimize/maximize, no screenshot, no fDOM update.
         """
         all_states = self.state_manager.fdom_data.get("states", {})
-        all_edges = self.state_manager.fdom_data.get("edges", [])
         all_nodes = []
         node_to_state = {}
 
@@ -721,22 +687,11 @@ class ElementInteractor:
             return
 
         def find_path_via_edges(from_state, to_state):
-            from collections import deque, defaultdict
-            graph = defaultdict(list)
-            for edge in all_edges:
-                graph[edge['from']].append(edge)
-            queue = deque([(from_state, [])])
-            visited = set()
-            while queue:
-                state, path = queue.popleft()
-                if state == to_state:
-                    return path
-                if state in visited:
-                    continue
-                visited.add(state)
-                for edge in graph.get(state, []):
-                    queue.append((edge['to'], path + [edge]))
-            return None
+            navigation_index = self.navigation_engine.navigation_index
+            states = navigation_index.shortest_path(from_state, to_state)
+            if not states:
+                return None
+            return [navigation_index.edge(a, b) for a, b in zip(states, states[1:])]
 
         while True:
             table = Table(title="Manual Clickable Nodes (All States, Smart Navigation, NO FOCUS)")
@@ -138,24 +138,19 @@ class FDOMCreator:
         # Initialize StateManager first
         self.state_manager = StateManager(app_name=self.current_app_name)
         
-        # Check for existing fDOM data
-        fdom_file = self.apps_base_dir / self.current_app_name / "fdom.json"
-        if fdom_file.exists():
-            try:
-                with open(fdom_file, 'r', encoding='utf-8') as f:
-                    existing_fdom = json.load(f)
-                
-                self.state_manager.fdom_data = existing_fdom
-                self.state_manager._rebuild_tracking_sets()
-                
-                states_count = len(existing_fdom.get('states', {}))
-                pending_count = len(self.state_manager.pending_nodes)
-                
-                self.console.print(f"[green]📂 Loaded existing fDOM: {states_count} states[/green]")
-                self.console.print(f"[green]🔄 Restored: {pending_count} pending nodes[/green]")
-                
-            except Exception as e:
-                self.console.print(f"[yellow]⚠️ Could not load existing fDOM: {e}[/yellow]")
+        # Check for existing fDOM data (snapshot plus write-ahead log)
+        try:
+            existing_fdom = self.state_manager.load_fdom_from_file()
+        except Exception as e:
+            existing_fdom = None
+            self.console.print(f"[yellow]⚠️ Could not load existing fDOM: {e}[/yellow]")
+        
+        if existing_fdom is not None:
+            states_count = len(existing_fdom.get('states', {}))
+            pending_count = len(self.state_manager.pending_nodes)
+            
+            self.console.print(f"[green]📂 Loaded existing fDOM: {states_count} states[/green]")
+            self.console.print(f"[green]🔄 Restored: {pending_count} pending nodes[/green]")
         else:
             self.console.print("[cyan]🆕 Fresh session - no existing fDOM found[/cyan]")
         
@@ -224,6 +219,9 @@ class FDOMCreator:
             else:
                 self.console.print(f"[red]❌ {next_node}: Failed - {click_result.error_message}[/red]")
         
+        # Leave a self-contained fdom.json behind (folds the session's change log into it)
+        self.state_manager.export_fdom_json()
+        
         return {"nodes_explored": len(exploration_results), "results": exploration_results}
 
     def _interactive_node_selection(self) -> Optional[str]:
@@ -324,58 +322,28 @@ class FDOMCreator:
         self.console.print(f"[blue]📝 {node_id}: Skipped - '{custom_description}'[/blue]")
 
     def _find_node_in_fdom(self, unique_node_id: str) -> Optional[Dict]:
-        """Find node data using state::node_id format"""
-        if "::" in unique_node_id:
-            state_name, node_id = unique_node_id.split("::", 1)
-            state_data = self.state_manager.fdom_data.get("states", {}).get(state_name, {})
-            return state_data.get("nodes", {}).get(node_id)
-        
-        # Fallback for old format
-        return self._find_node_in_fdom_old(unique_node_id)
+        """Find node data using state::node_id format (bare ids: first state holding it)"""
+        return self.state_manager.model.node(unique_node_id)
 
     def _find_node_state(self, unique_node_id: str) -> Optional[str]:
         """Find which state contains the node - handle state::node_id format"""
-        if "::" in unique_node_id:
-            state_name, node_id = unique_node_id.split("::", 1)
-            # Verify the node exists in that state
-            state_data = self.state_manager.fdom_data.get("states", {}).get(state_name, {})
-            if node_id in state_data.get("nodes", {}):
-                return state_name
-            return None
-        
-        # Fallback for old format
-        for state_id, state_data in self.state_manager.fdom_data.get("states", {}).items():
-            if unique_node_id in state_data.get("nodes", {}):
-                return state_id
-        return None
+        return self.state_manager.model.node_state(unique_node_id)
 
 
     def _add_manual_description(self, node_id: str, description: str) -> None:
         """Add manual description to a node"""
-        for state_id, state_data in self.state_manager.fdom_data["states"].items():
-            if node_id in state_data.get("nodes", {}):
-                node = state_data["nodes"][node_id]
-                node["status"] = "manual_skip"
-                if "interactivity" not in node:
-                    node["interactivity"] = {}
-                node["interactivity"]["manual_description"] = description
-                node["interactivity"]["type"] = "manual_skip"
-                break
+        node = self.state_manager.model.set_status(node_id, "manual_skip")
+        if node is not None:
+            if "interactivity" not in node:
+                node["interactivity"] = {}
+            node["interactivity"]["manual_description"] = description
+            node["interactivity"]["type"] = "manual_skip"
 
     def _force_reload_fdom_from_file(self) -> None:
-        """Force reload fDOM data from JSON file to ensure latest state"""
+        """Force reload fDOM data from file (snapshot plus write-ahead log) to ensure latest state"""
         try:
-            fdom_file = self.apps_base_dir / self.current_app_name / "fdom.json"
-            if fdom_file.exists():
-                with open(fdom_file, 'r', encoding='utf-8') as f:
-                    latest_fdom = json.load(f)
-                
-                # Replace in-memory data with latest from file
-                self.state_manager.fdom_data = latest_fdom
-                
-                # Rebuild tracking sets with fresh data
-                self.state_manager._rebuild_tracking_sets()
-                
+            # Replace in-memory data with latest from file
+            if self.state_manager.load_fdom_from_file() is not None:
                 self.console.print(f"[cyan]📂 Reloaded fresh fDOM: {len(self.state_manager.pending_nodes)} pending nodes[/cyan]")
             else:
                 self.console.print("[yellow]⚠️ No fDOM file found to reload[/yellow]")
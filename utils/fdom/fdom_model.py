@@ -0,0 +1,354 @@
+"""
+FDOMModel - indexed in-memory fDOM
+Wraps the fDOM dict (the saved format is unchanged) and keeps indexes over it:
+nodes by "state::node" key, node keys bucketed by status, nodes by name and coarse
+position (for duplicate checks), and edges by source and target state. Lookups and
+status transitions are dict/set operations instead of scans over every state; the
+full index is only built when an fDOM is loaded.
+"""
+import math
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+DEFAULT_STATUS = "pending"
+GRID_CELL = 64  # Spatial index cell (px) - at least the usual duplicate tolerance, so 3x3 cells cover it
+
+def normalize_name(name: Optional[str]) -> str:
+    return (name or "").lower().strip()
+
+
+class FDOMModel:
+    """
+    Indexed view over an fDOM dict
+
+    The dict stays the source of truth (it is what StateManager saves); mutations that
+    change structure or status must go through the model so the indexes stay in sync.
+    Node keys are "state::node"; a bare node id resolves to the first state holding it.
+    """
+
+    def __init__(self, fdom_data: Dict):
+        self.data = fdom_data
+        self.reindex()
+
+    @staticmethod
+    def key(state_id: str, node_id: str) -> str:
+        return f"{state_id}::{node_id}"
+
+    @staticmethod
+    def split_key(node_key: str) -> Tuple[Optional[str], str]:
+        """("state", "node") for "state::node", (None, node) for a bare id"""
+        if "::" in node_key:
+            state_id, node_id = node_key.split("::", 1)
+            return state_id, node_id
+        return None, node_key
+
+    # =====================================================================
+    # INDEXING
+    # =====================================================================
+
+    def reindex(self) -> None:
+        """Rebuild every index from the dict - O(nodes + edges), done once per load"""
+        self._nodes: Dict[str, Dict] = {}
+        self._node_states: Dict[str, List[str]] = defaultdict(list)
+        self._by_status: Dict[str, Set[str]] = defaultdict(set)
+        self._node_status: Dict[str, str] = {}
+        self._edges_from: Dict[str, List[Dict]] = defaultdict(list)
+        self._edges_to: Dict[str, List[Dict]] = defaultdict(list)
+        self._edge_by_pair: Dict[Tuple[str, str], Dict] = {}
+        self._neighbours: Dict[str, List[str]] = defaultdict(list)
+        self._spatial: Dict[Tuple[str, int, int], Set[str]] = defaultdict(set)
+        self._spatial_cell: Dict[str, Tuple[str, int, int]] = {}
+
+        for state_id, state_data in self.data.setdefault("states", {}).items():
+            for node_id, node_data in state_data.get("nodes", {}).items():
+                self._index_node(state_id, node_id, node_data)
+        for edge in self.data.setdefault("edges", []):
+            self._index_edge(edge)
+
+    def _index_node(self, state_id: str, node_id: str, node_data: Dict) -> None:
+        node_key = self.key(state_id, node_id)
+        status = node_data.get("status", DEFAULT_STATUS)
+        self._nodes[node_key] = node_data
+        self._node_states[node_id].append(state_id)
+        self._by_status[status].add(node_key)
+        self._node_status[node_key] = status
+        self._index_spatial(node_key, node_data)
+
+    def _index_spatial(self, node_key: str, node_data: Dict) -> None:
+        """File a named node under (name, cell of its top-left corner)"""
+        name = normalize_name(node_data.get("g_icon_name"))
+        bbox = node_data.get("bbox") or []
+        if not name or len(bbox) != 4:
+            return
+        cell = (name, int(bbox[0] // GRID_CELL), int(bbox[1] // GRID_CELL))
+        self._spatial[cell].add(node_key)
+        self._spatial_cell[node_key] = cell
+
+    def _unindex_spatial(self, node_key: str) -> None:
+        cell = self._spatial_cell.pop(node_key, None)
+        if cell is not None:
+            self._spatial[cell].discard(node_key)
+            if not self._spatial[cell]:
+                del self._spatial[cell]
+
+    def _unindex_node(self, state_id: str, node_id: str) -> None:
+        node_key = self.key(state_id, node_id)
+        if self._nodes.pop(node_key, None) is None:
+            return
+        self._node_states[node_id].remove(state_id)
+        if not self._node_states[node_id]:
+            del self._node_states[node_id]
+        self._by_status[self._node_status.pop(node_key)].discard(node_key)
+        self._unindex_spatial(node_key)
+
+    def _index_edge(self, edge: Dict) -> None:
+        from_state, to_state = edge.get("from"), edge.get("to")
+        if from_state and to_state:
+            self._edges_from[from_state].append(edge)
+            self._edges_to[to_state].append(edge)
+            if (from_state, to_state) not in self._edge_by_pair:
+                self._edge_by_pair[(from_state, to_state)] = edge
+                self._neighbours[from_state].append(to_state)
+
+    # =====================================================================
+    # STATES AND NODES
+    # =====================================================================
+
+    @property
+    def states(self) -> Dict[str, Dict]:
+        return self.data["states"]
+
+    def state(self, state_id: str) -> Optional[Dict]:
+        return self.data["states"].get(state_id)
+
+    def add_state(self, state_id: str, state_data: Dict) -> None:
+        """Add (or replace) a state together with the nodes it already holds"""
+        previous = self.data["states"].get(state_id)
+        if previous is not None:
+            for node_id in list(previous.get("nodes", {})):
+                self._unindex_node(state_id, node_id)
+
+        self.data["states"][state_id] = state_data
+        for node_id, node_data in state_data.setdefault("nodes", {}).items():
+            self._index_node(state_id, node_id, node_data)
+
+    def add_node(self, state_id: str, node_id: str, node_data: Dict) -> str:
+        """Add (or replace) a node of an existing state; returns its key"""
+        self._unindex_node(state_id, node_id)
+        self.data["states"][state_id].setdefault("nodes", {})[node_id] = node_data
+        self._index_node(state_id, node_id, node_data)
+        return self.key(state_id, node_id)
+
+    def update_node(self, node_key: str, **fields) -> Optional[Dict]:
+        """Change node fields (g_icon_name, bbox, ...) keeping the indexes in sync; status goes through set_status"""
+        node_key = self.resolve(node_key)
+        if not node_key:
+            return None
+        status = fields.pop("status", None)
+        node_data = self._nodes[node_key]
+        self._unindex_spatial(node_key)
+        node_data.update(fields)
+        self._index_spatial(node_key, node_data)
+        if status is not None:
+            self.set_status(node_key, status)
+        return node_data
+
+    def nodes_near(self, name: str, bbox: List[int], tolerance: float) -> List[str]:
+        """
+        Keys of nodes with this (normalized) name whose top-left corner is less than
+        `tolerance` px away from bbox's on both axes - only neighbouring grid cells are read
+        """
+        name = normalize_name(name)
+        if not name or len(bbox) != 4:
+            return []
+
+        x1, y1 = bbox[0], bbox[1]
+        reach = max(1, math.ceil(tolerance / GRID_CELL))
+        cell_x, cell_y = int(x1 // GRID_CELL), int(y1 // GRID_CELL)
+        matches = []
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                for node_key in self._spatial.get((name, cell_x + dx, cell_y + dy), ()):
+                    existing = self._nodes[node_key]["bbox"]
+                    if abs(x1 - existing[0]) < tolerance and abs(y1 - existing[1]) < tolerance:
+                        matches.append(node_key)
+        return matches
+
+    def resolve(self, node_key: str) -> Optional[str]:
+        """Full "state::node" key of a node (bare ids: first state holding it), None if unknown"""
+        if node_key in self._nodes:
+            return node_key
+        state_id, node_id = self.split_key(node_key)
+        if state_id is None and self._node_states.get(node_id):
+            return self.key(self._node_states[node_id][0], node_id)
+        return None
+
+    def node(self, node_key: str) -> Optional[Dict]:
+        """Node data for a "state::node" key or a bare node id"""
+        node_key = self.resolve(node_key)
+        return self._nodes[node_key] if node_key else None
+
+    def node_state(self, node_key: str) -> Optional[str]:
+        """State holding a node, None if unknown"""
+        node_key = self.resolve(node_key)
+        return self.split_key(node_key)[0] if node_key else None
+
+    def __contains__(self, node_key: str) -> bool:
+        return self.resolve(node_key) is not None
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    # =====================================================================
+    # STATUS
+    # =====================================================================
+
+    def status(self, node_key: str) -> Optional[str]:
+        node_key = self.resolve(node_key)
+        return self._node_status[node_key] if node_key else None
+
+    def set_status(self, node_key: str, status: str) -> Optional[Dict]:
+        """Move a node to another status bucket and record it on the node; returns the node (None if unknown)"""
+        node_key = self.resolve(node_key)
+        if not node_key:
+            return None
+
+        previous = self._node_status[node_key]
+        if previous != status:
+            self._by_status[previous].discard(node_key)
+            self._by_status[status].add(node_key)
+            self._node_status[node_key] = status
+        node_data = self._nodes[node_key]
+        node_data["status"] = status
+        return node_data
+
+    def nodes_with_status(self, status: str) -> Set[str]:
+        """Keys of the nodes in a status (the live index - change it only via set_status)"""
+        return self._by_status[status]
+
+    def count(self, *statuses: str) -> int:
+        return sum(len(self._by_status[status]) for status in statuses)
+
+    # =====================================================================
+    # EDGES
+    # =====================================================================
+
+    @property
+    def edges(self) -> List[Dict]:
+        return self.data["edges"]
+
+    def add_edge(self, edge: Dict) -> None:
+        self.data["edges"].append(edge)
+        self._index_edge(edge)
+
+    def edges_from(self, state_id: str) -> List[Dict]:
+        return self._edges_from.get(state_id, [])
+
+    def edges_to(self, state_id: str) -> List[Dict]:
+        return self._edges_to.get(state_id, [])
+
+    def edge_between(self, from_state: str, to_state: str) -> Optional[Dict]:
+        """First recorded edge from_state -> to_state"""
+        return self._edge_by_pair.get((from_state, to_state))
+
+    def neighbours(self, state_id: str) -> List[str]:
+        """Distinct target states reachable in one click, in edge order"""
+        return self._neighbours.get(state_id, [])
+
+
+def test_fdom_model() -> bool:
+    """Index consistency under adds/status moves, and constant-time lookups on a large fDOM"""
+    fdom_data = {"states": {"root": {"nodes": {
+        "H0_1": {"status": "pending"}, "H0_2": {"status": "explored"}, "H0_3": {}
+    }}}, "edges": []}
+    model = FDOMModel(fdom_data)
+    assert model.count("pending") == 2 and model.count("explored") == 1
+    assert model.node("root::H0_1") is fdom_data["states"]["root"]["nodes"]["H0_1"]
+    assert model.node_state("H0_2") == "root" and model.node("missing::H0_1") is None
+
+    model.add_state("root_file", {"parent": "root", "nodes": {"H0_1": {"g_icon_name": "Save"}}})
+    model.add_edge({"from": "root", "to": "root_file", "action": "click:H0_1"})
+    model.set_status("root::H0_1", "explored")
+    assert fdom_data["states"]["root"]["nodes"]["H0_1"]["status"] == "explored"
+    assert model.nodes_with_status("pending") == {"root::H0_3", "root_file::H0_1"}
+    assert model.node("H0_1") is fdom_data["states"]["root"]["nodes"]["H0_1"]  # Bare id -> first state
+    assert model.edge_between("root", "root_file")["action"] == "click:H0_1"
+    assert model.neighbours("root") == ["root_file"] and model.edges_to("root_file")
+
+    # Replacing a state drops its old nodes from every index
+    model.add_state("root_file", {"nodes": {"H1_1": {"status": "non_interactive"}}})
+    assert "root_file::H0_1" not in model and model.count("non_interactive") == 1
+    assert model.nodes_with_status("pending") == {"root::H0_3"}
+
+    # Indexed model equals a fresh index of the same dict
+    fresh = FDOMModel(fdom_data)
+    for status in ("pending", "explored", "non_interactive"):
+        assert fresh.nodes_with_status(status) == model.nodes_with_status(status), status
+
+    # Lookup and status cost must not grow with the graph
+    def build(state_count: int) -> FDOMModel:
+        data = {"states": {f"S{s}": {"nodes": {f"H{n}": {} for n in range(100)}} for s in range(state_count)},
+                "edges": [{"from": f"S{s}", "to": f"S{s + 1}"} for s in range(state_count - 1)]}
+        return FDOMModel(data)
+
+    def per_op(model: FDOMModel, state_count: int) -> float:
+        keys = [f"S{state_count - 1}::H{n}" for n in range(100)]
+        start = time.perf_counter()
+        for _ in range(50):
+            for node_key in keys:
+                model.node(node_key)
+                model.set_status(node_key, "explored")
+                model.set_status(node_key, "pending")
+        return (time.perf_counter() - start) / (50 * len(keys))
+
+    small, large = per_op(build(10), 10), per_op(build(1000), 1000)
+    assert large < small * 5, (small, large)
+
+    # Spatial index: same answers as a scan over every node, also after renames and replaced states
+    import random
+    rng = random.Random(7)
+    names = ["file", "edit", "view", "save", "close", "ok"]
+    spatial = FDOMModel({"states": {}, "edges": []})
+    for s in range(200):
+        spatial.add_state(f"S{s}", {"nodes": {
+            f"H{n}": {"g_icon_name": rng.choice(names).upper() + " ", "bbox": [x, y, x + 40, y + 20]}
+            for n in range(50) for x, y in [(rng.randrange(0, 2800), rng.randrange(0, 1700))]
+        }})
+    spatial.update_node("S3::H1", g_icon_name="Renamed")
+    spatial.add_state("S4", {"nodes": {"H0": {"g_icon_name": "file", "bbox": [10, 10, 50, 30]}}})
+
+    def scan(name, bbox, tolerance):
+        return sorted(node_key for node_key, node_data in spatial._nodes.items()
+                      if normalize_name(node_data.get("g_icon_name")) == name
+                      and abs(bbox[0] - node_data["bbox"][0]) < tolerance
+                      and abs(bbox[1] - node_data["bbox"][1]) < tolerance)
+
+    queries = [(rng.choice(names + ["renamed"]), [rng.randrange(0, 2800), rng.randrange(0, 1700), 0, 0],
+                rng.choice([10, 30, 50, 150])) for _ in range(500)]
+    queries.append(("renamed", spatial.node("S3::H1")["bbox"], 10))
+    for name, bbox, tolerance in queries:
+        assert sorted(spatial.nodes_near(name, bbox, tolerance)) == scan(name, bbox, tolerance), (name, bbox, tolerance)
+    assert spatial.nodes_near("renamed", spatial.node("S3::H1")["bbox"], 10) == ["S3::H1"]
+
+    start = time.perf_counter()
+    for name, bbox, tolerance in queries:
+        spatial.nodes_near(name, bbox, min(tolerance, 50))
+    near_time = (time.perf_counter() - start) / len(queries)
+
+    print(f"✅ FDOMModel: indexes consistent; lookup + 2 status moves {small * 1e6:.1f}µs at 1K nodes, "
+          f"{large * 1e6:.1f}µs at 100K nodes; duplicate lookup {near_time * 1e6:.1f}µs among {len(spatial)} nodes")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Indexed in-memory fDOM model")
+    parser.add_argument("--test", action="store_true", help="Run the fDOM model self-test")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_fdom_model() else 1)
+    else:
+        print("Usage: python fdom_model.py --test")
@@ -5,6 +5,7 @@ from rich.console import Console
 from pathlib import Path
 
 from .interaction_types import BacktrackStrategy
+from .navigation_index import CostModel, NavigationIndex, NavigationPlan, ROOT_STATE
 
 
 class NavigationEngine:
@@ -18,87 +19,95 @@ class NavigationEngine:
         self.console = Console()
         # ✅ Track navigation chain for backtracking
         self.navigation_chain = []  # [C1, C2, C3] in order of clicking
+        # Shortest paths between states, cached per source and kept in step with new edges
+        config = state_manager.config
+        self.navigation_index = NavigationIndex(state_manager, CostModel(
+            hop_seconds=config.get("navigation.planner_default_hop_seconds", 2.0),
+            restart_seconds=config.get("navigation.planner_default_restart_seconds", 12.0)
+        ))
     
     def navigate_to_state(self, target_state: str, current_state: str) -> bool:
         """Enhanced navigation with MULTI-HOP support"""
         
         self.console.print(f"[cyan]🧭 NAVIGATION: {current_state} → {target_state}[/cyan]")
         
-        # ✅ FIND NAVIGATION PATH using breadth-first search
-        navigation_path = self._find_navigation_path(current_state, target_state)
+        # ✅ PLAN: least expected time over measured hops, restart + replay from root as a candidate
+        plan = self._plan_navigation(current_state, target_state)
         
-        if not navigation_path:
+        if not plan:
             self.console.print(f"[red]❌ No navigation path found from {current_state} to {target_state}[/red]")
             return False
         
-        self.console.print(f"[cyan]🗺️ Navigation path: {' → '.join(navigation_path)}[/cyan]")
+        restart_note = "restart app → " if plan.restart else ""
+        self.console.print(f"[cyan]🗺️ Navigation path: {restart_note}{' → '.join(plan.states)} (expected {plan.expected_seconds:.1f}s)[/cyan]")
         
-        # ✅ EXECUTE MULTI-HOP NAVIGATION
-        current = current_state
+        if plan.restart and not self._restart_to_root():
+            self.console.print(f"[red]❌ Restart for navigation failed[/red]")
+            return False
+        
+        # ✅ EXECUTE MULTI-HOP NAVIGATION (every hop is timed for the planner)
+        navigation_path = plan.states
+        current = navigation_path[0]
         for i in range(1, len(navigation_path)):
             next_state = navigation_path[i]
             
             self.console.print(f"[cyan]🚀 Step {i}: {current} → {next_state}[/cyan]")
             
+            hop_started = time.time()
             if not self._execute_single_hop(current, next_state):
+                self.navigation_index.record_hop(current, next_state, time.time() - hop_started, False)
+                self.state_manager.save_fdom_to_file()
                 self.console.print(f"[red]❌ Failed at step {i}: {current} → {next_state}[/red]")
                 return False
             
+            # Wait for UI transition (the hop's click already waited for the change - this only confirms it settled)
+            self.element_interactor.screenshot_manager.wait_for_ui_settle(timeout=1)
+            self.navigation_index.record_hop(current, next_state, time.time() - hop_started, True)
+            
             current = next_state
             self.element_interactor.current_state_id = current
-            
-            # Wait for UI transition
-            time.sleep(1)
         
+        self.state_manager.save_fdom_to_file()
         self.console.print(f"[green]✅ Multi-hop navigation successful: {current_state} → {target_state}[/green]")
         return True
     
-    def _find_navigation_path(self, start_state: str, target_state: str) -> List[str]:
-        """Find shortest path between states using BFS"""
-        if start_state == target_state:
-            return [start_state]
-        
-        # Build graph from edges
-        graph = {}
-        edges = self.state_manager.fdom_data.get("edges", [])
-        
-        for edge in edges:
-            from_state = edge.get("from")
-            to_state = edge.get("to")
-            if from_state and to_state:
-                if from_state not in graph:
-                    graph[from_state] = []
-                graph[from_state].append(to_state)
+    def _plan_navigation(self, start_state: str, target_state: str) -> Optional[NavigationPlan]:
+        """Plan by expected time (fewest hops if navigation.path_planning_algorithm is shortest_path)"""
+        config = self.state_manager.config
+        if config.get("navigation.path_planning_algorithm", "expected_time") == "shortest_path":
+            path = self._find_navigation_path(start_state, target_state)
+            return NavigationPlan(path, self.navigation_index.path_seconds(path)) if path else None
+        
+        return self.navigation_index.plan(
+            start_state, target_state,
+            allow_restart=config.get("navigation.allow_restart_plans", True)
+        )
+    
+    def _restart_to_root(self) -> bool:
+        """Close and relaunch the app so it shows root (restart plans); the time it takes is recorded"""
+        restart_started = time.time()
         
-        # BFS to find shortest path
-        from collections import deque
+        if self.app_controller.current_app_info and self._verify_app_still_running():
+            self.app_controller.gui_api.close_window(self.app_controller.current_app_info["window_id"])
+            time.sleep(2)  # Wait for close
         
-        queue = deque([(start_state, [start_state])])
-        visited = {start_state}
+        restart_success = self.element_interactor._restart_app_for_exploration()
+        self.navigation_index.record_restart(time.time() - restart_started, restart_success)
         
-        while queue:
-            current_state, path = queue.popleft()
-            
-            if current_state == target_state:
-                return path
-            
-            for neighbor in graph.get(current_state, []):
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append((neighbor, path + [neighbor]))
-        
-        return []  # No path found
+        if restart_success:
+            self.navigation_chain.clear()
+            self.element_interactor.current_state_id = ROOT_STATE
+        return restart_success
+    
+    def _find_navigation_path(self, start_state: str, target_state: str) -> List[str]:
+        """Find shortest path between states (cached BFS tree of start_state), [] if none"""
+        return self.navigation_index.shortest_path(start_state, target_state)
     
     def _execute_single_hop(self, from_state: str, to_state: str) -> bool:
         """Execute single navigation hop (original logic)"""
         # Find the edge that leads to to_state
-        edges = self.state_manager.fdom_data.get("edges", [])
-        target_edge = None
-        
-        for edge in edges:
-            if edge.get("from") == from_state and edge.get("to") == to_state:
-                target_edge = edge
-                break
+        model = self.state_manager.model
+        target_edge = self.navigation_index.edge(from_state, to_state)
         
         if not target_edge:
             self.console.print(f"[red]❌ No edge found: {from_state} → {to_state}[/red]")
@@ -117,8 +126,7 @@ class NavigationEngine:
             clean_trigger_id = trigger_node_id
         
         # Find trigger node in from_state
-        from_state_data = self.state_manager.fdom_data["states"].get(from_state, {})
-        trigger_node = from_state_data.get("nodes", {}).get(clean_trigger_id)
+        trigger_node = model.node(model.key(from_state, clean_trigger_id))
         
         if not trigger_node:
             self.console.print(f"[red]❌ Trigger node {clean_trigger_id} not found in {from_state}[/red]")
@@ -256,7 +264,7 @@ class NavigationEngine:
                     
                     if click_result.success:
                         self.console.print(f"[green]✅ Reverse navigation successful: {nav_step['element_name']}[/green]")
-                        time.sleep(1)
+                        self.element_interactor.screenshot_manager.wait_for_ui_settle(timeout=1)
                         # Remove this and subsequent steps from chain
                         self.navigation_chain = self.navigation_chain[:i]
                         return True
@@ -413,7 +421,7 @@ class NavigationEngine:
                         
                         if click_result.success:
                             self.console.print(f"[green]✅ Learned strategy executed successfully[/green]")
-                            time.sleep(1)
+                            self.element_interactor.screenshot_manager.wait_for_ui_settle(timeout=1)
                             return True
                         else:
                             self.console.print(f"[yellow]⚠️ Learned click failed: {click_result.error_message}[/yellow]")
@@ -640,10 +648,7 @@ class NavigationEngine:
             root_image = root_state_data.get("image")
             
             if root_image and Path(root_image).exists():
-                hash1 = self.visual_differ.calculate_image_hash(verification_screenshot)
-                hash2 = self.visual_differ.calculate_image_hash(root_image)
-                
-                if hash1 == hash2:
+                if not self.visual_differ.has_changed(verification_screenshot, root_image):
                     self.console.print(f"[green]✅ Backtrack verification: Successfully reached {target_state_id}[/green]")
                     self.element_interactor.current_state_id = target_state_id
                     return True
@@ -890,7 +895,7 @@ class NavigationEngine:
                 
                 if click_result.success:
                     self.console.print(f"[green]✅ Opener button clicked successfully[/green]")
-                    time.sleep(1)
+                    self.element_interactor.screenshot_manager.wait_for_ui_settle(timeout=1)
                     return True
         
         self.console.print(f"[yellow]⚠️ Could not find or click opener button[/yellow]")
@@ -1174,11 +1179,9 @@ class NavigationEngine:
                 if not after_screenshot:
                     continue
                 
-                # ✅ CORRECTED: Use the actual method name
-                hash_before = self.visual_differ.calculate_image_hash(before_screenshot)
-                hash_after = self.visual_differ.calculate_image_hash(after_screenshot)
-                
-                if hash_before == hash_after:
+                # Hover highlights/tooltips appear under the cursor - compare that spot exactly
+                hover_point = (candidate_x - window_pos['left'], candidate_y - window_pos['top'])
+                if not self.visual_differ.has_changed(before_screenshot, after_screenshot, focus=hover_point):
                     # ✅ No changes - this area is safe!
                     validated_safe_areas.append((candidate_x, candidate_y))
                     self.console.print(f"[dim]✅ Validated header safe area: ({candidate_x}, {candidate_y})[/dim]")
@@ -1310,24 +1313,16 @@ class NavigationEngine:
                 if problematic_node and from_state:
                     self.console.print(f"[yellow]📝 Marking {problematic_node} as 'explored' (caused navigation issues)[/yellow]")
                     
-                    # Update FDOM status
-                    fdom_data = self.state_manager.fdom_data
-                    if (from_state in fdom_data.get("states", {}) and 
-                        problematic_node in fdom_data["states"][from_state].get("nodes", {})):
-                        
-                        node_data = fdom_data["states"][from_state]["nodes"][problematic_node]
-                        node_data["status"] = "explored"
+                    # Update FDOM status (also takes it out of the pending set)
+                    model = self.state_manager.model
+                    node_data = model.set_status(model.key(from_state, problematic_node), "explored")
+                    if node_data is not None:
                         node_data["exploration_result"] = "navigation_failed_restart_required"
                         node_data["exploration_timestamp"] = time.time()
                         
                         # Save to file
                         self.state_manager.save_fdom_to_file()
                         
-                        # Remove from pending sets
-                        if hasattr(self.state_manager, 'pending_nodes'):
-                            pending_id = f"{from_state}::{problematic_node}"
-                            self.state_manager.pending_nodes.discard(pending_id)
-                        
                         self.console.print(f"[green]✅ Marked {problematic_node} as explored in FDOM[/green]")
                     else:
                         self.console.print(f"[yellow]⚠️ Could not find {problematic_node} in FDOM to mark as explored[/yellow]")
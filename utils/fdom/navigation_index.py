@@ -0,0 +1,355 @@
+"""
+NavigationIndex - cached shortest paths over the fDOM state graph
+Shortest-path trees are computed once per source state and reused for every target:
+by clicks (BFS) and by expected time (Dijkstra over measured hop latencies and success
+rates). Edges are only ever appended, so the index follows the model lazily: on each
+query it looks at the edges added since the last one and drops just the trees a new
+edge can shorten; a re-timed edge likewise drops only the trees it can change. Loading
+another fDOM (a new model) resets it.
+"""
+import heapq
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+ROOT_STATE = "root"  # Where the app opens after a restart
+
+# Per source: state -> (hop distance or expected seconds, previous state on the path)
+PathTree = Dict[str, Tuple[float, Optional[str]]]
+
+def record_attempt(stats: Dict, seconds: float, success: bool) -> Dict:
+    """Add one timed attempt to a {"attempts", "successes", "seconds"} record"""
+    stats["attempts"] = stats.get("attempts", 0) + 1
+    stats["successes"] = stats.get("successes", 0) + (1 if success else 0)
+    stats["seconds"] = round(stats.get("seconds", 0.0) + seconds, 3)
+    return stats
+
+@dataclass
+class CostModel:
+    """Expected seconds of a transition from its measurements, with a prior for unmeasured ones"""
+    hop_seconds: float = 2.0        # Prior mean time of a click hop
+    restart_seconds: float = 12.0   # Prior mean time of an app restart (until root is shown)
+    prior_success: float = 0.9      # Prior success rate
+    prior_weight: float = 1.0       # How many attempts the prior counts as
+    min_success: float = 0.05       # Floor, so a transition that always failed stays finite (but avoided)
+
+    def expected_seconds(self, stats: Optional[Dict], prior_seconds: float) -> float:
+        """Mean attempt time / success rate = expected time until the transition succeeds"""
+        stats = stats or {}
+        attempts = stats.get("attempts", 0) + self.prior_weight
+        mean_seconds = (stats.get("seconds", 0.0) + prior_seconds * self.prior_weight) / attempts
+        success_rate = (stats.get("successes", 0) + self.prior_success * self.prior_weight) / attempts
+        return mean_seconds / max(success_rate, self.min_success)
+
+@dataclass
+class NavigationPlan:
+    """How to reach a target state"""
+    states: List[str]           # States passed through (starting at root for a restart plan)
+    expected_seconds: float
+    restart: bool = False       # Restart the app first, then replay the path from root
+
+
+class NavigationIndex:
+    """Shortest navigation paths between fDOM states, cached per source state"""
+
+    def __init__(self, state_manager, cost_model: CostModel = None):
+        self.state_manager = state_manager
+        self.cost_model = cost_model or CostModel()
+        self._model = None
+        self._synced_edges = 0
+        self._trees: Dict[str, PathTree] = {}
+        self._cost_trees: Dict[str, PathTree] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _sync(self):
+        """Catch up with the model: reset on a new model, otherwise invalidate for new edges only"""
+        model = self.state_manager.model
+        if model is not self._model:
+            self._model = model
+            self._synced_edges = 0
+            self._trees.clear()
+            self._cost_trees.clear()
+
+        edges = model.edges
+        for edge in edges[self._synced_edges:]:
+            self._invalidate_for(edge)
+        self._synced_edges = len(edges)
+        return model
+
+    def _invalidate_for(self, edge: Dict) -> None:
+        """
+        Drop the trees a new edge u -> v can change: those reaching u where v is unreached,
+        or reached no earlier than through u (ties too, so cached paths equal a fresh BFS)
+        """
+        from_state, to_state = edge.get("from"), edge.get("to")
+        if not from_state or not to_state or self._model.edge_between(from_state, to_state) is not edge:
+            return  # Invalid, or a repeat of a known transition - the adjacency is unchanged
+
+        for source in list(self._trees):
+            tree = self._trees[source]
+            if from_state not in tree:
+                continue
+            if to_state not in tree or tree[from_state][0] + 1 <= tree[to_state][0]:
+                del self._trees[source]
+        self._invalidate_costs(from_state, to_state, self.edge_seconds(edge))
+
+    def _invalidate_costs(self, from_state: str, to_state: str, seconds: float) -> None:
+        """Drop the cost trees an edge of this weight can improve, or whose path runs through it"""
+        for source in list(self._cost_trees):
+            tree = self._cost_trees[source]
+            if from_state not in tree:
+                continue
+            if (to_state not in tree or tree[to_state][1] == from_state
+                    or tree[from_state][0] + seconds <= tree[to_state][0]):
+                del self._cost_trees[source]
+
+    def _tree(self, model, source: str) -> PathTree:
+        tree = self._trees.get(source)
+        if tree is not None:
+            self.hits += 1
+            return tree
+
+        self.misses += 1
+        tree = {source: (0, None)}
+        queue = deque([source])
+        while queue:
+            state_id = queue.popleft()
+            distance = tree[state_id][0] + 1
+            for neighbour in model.neighbours(state_id):
+                if neighbour not in tree:
+                    tree[neighbour] = (distance, state_id)
+                    queue.append(neighbour)
+        self._trees[source] = tree
+        return tree
+
+    def shortest_path(self, start_state: str, target_state: str) -> List[str]:
+        """States from start_state to target_state (both included), [] if unreachable"""
+        if start_state == target_state:
+            return [start_state]
+
+        model = self._sync()
+        tree = self._tree(model, start_state)
+        if target_state not in tree:
+            return []
+
+        path = [target_state]
+        while path[-1] != start_state:
+            path.append(tree[path[-1]][1])
+        path.reverse()
+        return path
+
+    def distance(self, start_state: str, target_state: str) -> Optional[int]:
+        """Clicks needed from start_state to target_state, None if unreachable"""
+        model = self._sync()
+        entry = self._tree(model, start_state).get(target_state)
+        return entry[0] if entry else None
+
+    def edge(self, from_state: str, to_state: str) -> Optional[Dict]:
+        """Edge to click for one hop"""
+        return self.state_manager.model.edge_between(from_state, to_state)
+
+    # =====================================================================
+    # COST-AWARE PLANNING
+    # =====================================================================
+
+    def edge_seconds(self, edge: Dict) -> float:
+        return self.cost_model.expected_seconds(edge.get("stats"), self.cost_model.hop_seconds)
+
+    def restart_seconds(self) -> float:
+        restart_stats = self.state_manager.model.data.get("navigation_costs", {}).get("restart")
+        return self.cost_model.expected_seconds(restart_stats, self.cost_model.restart_seconds)
+
+    def path_seconds(self, states: List[str]) -> float:
+        """Expected seconds to walk a path of states"""
+        return sum(self.edge_seconds(self.edge(a, b)) for a, b in zip(states, states[1:]))
+
+    def _cost_tree(self, model, source: str) -> PathTree:
+        tree = self._cost_trees.get(source)
+        if tree is not None:
+            self.hits += 1
+            return tree
+
+        self.misses += 1
+        tree = {}
+        order = itertools.count()  # Ties: first pushed first, so equal-cost paths keep edge order
+        heap = [(0.0, next(order), source, None)]
+        while heap:
+            seconds, _, state_id, previous = heapq.heappop(heap)
+            if state_id in tree:
+                continue
+            tree[state_id] = (seconds, previous)
+            for neighbour in model.neighbours(state_id):
+                if neighbour not in tree:
+                    edge = model.edge_between(state_id, neighbour)
+                    heapq.heappush(heap, (seconds + self.edge_seconds(edge), next(order), neighbour, state_id))
+        self._cost_trees[source] = tree
+        return tree
+
+    def cheapest_path(self, start_state: str, target_state: str) -> Tuple[List[str], float]:
+        """Path with the least expected time and that time; ([], inf) if unreachable"""
+        if start_state == target_state:
+            return [start_state], 0.0
+
+        model = self._sync()
+        tree = self._cost_tree(model, start_state)
+        if target_state not in tree:
+            return [], float("inf")
+
+        path = [target_state]
+        while path[-1] != start_state:
+            path.append(tree[path[-1]][1])
+        path.reverse()
+        return path, tree[target_state][0]
+
+    def plan(self, start_state: str, target_state: str, allow_restart: bool = True) -> Optional[NavigationPlan]:
+        """
+        Cheapest way to target_state: the direct path, or restarting the app and replaying
+        the path from root - whichever is expected to take less time (None if neither exists)
+        """
+        path, seconds = self.cheapest_path(start_state, target_state)
+        best = NavigationPlan(path, seconds) if path else None
+
+        if allow_restart and start_state != ROOT_STATE and ROOT_STATE in self.state_manager.model.states:
+            root_path, root_seconds = self.cheapest_path(ROOT_STATE, target_state)
+            restart_seconds = self.restart_seconds() + root_seconds
+            if root_path and (best is None or restart_seconds < best.expected_seconds):
+                best = NavigationPlan(root_path, restart_seconds, restart=True)
+        return best
+
+    def record_hop(self, from_state: str, to_state: str, seconds: float, success: bool) -> None:
+        """Store a timed hop on its edge (saved with the fDOM) and drop the cost trees it re-weights"""
+        self._sync()
+        edge = self.edge(from_state, to_state)
+        if edge is None:
+            return
+        record_attempt(edge.setdefault("stats", {}), seconds, success)
+        self._invalidate_costs(from_state, to_state, self.edge_seconds(edge))
+
+    def record_restart(self, seconds: float, success: bool) -> None:
+        """Store a timed app restart (saved with the fDOM under navigation_costs)"""
+        costs = self.state_manager.model.data.setdefault("navigation_costs", {})
+        record_attempt(costs.setdefault("restart", {}), seconds, success)
+
+
+def test_navigation_index() -> bool:
+    """Cached paths always equal a fresh BFS while edges are added; repeated queries are cache hits"""
+    import random
+    from types import SimpleNamespace
+    from fdom_model import FDOMModel
+
+    def fresh_bfs(edges: List[Dict], start: str, target: str) -> List[str]:
+        graph = {}
+        for edge in edges:
+            graph.setdefault(edge["from"], []).append(edge["to"])
+        queue = deque([(start, [start])])
+        visited = {start}
+        while queue:
+            state_id, path = queue.popleft()
+            if state_id == target:
+                return path
+            for neighbour in graph.get(state_id, []):
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    queue.append((neighbour, path + [neighbour]))
+        return []
+
+    rng = random.Random(3)
+    states = ["root"] + [f"S{i}" for i in range(59)]
+    state_manager = SimpleNamespace(model=FDOMModel({"states": {s: {"nodes": {}} for s in states}, "edges": []}))
+    index = NavigationIndex(state_manager)
+
+    for step in range(400):
+        from_state, to_state = rng.choice(states), rng.choice(states)
+        if from_state != to_state:
+            state_manager.model.add_edge({"from": from_state, "to": to_state, "action": f"click:H{step}"})
+        if step % 10 == 0:
+            for _ in range(20):
+                start, target = rng.choice(states), rng.choice(states)
+                expected = fresh_bfs(state_manager.model.edges, start, target) if start != target else [start]
+                assert index.shortest_path(start, target) == expected, (step, start, target)
+
+    # Cost trees: cached answers equal an uncached index and Bellman-Ford while edges are added and re-timed
+    def bellman_ford(start: str, target: str) -> float:
+        best = {start: 0.0}
+        for _ in range(len(states)):
+            for edge in state_manager.model.edges:
+                if edge is state_manager.model.edge_between(edge["from"], edge["to"]) and edge["from"] in best:
+                    seconds = best[edge["from"]] + index.edge_seconds(edge)
+                    if seconds < best.get(edge["to"], float("inf")):
+                        best[edge["to"]] = seconds
+        return best.get(target, float("inf"))
+
+    for step in range(300):
+        if step % 3 == 0:
+            from_state, to_state = rng.choice(states), rng.choice(states)
+            if from_state != to_state:
+                state_manager.model.add_edge({"from": from_state, "to": to_state, "action": f"click:C{step}"})
+        else:
+            edge = rng.choice(state_manager.model.edges)
+            index.record_hop(edge["from"], edge["to"], rng.uniform(0.2, 8.0), rng.random() < 0.8)
+        if step % 15 == 0:
+            uncached = NavigationIndex(state_manager)
+            for _ in range(10):
+                start, target = rng.choice(states), rng.choice(states)
+                path, seconds = index.cheapest_path(start, target)
+                assert (path, seconds) == uncached.cheapest_path(start, target), (step, start, target)
+                assert abs(seconds - bellman_ford(start, target)) < 1e-6 or seconds == bellman_ford(start, target)
+
+    # Restart + replay from root: chosen when the direct route is missing, slow or unreliable
+    state_manager.model = FDOMModel({"states": {s: {"nodes": {}} for s in ("root", "A", "B", "C")}, "edges": [
+        {"from": "root", "to": "A"}, {"from": "A", "to": "B"}, {"from": "root", "to": "C"}
+    ]})
+    plan = index.plan("B", "C")
+    assert plan.restart and plan.states == ["root", "C"], plan
+    assert index.plan("B", "C", allow_restart=False) is None
+
+    state_manager.model.add_edge({"from": "B", "to": "C"})
+    assert not index.plan("B", "C").restart  # One unmeasured click (~2s) beats a restart (~12s)
+    for _ in range(5):
+        index.record_hop("B", "C", 6.0, False)  # A dialog that keeps failing to open
+    assert index.plan("B", "C").restart
+    for _ in range(3):
+        index.record_restart(45.0, True)  # ...until restarts turn out to be slow
+    assert not index.plan("B", "C").restart
+
+    # A loaded fDOM (new model) resets the cache
+    state_manager.model = FDOMModel({"states": {}, "edges": [{"from": "root", "to": "root_file"}]})
+    assert index.shortest_path("root", "root_file") == ["root", "root_file"]
+    assert index.shortest_path("root", "S1") == []
+
+    # Backtracking-style load: the same few sources queried again and again
+    state_manager.model = FDOMModel({"states": {}, "edges": [
+        {"from": f"S{i}", "to": f"S{j}"} for i in range(300) for j in (i + 1, (i * 7) % 300) if i != j
+    ]})
+    index.hits = index.misses = 0
+    start = time.perf_counter()
+    for _ in range(200):
+        for target in range(0, 300, 10):
+            index.shortest_path("S0", f"S{target}")
+    cached = (time.perf_counter() - start) / (200 * 30)
+
+    start = time.perf_counter()
+    for target in range(0, 300, 10):
+        fresh_bfs(state_manager.model.edges, "S0", f"S{target}")
+    uncached = (time.perf_counter() - start) / 30
+
+    print(f"✅ NavigationIndex: cached BFS/Dijkstra paths match uncached ones under edge additions and re-timing; "
+          f"restart plans picked by expected time; "
+          f"{index.hits} hits / {index.misses} misses, {cached * 1e6:.1f}µs per path vs {uncached * 1e6:.0f}µs rebuild + BFS")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cached shortest paths between fDOM states")
+    parser.add_argument("--test", action="store_true", help="Run the navigation index self-test")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_navigation_index() else 1)
+    else:
+        print("Usage: python navigation_index.py --test")
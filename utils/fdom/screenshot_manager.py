@@ -1,13 +1,18 @@
 """Screenshot capture and management"""
 import os
+import sys
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 from rich.console import Console
-from PIL import Image
 import mss
 
+# Add utils directory to path for seraphine_pipeline imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from seraphine_pipeline.frame_store import Frame, frame_store
+from seraphine_pipeline.frame_stability import StabilityConfig, StabilityResult, wait_for_screen_to_settle
+
 
 class ScreenshotManager:
     """Handles screenshot capture, storage, and cleanup"""
@@ -18,8 +23,17 @@ class ScreenshotManager:
         self.console = Console()
         self.debug_mode = debug_mode
         
-    def take_screenshot(self, suffix: str) -> Optional[str]:
-        """Take screenshot of the current app window"""
+    def take_screenshot(self, suffix: str, archive: bool = True) -> Optional[str]:
+        """
+        Take screenshot of the current app window
+        
+        The frame is kept in memory (frame_store) so detection and diffing read it without
+        decoding; the PNG is written in the background. The returned path stays the handle.
+        
+        Args:
+            suffix: Filename suffix
+            archive: Write the PNG at all (False = memory only, e.g. short-lived comparison shots)
+        """
         try:
             if not self.app_controller or not self.app_controller.current_app_info:
                 self.console.print("[red]❌ No app controller or app info available[/red]")
@@ -29,34 +43,22 @@ class ScreenshotManager:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             custom_filename = f"interaction_{timestamp}_{suffix}.png"
             
-            # Get window info
-            window_id = self.app_controller.current_app_info["window_id"]
-            window_info = self.app_controller.gui_api.get_window_info(window_id)
-            
-            if not window_info:
+            window_bbox = self._window_bbox()
+            if not window_bbox:
                 self.console.print("[yellow]🔄 Window lookup failed for screenshot[/yellow]")
                 return None
             
-            # Create bounding box for just the window
-            pos = window_info['window_data']['position']
-            size = window_info['window_data']['size']
-            
-            window_bbox = {
-                'left': pos['x'],
-                'top': pos['y'], 
-                'width': size['width'],
-                'height': size['height']
-            }
-            
             # Capture window area only using mss
             with mss.mss() as sct:
                 window_screenshot = sct.grab(window_bbox)
-                img = Image.frombytes('RGB', window_screenshot.size, window_screenshot.bgra, 'raw', 'BGRX')
                 
-                # Save screenshot
+                # Register the raw BGR frame; PNG encoding happens off the hot path
                 screenshots_dir = self.app_controller.current_app_info["folder_paths"]["screenshots"]
                 screenshot_path = screenshots_dir / custom_filename
-                img.save(screenshot_path)
+                frame_store.put(Frame.from_bgra(
+                    window_screenshot.bgra, window_screenshot.size,
+                    path=str(screenshot_path), origin=(window_bbox['left'], window_bbox['top'])
+                ), archive=archive)
                 
                 self.console.print(f"[green]📸 Screenshot saved: {custom_filename}[/green]")
                 return str(screenshot_path)
@@ -65,6 +67,52 @@ class ScreenshotManager:
             self.console.print(f"[red]❌ Screenshot capture failed: {e}[/red]")
             return None
     
+    def _window_bbox(self) -> Optional[Dict[str, int]]:
+        """Screen rectangle of the current app window (mss format)"""
+        window_id = self.app_controller.current_app_info["window_id"]
+        window_info = self.app_controller.gui_api.get_window_info(window_id)
+        if not window_info:
+            return None
+        
+        pos = window_info['window_data']['position']
+        size = window_info['window_data']['size']
+        return {
+            'left': pos['x'],
+            'top': pos['y'], 
+            'width': size['width'],
+            'height': size['height']
+        }
+    
+    def wait_for_ui_settle(self, timeout: float, reference_screenshot: Optional[str] = None) -> StabilityResult:
+        """
+        Wait until the app window stops changing, at most `timeout` seconds
+        
+        Args:
+            timeout: The fixed delay this replaces - the worst case stays the same
+            reference_screenshot: Screenshot from before the action; the wait ends only after the window changed
+        """
+        config = self.visual_differ.config
+        settings = StabilityConfig(
+            stable_frames=config.get("ui_stability.stable_frames", 3),
+            interval=config.get("ui_stability.interval_seconds", 0.05),
+            timeout=timeout,
+            min_wait=config.get("ui_stability.min_wait_seconds", 0.1),
+            pixel_tolerance=config.get("ui_stability.pixel_tolerance", 12),
+            max_changed_cells=config.get("ui_stability.max_changed_cells", 8)
+        )
+        
+        window_bbox = None
+        if self.app_controller and self.app_controller.current_app_info:
+            window_bbox = self._window_bbox()
+        if not config.get("ui_stability.enabled", True) or not window_bbox:
+            time.sleep(timeout)
+            return StabilityResult(stable=False, changed=True, elapsed=timeout, frames=0)
+        
+        result = wait_for_screen_to_settle(window_bbox, settings, reference_screenshot)
+        state = "settled" if result.stable else ("still changing" if result.changed else "no change")
+        self.console.print(f"[dim]⏱️ UI {state} after {result.elapsed:.2f}s (limit {timeout}s, {result.frames} frames)[/dim]")
+        return result
+    
     def cleanup_screenshot(self, screenshot_path: str) -> None:
         """Delete a single screenshot file - skip in debug mode"""
         if self.debug_mode:
@@ -72,6 +120,8 @@ class ScreenshotManager:
             return
         
         try:
+            if screenshot_path:
+                frame_store.discard(screenshot_path)  # Waits for a pending PNG write first
             if screenshot_path and os.path.exists(screenshot_path):
                 os.remove(screenshot_path)
                 filename = os.path.basename(screenshot_path)
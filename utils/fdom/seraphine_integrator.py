@@ -20,7 +20,10 @@ utils_dir = current_file.parent.parent
 sys.path.append(str(utils_dir))
 
 from config_manager import ConfigManager
-from seraphine import process_image_sync  # FIXED: Use actual function from seraphine.py
+from analysis_cache import AnalysisCache, compute_image_hash, compute_pipeline_version
+from seraphine import process_image_sync, submit_image  # FIXED: Use actual function from seraphine.py
+from seraphine_pipeline.helpers import load_configuration
+from seraphine_pipeline.frame_store import open_frame_image
 
 class SeraphineIntegrator:
     """
@@ -42,14 +45,60 @@ class SeraphineIntegrator:
         # Ensure directories exist
         self.crops_dir.mkdir(parents=True, exist_ok=True)
         
+        # Persistent analysis cache: identical screens (backtracks, app restarts) skip the pipeline
+        self.analysis_cache = None
+        if self.config_manager.get("performance.enable_caching", True):
+            try:
+                cache_dir = self.app_root / self.config_manager.get("storage.cache_subdir", "cache")
+                self.analysis_cache = AnalysisCache(
+                    str(cache_dir / "analysis_cache.db"),
+                    version=compute_pipeline_version(load_configuration()),
+                    max_size_mb=self.config_manager.get("performance.cache_size_limit_mb", 500)
+                )
+            except Exception as e:
+                self.console.print(f"[yellow]⚠️ Analysis cache disabled: {e}[/yellow]")
+        
+        # Shared pipelined service: warm detector sessions and one Gemini rate limit for every caller
+        self.use_pipeline_service = self.config_manager.get("performance.enable_parallel_processing", True)
+        
         self.console.print(f"[bold blue]🔍 SeraphineIntegrator initialized for: {app_name}[/bold blue]")
     
-    def analyze_screenshot(self, screenshot_path: str, state_id: str, source_element_name: Optional[str] = None) -> Dict:
-        """Analyze screenshot and convert to fDOM format"""
+    def _run_seraphine(self, screenshot_path: str) -> Optional[Dict]:
+        """Seraphine result via the shared pipelined service, or a one-off run"""
+        if not self.use_pipeline_service:
+            return process_image_sync(screenshot_path)  # ✅ FIXED: Use imported function directly
+        
+        try:
+            return submit_image(screenshot_path).result()
+        except Exception as e:
+            self.console.print(f"[red]❌ Seraphine pipeline error: {e}[/red]")
+            return None
+    
+    def analyze_screenshot(self, screenshot_path: str, state_id: str, source_element_name: Optional[str] = None,
+                           previous_detections: Optional[List[Dict]] = None, change_mask=None) -> Dict:
+        """
+        Analyze screenshot and convert to fDOM format
+        With previous_detections + change_mask only the changed regions are detected and the
+        returned nodes are the new elements, in full-screenshot coordinates.
+        """
         
-        # Call Seraphine
+        # Call Seraphine (or reuse a cached analysis of the exact same screen)
         self.console.print(f"[cyan]🔍 Analyzing screenshot: {screenshot_path}[/cyan]")
-        seraphine_result = process_image_sync(screenshot_path)  # ✅ FIXED: Use imported function directly
+        incremental = previous_detections is not None and change_mask is not None
+        image_hash, seraphine_result = (None, None) if incremental else self._lookup_cached_analysis(screenshot_path)
+        
+        if incremental:
+            # Depends on the previous frame, so neither the shared service nor the cache applies
+            seraphine_result = process_image_sync(screenshot_path, previous_detections=previous_detections,
+                                                  change_mask=change_mask)
+        elif seraphine_result:
+            self.console.print(f"[green]⚡ Analysis cache hit ({image_hash[:12]}) - skipping Seraphine[/green]")
+        else:
+            seraphine_result = self._run_seraphine(screenshot_path)
+            
+            # Only cache fully labelled results - a Gemini failure should be retried next time
+            if seraphine_result and image_hash and seraphine_result.get('seraphine_gemini_groups'):
+                self.analysis_cache.put(image_hash, seraphine_result)
         
         if not seraphine_result:
             self.console.print("[red]❌ Seraphine analysis failed[/red]")
@@ -100,6 +149,20 @@ class SeraphineIntegrator:
             'total_icons_found': seraphine_result.get('total_icons_found', 0)
         }
     
+    def _lookup_cached_analysis(self, screenshot_path: str):
+        """Return (image_hash, cached_result); image_hash is None when caching is unavailable"""
+        if self.analysis_cache is None:
+            return None, None
+        
+        try:
+            # Config/model/prompt changes since the last call invalidate old entries
+            self.analysis_cache.set_version(compute_pipeline_version(load_configuration()))
+            image_hash = compute_image_hash(screenshot_path)
+            return image_hash, self.analysis_cache.get(image_hash)
+        except Exception as e:
+            self.console.print(f"[yellow]⚠️ Analysis cache lookup failed: {e}[/yellow]")
+            return None, None
+    
     def _display_seraphine_results(self, seraphine_result: Dict):
         """Display seraphine analysis results in rich console"""
         
@@ -314,7 +377,7 @@ class SeraphineIntegrator:
             crops_subfolder.mkdir(parents=True, exist_ok=True)
             
             # Load original image
-            original_image = Image.open(screenshot_path)
+            original_image = open_frame_image(screenshot_path)
             self.console.print(f"[green]✅ Image loaded: {original_image.size}[/green]")
             
             saved_count = 0
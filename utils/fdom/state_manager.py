@@ -18,6 +18,8 @@ from rich import print as rprint
 
 from config_manager import ConfigManager
 from seraphine_integrator import SeraphineIntegrator
+from fdom_store import FDOMStore, write_json_atomic
+from fdom_model import FDOMModel
 
 
 @dataclass
@@ -93,7 +95,7 @@ class StateManager:
         # SEMANTIC NAMING: Start with root
         self.current_state_id = "root"  # ✅ Not "S001"
         
-        # Initialize fDOM with semantic structure
+        # Initialize fDOM with semantic structure (indexed by self.model)
         self.fdom_data = {
             "app_name": app_name,
             "loaded": False,
@@ -103,14 +105,43 @@ class StateManager:
             "edges": []
         }
         
-        # Tracking
-        self.total_nodes = 0
-        self.pending_nodes: Set[str] = set()
-        self.explored_nodes: Set[str] = set()
-        self.non_interactive_nodes: Set[str] = set()
+        # Persistence: "wal" appends only the changes of each save to fdom.wal, "json" rewrites fdom.json
+        self.fdom_path = Path(__file__).parent.parent.parent / "apps" / app_name / "fdom.json"
+        self.store = None
+        if self.config.get("persistence.backend", "wal") == "wal":
+            self.store = FDOMStore(
+                self.fdom_path,
+                compact_bytes=int(self.config.get("persistence.compact_wal_mb", 8) * 1024 * 1024),
+                fsync=self.config.get("persistence.fsync", True)
+            )
         
         self.console.print(f"[green]🧠 StateManager initialized for: {app_name}[/green]")
     
+    @property
+    def fdom_data(self) -> Dict:
+        return self.model.data
+    
+    @fdom_data.setter
+    def fdom_data(self, fdom_data: Dict) -> None:
+        self.model = FDOMModel(fdom_data)
+    
+    # Tracking sets are the model's status buckets ("state::node" keys) - change them via the model
+    @property
+    def pending_nodes(self) -> Set[str]:
+        return self.model.nodes_with_status("pending")
+    
+    @property
+    def explored_nodes(self) -> Set[str]:
+        return self.model.nodes_with_status("explored")
+    
+    @property
+    def non_interactive_nodes(self) -> Set[str]:
+        return self.model.nodes_with_status("non_interactive")
+    
+    @property
+    def total_nodes(self) -> int:
+        return self.model.count("pending", "explored", "non_interactive")
+    
     def create_initial_fdom_state(self, screenshot_path: str) -> Dict:
         """FIXED: Use semantic naming for root state"""
         self.console.print(f"\n[bold blue]🏗️ CREATING INITIAL ROOT STATE[/bold blue]")
@@ -138,7 +169,6 @@ class StateManager:
         }
         
         # Convert seraphine nodes to fDOM nodes
-        fdom_nodes = []
         for node_id, node_data in seraphine_result['nodes'].items():
             fdom_node = FDOMNode(
                 id=node_id,
@@ -155,9 +185,8 @@ class StateManager:
                 source=node_data['source'],
                 group=node_data['group']
             )
-            fdom_nodes.append(fdom_node)
             
-            # Add to fDOM data
+            # Add to fDOM data (pending for exploration)
             state_data["nodes"][node_id] = fdom_node.to_dict()
             
             # Add to NetworkX graph
@@ -166,13 +195,8 @@ class StateManager:
                 **fdom_node.__dict__
             )
             
-            # Track as pending for exploration
-            self.pending_nodes.add(f"root::{node_id}")
-        
         # Save state to fDOM data
-        self.fdom_data["states"]["root"] = state_data
-        self.total_nodes = len(fdom_nodes)
-        
+        self.model.add_state("root", state_data)
         
         # ✅ FIXED: Save the fDOM data to file
         self.save_fdom_to_file()
@@ -198,15 +222,11 @@ class StateManager:
         Mark a node as explored and update its interaction results
         
         Args:
-            node_id: Node to mark as explored
+            node_id: Node to mark as explored ("state::node", or a bare id)
             click_result: Result state ID if clicking caused state change
             interaction_type: Type of interaction (menu, dialog, etc.)
         """
-        if node_id in self.pending_nodes:
-            self.pending_nodes.remove(node_id)
-            
         if click_result:
-            self.explored_nodes.add(node_id)
             # Update in graph
             if self.exploration_graph.has_node(node_id):
                 self.exploration_graph.nodes[node_id]['status'] = 'explored'
@@ -214,41 +234,56 @@ class StateManager:
                 self.exploration_graph.nodes[node_id]['interaction_type'] = interaction_type
                 
             # Update in fDOM data
-            for state_id, state_data in self.fdom_data["states"].items():
-                if node_id in state_data.get("nodes", {}):
-                    state_data["nodes"][node_id]["status"] = "explored"
-                    if "interactivity" not in state_data["nodes"][node_id]:
-                        state_data["nodes"][node_id]["interactivity"] = {}
-                    state_data["nodes"][node_id]["interactivity"]["click_result"] = click_result
-                    if interaction_type:
-                        state_data["nodes"][node_id]["interactivity"]["type"] = interaction_type
-                    break
+            node_data = self.model.set_status(node_id, "explored")
+            if node_data is not None:
+                interactivity = node_data.setdefault("interactivity", {})
+                interactivity["click_result"] = click_result
+                if interaction_type:
+                    interactivity["type"] = interaction_type
         else:
-            self.non_interactive_nodes.add(node_id)
             # Update status to non_interactive
             if self.exploration_graph.has_node(node_id):
                 self.exploration_graph.nodes[node_id]['status'] = 'non_interactive'
                 
             # Update in fDOM data
-            for state_id, state_data in self.fdom_data["states"].items():
-                if node_id in state_data.get("nodes", {}):
-                    state_data["nodes"][node_id]["status"] = "non_interactive"
-                    break
+            self.model.set_status(node_id, "non_interactive")
+    
+    def load_fdom_from_file(self) -> Optional[Dict]:
+        """
+        Load the saved fDOM (fdom.json plus any logged changes) into fdom_data and index it
+        
+        Returns:
+            The loaded fDOM, or None if this app has none yet
+        """
+        if self.store:
+            fdom_data = self.store.load()
+        elif self.fdom_path.exists():
+            with open(self.fdom_path, 'r', encoding='utf-8') as f:
+                fdom_data = json.load(f)
+        else:
+            fdom_data = None
+        
+        if fdom_data is not None:
+            self.fdom_data = fdom_data
+            self.console.print(f"[green]🔄 Indexed fDOM: {len(self.pending_nodes)} pending, {len(self.explored_nodes)} explored, {len(self.non_interactive_nodes)} non-interactive[/green]")
+        return fdom_data
     
     def save_fdom_to_file(self, output_path: Optional[str] = None) -> str:
         """
-        Save the current fDOM structure to JSON file
+        Save the current fDOM structure
+        
+        With the WAL backend only the changes since the last save are appended to fdom.wal
+        (folded into fdom.json once the log is large); a custom output_path always gets the
+        complete JSON.
         
         Args:
-            output_path: Custom output path, or auto-generate if None
+            output_path: Custom output path (full JSON export), or the app's fdom.json if None
             
         Returns:
             Path where fDOM was saved
         """
         if not output_path:
-            app_dir = Path(__file__).parent.parent.parent / "apps" / self.app_name
-            app_dir.mkdir(parents=True, exist_ok=True)
-            output_path = app_dir / "fdom.json"
+            self.fdom_path.parent.mkdir(parents=True, exist_ok=True)
         
         # Update metadata
         self.fdom_data.update({
@@ -262,40 +297,27 @@ class StateManager:
             }
         })
         
-        # Save to file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(self.fdom_data, f, indent=2, ensure_ascii=False)
+        if output_path or not self.store:
+            output_path = output_path or self.fdom_path
+            write_json_atomic(output_path, self.fdom_data)
+            self.console.print(f"[green]💾 fDOM saved to: {output_path}[/green]")
+            return str(output_path)
         
-        self.console.print(f"[green]💾 fDOM saved to: {output_path}[/green]")
-        return str(output_path)
+        operations = self.store.save(self.fdom_data)
+        if operations:
+            self.console.print(f"[green]💾 fDOM saved: {operations} changes logged to {self.store.wal_path.name}[/green]")
+        else:
+            self.console.print(f"[green]💾 fDOM saved to: {self.fdom_path}[/green]")
+        return str(self.fdom_path)
     
-    def _rebuild_tracking_sets(self) -> None:
-        """FIXED: Handle duplicate node IDs across states"""
-        self.pending_nodes.clear()
-        self.explored_nodes.clear()
-        self.non_interactive_nodes.clear()
-        
-        # Use state-prefixed node IDs to avoid collisions
-        for state_name, state_data in self.fdom_data.get("states", {}).items():
-            nodes = state_data.get("nodes", {})
-            for node_id, node_data in nodes.items():
-                status = node_data.get("status", "pending")
-                
-                # Create unique ID: state_name::node_id
-                unique_node_id = f"{state_name}::{node_id}"
-                
-                if status == "pending":
-                    self.pending_nodes.add(unique_node_id)
-                elif status == "explored":
-                    self.explored_nodes.add(unique_node_id)
-                elif status == "non_interactive":
-                    self.non_interactive_nodes.add(unique_node_id)
-        
-        self.total_nodes = len(self.pending_nodes) + len(self.explored_nodes) + len(self.non_interactive_nodes)
-        
-        self.console.print(f"[green]🔄 Rebuilt tracking sets: {len(self.pending_nodes)} pending, {len(self.explored_nodes)} explored, {len(self.non_interactive_nodes)} non-interactive[/green]")
-        self.console.print(f"[cyan]🧭 Current state: {self.current_state_id}[/cyan]")
-
+    def export_fdom_json(self, output_path: Optional[str] = None) -> str:
+        """Write the complete fdom.json now (folds the change log into the snapshot)"""
+        if output_path or not self.store:
+            return self.save_fdom_to_file(output_path)
+        self.fdom_path.parent.mkdir(parents=True, exist_ok=True)
+        path = self.store.compact(self.fdom_data)
+        self.console.print(f"[green]💾 fDOM exported to: {path}[/green]")
+        return path
     
     def display_exploration_status(self) -> None:
         """Display current exploration status and graph statistics"""
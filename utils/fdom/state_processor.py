@@ -2,7 +2,7 @@
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from rich.console import Console
 
 
@@ -42,11 +42,20 @@ class StateProcessor:
             self.console.print("[red]❌ Failed to extract change regions[/red]")
             return None
         
-        # Analyze with Seraphine using the actual difference image
-        popup_crop_path = diff_result["diff_image_path"]
-        seraphine_result = self.seraphine_integrator.analyze_screenshot(
-            popup_crop_path, new_state_name, source_element_name
+        # ⚡ Incremental: detect only the changed tiles of the full after screenshot (nodes come back in screen coordinates)
+        seraphine_result = self._analyze_incrementally(
+            current_state, before_screenshot, after_screenshot, new_state_name, source_element_name
         )
+        x_offset, y_offset = 0, 0
+        
+        if not seraphine_result or not seraphine_result.get('nodes'):
+            # Analyze with Seraphine using the actual difference image
+            popup_crop_path = diff_result["diff_image_path"]
+            seraphine_result = self.seraphine_integrator.analyze_screenshot(
+                popup_crop_path, new_state_name, source_element_name
+            )
+            unified_region = diff_result["regions"][0]
+            x_offset, y_offset = unified_region[0], unified_region[1]
         
         if not seraphine_result or not seraphine_result.get('nodes'):
             self.console.print("[red]❌ Seraphine analysis failed[/red]")
@@ -59,8 +68,6 @@ class StateProcessor:
         )
         
         # Add elements with coordinate mapping and deduplication
-        unified_region = diff_result["regions"][0]
-        x_offset, y_offset = unified_region[0], unified_region[1]
         
         new_nodes_added = 0
         for popup_node_id, popup_node_data in seraphine_result['nodes'].items():
@@ -73,15 +80,14 @@ class StateProcessor:
             
             if not self._is_duplicate_element(popup_node_data, current_state):
                 new_state_data["nodes"][popup_node_id] = popup_node_data
-                self.state_manager.pending_nodes.add(f"{new_state_name}::{popup_node_id}")
                 new_nodes_added += 1
             else:
                 self.console.print(f"[dim]🔄 Skipped duplicate: {popup_node_data.get('g_icon_name', 'unknown')}[/dim]")
         
         self.console.print(f"[cyan]✅ Added {new_nodes_added}/{len(seraphine_result['nodes'])} new elements[/cyan]")
         
-        # Save state and update tracking
-        self.state_manager.fdom_data["states"][new_state_name] = new_state_data
+        # Save state and update tracking (its nodes are indexed as pending)
+        self.state_manager.model.add_state(new_state_name, new_state_data)
         self.state_manager.mark_node_explored(node_id, click_result=new_state_name, interaction_type="menu")
         self._add_interaction_edge(current_state, new_state_name, node_id)
         self.state_manager.save_fdom_to_file()
@@ -89,6 +95,50 @@ class StateProcessor:
         return new_state_name
 
     
+    def _analyze_incrementally(self, current_state: str, before_screenshot: str, after_screenshot: str,
+                               new_state_name: str, source_element_name: str) -> Optional[Dict]:
+        """Seraphine on the changed regions only, reusing the boxes already known on screen (None = not applicable)"""
+        if not self.seraphine_integrator.config_manager.get("performance.incremental_detection", True):
+            return None
+        
+        previous_detections = self._visible_detections(current_state)
+        if not previous_detections:
+            return None
+        
+        change_mask = self.visual_differ.compute_change_mask(before_screenshot, after_screenshot)
+        if change_mask is None:
+            return None
+        
+        self.console.print(f"[cyan]🧩 Incremental analysis: reusing {len(previous_detections)} known elements[/cyan]")
+        try:
+            seraphine_result = self.seraphine_integrator.analyze_screenshot(
+                after_screenshot, new_state_name, source_element_name,
+                previous_detections=previous_detections, change_mask=change_mask
+            )
+        except Exception as e:
+            self.console.print(f"[yellow]⚠️ Incremental analysis failed ({e}) - falling back to the diff crop[/yellow]")
+            return None
+        
+        if not seraphine_result or not seraphine_result.get('nodes'):
+            self.console.print("[yellow]⚠️ Incremental analysis found no elements - falling back to the diff crop[/yellow]")
+        return seraphine_result
+    
+    def _visible_detections(self, current_state: str) -> List[Dict]:
+        """Boxes on screen in current_state: its own nodes plus those of every parent state"""
+        states = self.state_manager.fdom_data.get("states", {})
+        detections = []
+        seen = set()
+        state_name = current_state
+        while state_name in states and state_name not in seen:
+            seen.add(state_name)
+            state_data = states[state_name]
+            for node_data in state_data.get("nodes", {}).values():
+                bbox = node_data.get('bbox', [])
+                if len(bbox) == 4:
+                    detections.append({'bbox': list(bbox), 'type': node_data.get('type', 'icon')})
+            state_name = state_data.get("parent")
+        return detections
+    
     def _generate_semantic_state_name(self, element_name: str, current_state: str) -> str:
         """Generate file-safe semantic state name"""
         clean_name = element_name.lower().replace(' ', '_').replace('(', '').replace(')', '').replace('/', '_')
@@ -132,43 +182,33 @@ class StateProcessor:
         # ✅ FLEXIBLE: Tolerance based on element size (5% of width/height, min 10px, max 50px)
         position_tolerance = max(10, min(50, max(element_width * 0.05, element_height * 0.05)))
         
-        # Check against ALL states in fDOM
-        for state_name, state_data in self.state_manager.fdom_data.get("states", {}).items():
-            for existing_node_id, existing_node_data in state_data.get("nodes", {}).items():
-                existing_name = existing_node_data.get('g_icon_name', '').lower().strip()
-                existing_bbox = existing_node_data.get('bbox', [])
-                existing_status = existing_node_data.get('status', 'unknown')
-                
-                if not existing_name or len(existing_bbox) != 4:
-                    continue
-                
-                # ✅ STRONG: Multiple criteria for duplicate detection
-                name_match = element_name == existing_name
-                
-                # Position similarity with proportional tolerance
-                position_match = (
-                    abs(element_bbox[0] - existing_bbox[0]) < position_tolerance and
-                    abs(element_bbox[1] - existing_bbox[1]) < position_tolerance
-                )
-                
-                # Size similarity (within 20% variance)
-                existing_width = existing_bbox[2] - existing_bbox[0]
-                existing_height = existing_bbox[3] - existing_bbox[1]
-                
-                size_match = (
-                    abs(element_width - existing_width) < max(element_width * 0.2, 10) and
-                    abs(element_height - existing_height) < max(element_height * 0.2, 10)
-                )
-                
-                if name_match and position_match and size_match:
-                    # ✅ PRIORITY: If existing element is already explored, definitely skip
-                    if existing_status == "explored":
-                        self.console.print(f"[yellow]🔄 Skipped duplicate (already explored): {element_name} in {state_name}[/yellow]")
-                        return True
-                    
-                    # ✅ SMART: Even if pending, avoid duplicates in different states
-                    self.console.print(f"[yellow]🔄 Skipped duplicate (already exists): {element_name} in {state_name}[/yellow]")
+        # ✅ STRONG: Same name and position (proportional tolerance) - the model's name/grid index
+        # returns only those candidates, across ALL states, instead of scanning every node
+        model = self.state_manager.model
+        for existing_key in model.nodes_near(element_name, element_bbox, position_tolerance):
+            existing_node_data = model.node(existing_key)
+            existing_bbox = existing_node_data['bbox']
+            existing_status = existing_node_data.get('status', 'unknown')
+            state_name = model.node_state(existing_key)
+            
+            # Size similarity (within 20% variance)
+            existing_width = existing_bbox[2] - existing_bbox[0]
+            existing_height = existing_bbox[3] - existing_bbox[1]
+            
+            size_match = (
+                abs(element_width - existing_width) < max(element_width * 0.2, 10) and
+                abs(element_height - existing_height) < max(element_height * 0.2, 10)
+            )
+            
+            if size_match:
+                # ✅ PRIORITY: If existing element is already explored, definitely skip
+                if existing_status == "explored":
+                    self.console.print(f"[yellow]🔄 Skipped duplicate (already explored): {element_name} in {state_name}[/yellow]")
                     return True
+                
+                # ✅ SMART: Even if pending, avoid duplicates in different states
+                self.console.print(f"[yellow]🔄 Skipped duplicate (already exists): {element_name} in {state_name}[/yellow]")
+                return True
         
         return False
     
@@ -193,26 +233,13 @@ class StateProcessor:
             "timestamp": datetime.now().isoformat()
         }
         
-        if "edges" not in self.state_manager.fdom_data:
-            self.state_manager.fdom_data["edges"] = []
-            
-        self.state_manager.fdom_data["edges"].append(edge)
+        self.state_manager.model.add_edge(edge)
         
         self.console.print(f"[blue]🔗 Edge added: {from_state} --[{element_name}]--> {to_state}[/blue]")
     
     def _find_node_in_fdom(self, node_id: str) -> Optional[Dict]:
         """Find node data in fDOM"""
-        if "::" in node_id:
-            state_name, actual_node_id = node_id.split("::", 1)
-            state_data = self.state_manager.fdom_data.get("states", {}).get(state_name, {})
-            return state_data.get("nodes", {}).get(actual_node_id)
-        
-        # Fallback: search all states
-        for state_data in self.state_manager.fdom_data.get("states", {}).values():
-            nodes = state_data.get("nodes", {})
-            if node_id in nodes:
-                return nodes[node_id]
-        return None
+        return self.state_manager.model.node(node_id)
     
     def _sanitize_filename(self, filename: str) -> str:
         """Sanitize filename for Windows compatibility"""
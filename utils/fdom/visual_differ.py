@@ -2,8 +2,8 @@
 VisualDiffer - Visual comparison and hash-based change detection for fDOM Framework
 Handles screenshot comparison using hash and OpenCV-based region extraction
 """
-import hashlib
 import os
+import sys
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 import numpy as np
@@ -12,6 +12,11 @@ from rich.console import Console
 from rich.panel import Panel
 import time
 
+# Add utils directory to path for seraphine_pipeline imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from seraphine_pipeline.frame_store import load_frame_bgr
+from seraphine_pipeline.perceptual_hash import HashConfig, cached_signature, compare_signatures, focus_changed
+
 class VisualDiffer:
     """
     Handles visual comparison and change detection between screenshots
@@ -20,6 +25,21 @@ class VisualDiffer:
     def __init__(self, config_manager):
         self.config = config_manager
         self.console = Console()
+        self.hash_config = self._load_hash_config()
+    
+    def _load_hash_config(self) -> HashConfig:
+        """Perceptual hash settings from visual_comparison.* (defaults without a config)"""
+        if self.config is None:
+            return HashConfig()
+        return HashConfig(
+            method=self.config.get("visual_comparison.hash_method", "dhash"),
+            fine_width=self.config.get("visual_comparison.hash_fine_width", 128),
+            coarse_threshold=self.config.get("visual_comparison.hash_distance_threshold", 10),
+            pixel_tolerance=self.config.get("visual_comparison.hash_pixel_tolerance", 12),
+            max_changed_cells=self.config.get("visual_comparison.hash_max_changed_cells", 2),
+            focus_margin=self.config.get("visual_comparison.hash_focus_margin", 40),
+            ignore_regions=[tuple(region) for region in self.config.get("visual_comparison.ignore_regions", [])]
+        )
     
     def calculate_image_hash(self, image_path: str) -> str:
         """
@@ -29,21 +49,39 @@ class VisualDiffer:
             image_path: Path to image file
             
         Returns:
-            Hash string for comparison
+            Hash string (hex) - compare screens with has_changed, not string equality
         """
         try:
-            with Image.open(image_path) as img:
-                # Convert to grayscale and resize for consistent hashing
-                img = img.convert('L').resize((64, 64))
-                
-                # Calculate hash using pixel data
-                pixels = np.array(img)
-                hash_obj = hashlib.md5(pixels.tobytes())
-                return hash_obj.hexdigest()
+            # Captured frames are hashed from memory once; the signature is cached on the frame
+            signature = cached_signature(image_path, self.hash_config)
+            return signature.hash if signature else ""
                 
         except Exception as e:
             self.console.print(f"[red]❌ Error calculating hash for {image_path}: {e}[/red]")
             return ""
+    
+    def has_changed(self, before_path: str, after_path: str, focus: Optional[Tuple[int, int]] = None) -> bool:
+        """
+        Whether two screenshots show a different screen
+        Coarse-to-fine perceptual comparison: a blinking caret or a masked clock (ignore_regions)
+        is not a change. Unreadable images count as changed, so callers fall back to the full diff.
+        
+        Args:
+            focus: Screenshot pixel that was clicked/hovered - pixels around it are compared exactly,
+                   so a checkbox tick or toggle too small for the thumbnail still counts
+        """
+        try:
+            before = cached_signature(before_path, self.hash_config)
+            after = cached_signature(after_path, self.hash_config)
+            if before is None or after is None:
+                return True
+            if compare_signatures(before, after, self.hash_config).changed:
+                return True
+            return focus is not None and focus_changed(before_path, after_path, focus, self.hash_config)
+            
+        except Exception as e:
+            self.console.print(f"[red]❌ Error comparing {before_path} and {after_path}: {e}[/red]")
+            return True
 
     def extract_change_regions(self, before_path: str, after_path: str, 
                               output_diff_path: str, click_coords: Optional[Tuple] = None) -> Dict:
@@ -59,8 +97,8 @@ class VisualDiffer:
             self.console.print(f"After:  {Path(after_path).name}")
             
             # Load both images
-            img1 = cv2.imread(before_path)
-            img2 = cv2.imread(after_path)
+            img1 = load_frame_bgr(before_path)
+            img2 = load_frame_bgr(after_path)
             
             if img1 is None or img2 is None:
                 return {"success": False, "error": "Could not load images"}
@@ -73,14 +111,7 @@ class VisualDiffer:
                 img2 = cv2.resize(img2, (w, h))
                 self.console.print(f"[yellow]⚠️ Resized both images to ({w}, {h})[/yellow]")
 
-            # Convert to grayscale and compute absolute difference
-            gray1 = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-            gray2 = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
-            diff = cv2.absdiff(gray1, gray2)
-
-            # Threshold and dilate
-            _, thresh = cv2.threshold(diff, 15, 255, cv2.THRESH_BINARY)
-            dilated = cv2.dilate(thresh, np.ones((5, 5), np.uint8), iterations=2)
+            dilated = self._change_mask(img1, img2)
 
             # Find contours
             contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -125,6 +156,37 @@ class VisualDiffer:
             traceback.print_exc()
             return {"success": False, "error": str(e)}
 
+    @staticmethod
+    def _change_mask(img1, img2, threshold: int = 15):
+        """Grayscale absolute difference, thresholded and dilated (255 = changed)"""
+        import cv2
+
+        diff = cv2.absdiff(cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY), cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY))
+        _, thresh = cv2.threshold(diff, threshold, 255, cv2.THRESH_BINARY)
+        return cv2.dilate(thresh, np.ones((5, 5), np.uint8), iterations=2)
+
+    def compute_change_mask(self, before_path: str, after_path: str, threshold: int = 15) -> Optional[np.ndarray]:
+        """
+        Changed-pixel mask in the after screenshot's resolution (for incremental detection)
+        
+        Returns:
+            uint8 mask (255 = changed) or None if an image could not be loaded
+        """
+        try:
+            import cv2
+
+            img1 = load_frame_bgr(before_path)
+            img2 = load_frame_bgr(after_path)
+            if img1 is None or img2 is None:
+                return None
+            if img1.shape != img2.shape:
+                img1 = cv2.resize(img1, (img2.shape[1], img2.shape[0]))
+            return self._change_mask(img1, img2, threshold)
+
+        except Exception as e:
+            self.console.print(f"[red]❌ Error computing change mask: {e}[/red]")
+            return None
+
     def calculate_similarity_percentage(self, image1_path: str, image2_path: str, threshold: int = 15) -> float:
         """
         Calculate similarity percentage between two images using pixel difference analysis
@@ -142,8 +204,8 @@ class VisualDiffer:
             import numpy as np
             
             # Load images
-            img1 = cv2.imread(image1_path)
-            img2 = cv2.imread(image2_path)
+            img1 = load_frame_bgr(image1_path)
+            img2 = load_frame_bgr(image2_path)
             
             if img1 is None or img2 is None:
                 self.console.print(f"[red]❌ Could not load images for comparison[/red]")
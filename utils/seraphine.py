@@ -7,6 +7,8 @@ import os
 import sys
 import time
 import json
+import atexit
+import threading
 import cv2
 import numpy as np
 from functools import wraps
@@ -19,11 +21,16 @@ from seraphine_pipeline.beautiful_visualizer import BeautifulVisualizer
 from seraphine_pipeline.seraphine_processor import FinalSeraphineProcessor, BBoxProcessor
 from seraphine_pipeline.seraphine_generator import FinalGroupImageGenerator
 import asyncio
-from seraphine_pipeline.gemini_integration import run_gemini_analysis, integrate_gemini_results
+from seraphine_pipeline.gemini_integration import run_gemini_analysis, integrate_gemini_results, get_gemini_scheduler
 from seraphine_pipeline.pipeline_exporter import save_enhanced_pipeline_json, create_enhanced_seraphine_structure
 from concurrent.futures import ThreadPoolExecutor
 from seraphine_pipeline.parallel_processor import ParallelProcessor
+from seraphine_pipeline.incremental_detector import IncrementalDetector, IncrementalConfig
 from seraphine_pipeline.helpers import load_configuration, debug_print
+from seraphine_pipeline.frame_store import load_frame_bgr, open_frame_image, frame_exists
+from seraphine_pipeline.tracing import start_trace, span, format_span_tree, export_trace
+from seraphine_pipeline.pipeline_service import PipelineService, PipelineStage
+from contextlib import nullcontext
 from seraphine_pipeline.seraphine_preprocessor import create_group_visualization, analyze_supergroups_with_gemini, integrate_supergroup_analysis
 from seraphine_pipeline.splashscreen_handler import handle_splash_screen_if_needed
 
@@ -43,17 +50,33 @@ def setup_detector_configs(config):
         conf_threshold=config.get("yolo_conf_threshold", 0.1),
         iou_threshold=config.get("yolo_iou_threshold", 0.1),
         enable_timing=config.get("yolo_enable_timing", True),
-        enable_debug=config.get("yolo_enable_debug", False)
+        enable_debug=config.get("yolo_enable_debug", False),
+        model_variant=config.get("yolo_model_variant", "fp32"),
+        content_filter_exact=config.get("yolo_content_filter_exact", False),
+        tile_mode=config.get("yolo_tile_mode", "off"),
+        tile_size=config.get("yolo_tile_size", 1280),
+        tile_overlap=config.get("yolo_tile_overlap", 256),
+        intra_op_threads=config.get("yolo_intra_op_threads", 0),
+        inter_op_threads=config.get("yolo_inter_op_threads", 1),
+        num_sessions=config.get("yolo_num_sessions", 1),
+        pin_threads=config.get("onnx_pin_threads", False),
+        warmup=config.get("onnx_warmup", True)
     )
     
     # Configure OCR from config.json
     ocr_config = OCRDetConfig(
         model_path=config.get("ocr_model_path", "models/ch_PP-OCRv3_det_infer.onnx"),
+        model_variant=config.get("ocr_model_variant", "fp32"),
         det_threshold=config.get("ocr_det_threshold", 0.3),
         max_side_len=config.get("ocr_max_side_len", 960),
         enable_timing=config.get("ocr_enable_timing", True),
         enable_debug=config.get("ocr_enable_debug", False),
-        use_dilation=config.get("ocr_use_dilation", True)
+        use_dilation=config.get("ocr_use_dilation", True),
+        intra_op_threads=config.get("ocr_intra_op_threads", 0),
+        inter_op_threads=config.get("ocr_inter_op_threads", 1),
+        num_sessions=config.get("ocr_num_sessions", 1),
+        pin_threads=config.get("onnx_pin_threads", False),
+        warmup=config.get("onnx_warmup", True)
     )
     
     debug_print(f"🎯 YOLO Config: conf={yolo_config.conf_threshold}, iou={yolo_config.iou_threshold}")
@@ -61,14 +84,22 @@ def setup_detector_configs(config):
     
     return yolo_config, ocr_config
 
+def report_trace(trace_root, config):
+    """Per-image span tree: one compact line in deploy_mcp, the full tree in debug mode"""
+    if config.get("mode", "debug") == "deploy_mcp":
+        print(f"Trace: {format_span_tree(trace_root, min_ms=config.get('tracing_min_span_ms', 0.5))}")
+    else:
+        debug_print(f"\n⏱️  Pipeline trace:\n{format_span_tree(trace_root, compact=False)}")
+    export_trace(trace_root, config)
+
 def load_image_opencv(image_path):
-    """Load image using OpenCV (no PIL)"""
-    if not os.path.exists(image_path):
+    """Load image using OpenCV (no PIL) - served from the in-memory frame store when just captured"""
+    if not frame_exists(image_path):
         debug_print(f"❌ Error: Image file '{image_path}' not found!")
         return None
     
-    # Load with OpenCV
-    img_bgr = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    # Load with OpenCV (or reuse the captured frame)
+    img_bgr = load_frame_bgr(image_path)
     if img_bgr is None:
         debug_print(f"❌ Error: Could not load image '{image_path}'")
         return None
@@ -104,6 +135,19 @@ def assign_intelligent_ids(yolo_detections, ocr_detections):
     
     return yolo_detections, ocr_detections
 
+def create_parallel_processor(yolo_config, ocr_config, config):
+    """ParallelProcessor for the pipeline (sessions are pooled, so this is cheap per image)"""
+    return ParallelProcessor(
+        yolo_config=yolo_config,
+        ocr_config=ocr_config,
+        merger_iou_threshold=config.get("merger_iou_threshold"),
+        enable_timing=config.get("yolo_enable_timing", True),
+        create_visualizations=False,  # We handle visualizations separately
+        save_intermediate_results=False,  # We handle JSON separately
+        backend=config.get("detection_backend", "thread"),  # "process" = worker processes via shared memory
+        num_processes=config.get("detection_processes", 0)
+    )
+
 def run_parallel_detection_and_merge(img_bgr, yolo_config, ocr_config, config):
     """
     Step 1: Run YOLO + OCR detection + intelligent merging (FIXED - using ParallelProcessor!)
@@ -112,65 +156,101 @@ def run_parallel_detection_and_merge(img_bgr, yolo_config, ocr_config, config):
     debug_print("=" * 60)
     
     # 🎯 FIXED: Use ParallelProcessor properly (like temp_main.py)
-    parallel_processor = ParallelProcessor(
-        yolo_config=yolo_config,
-        ocr_config=ocr_config,
-        merger_iou_threshold=config.get("merger_iou_threshold"),
-        enable_timing=config.get("yolo_enable_timing", True),
-        create_visualizations=False,  # We handle visualizations separately
-        save_intermediate_results=False  # We handle JSON separately
-    )
+    parallel_processor = create_parallel_processor(yolo_config, ocr_config, config)
+    
+    # Detect directly on the in-memory BGR pixels - no temp file, no lossy JPEG round-trip
+    detection_start = time.time()
+    
+    # 🎯 Use the PROPER ParallelProcessor with full merging logic!
+    results = parallel_processor.process_image(img_bgr, "temp")
+    
+    total_detection_time = time.time() - detection_start
+    
+    # Extract results (ParallelProcessor returns proper structure)
+    yolo_detections = results['yolo_detections']
+    ocr_detections = results['ocr_detections'] 
+    merged_detections = results['merged_detections']
+    merge_stats = results['merge_stats']
+    
+    # Assign intelligent IDs for tracking (same as before)
+    yolo_detections, ocr_detections = assign_intelligent_ids(yolo_detections, ocr_detections)
+    
+    # Update merged detections with proper IDs
+    for i, detection in enumerate(merged_detections):
+        detection['m_id'] = f"M{i+1:03d}"
+    
+    debug_print(f"\n📊 FIXED Detection + Merge Results:")
+    debug_print(f"  🎯 YOLO detections: {len(yolo_detections)} (Y001-Y{len(yolo_detections):03d})")
+    debug_print(f"  📝 OCR detections: {len(ocr_detections)} (O001-O{len(ocr_detections):03d})")
+    debug_print(f"  🔗 MERGED detections: {len(merged_detections)} (M001-M{len(merged_detections):03d})")
+    debug_print(f"  ⏱️  Total time: {total_detection_time:.3f}s")
+    debug_print(f"  🎯 PROPER 3-stage merging logic restored!")
+    debug_print(f"  📈 Merge efficiency: {len(yolo_detections) + len(ocr_detections)} → {len(merged_detections)} ({len(yolo_detections) + len(ocr_detections) - len(merged_detections)} removed)")
+    
+    return {
+        'yolo_detections': yolo_detections,
+        'ocr_detections': ocr_detections, 
+        'merged_detections': merged_detections,
+        'merge_stats': merge_stats,
+        'timing': {
+            'total_detection_time': total_detection_time,
+            'parallel_detection_time': results['timing']['parallel_detection_time'],
+            'merge_time': results['timing']['merge_time']
+        }
+    }
+
+def run_incremental_detection_and_merge(img_bgr, previous_detections, change_mask, yolo_config, ocr_config, config):
+    """
+    Step 1 (incremental): Detect only the changed regions of a frame whose previous detections are known
+    merged_detections holds only the new (changed-area) detections in full-frame coordinates,
+    so grouping and Gemini run on what the click revealed; all_detections is the whole frame.
+    """
+    debug_print("\n🔄 Step 1: Incremental YOLO + OCR Detection (changed regions only)")
+    debug_print("=" * 60)
     
-    # For now, save BGR as temp file for ParallelProcessor 
-    # (until ParallelProcessor supports direct PIL/numpy input)
-    temp_image_path = "temp_detection_image.jpg"
-    cv2.imwrite(temp_image_path, img_bgr)
+    incremental_detector = IncrementalDetector(
+        create_parallel_processor(yolo_config, ocr_config, config),
+        IncrementalConfig(
+            tile_size=config.get("incremental_tile_size", 128),
+            context=config.get("incremental_context", 48),
+            max_dirty_fraction=config.get("incremental_max_dirty_fraction", 0.5)
+        )
+    )
     
-    try:
-        detection_start = time.time()
-        
-        # 🎯 Use the PROPER ParallelProcessor with full merging logic!
-        results = parallel_processor.process_image(temp_image_path, "temp")
-        
-        total_detection_time = time.time() - detection_start
-        
-        # Extract results (ParallelProcessor returns proper structure)
-        yolo_detections = results['yolo_detections']
-        ocr_detections = results['ocr_detections'] 
-        merged_detections = results['merged_detections']
-        merge_stats = results['merge_stats']
-        
-        # Assign intelligent IDs for tracking (same as before)
-        yolo_detections, ocr_detections = assign_intelligent_ids(yolo_detections, ocr_detections)
-        
-        # Update merged detections with proper IDs
-        for i, detection in enumerate(merged_detections):
-            detection['m_id'] = f"M{i+1:03d}"
-        
-        debug_print(f"\n📊 FIXED Detection + Merge Results:")
-        debug_print(f"  🎯 YOLO detections: {len(yolo_detections)} (Y001-Y{len(yolo_detections):03d})")
-        debug_print(f"  📝 OCR detections: {len(ocr_detections)} (O001-O{len(ocr_detections):03d})")
-        debug_print(f"  🔗 MERGED detections: {len(merged_detections)} (M001-M{len(merged_detections):03d})")
-        debug_print(f"  ⏱️  Total time: {total_detection_time:.3f}s")
-        debug_print(f"  🎯 PROPER 3-stage merging logic restored!")
-        debug_print(f"  📈 Merge efficiency: {len(yolo_detections) + len(ocr_detections)} → {len(merged_detections)} ({len(yolo_detections) + len(ocr_detections) - len(merged_detections)} removed)")
-        
-        return {
-            'yolo_detections': yolo_detections,
-            'ocr_detections': ocr_detections, 
-            'merged_detections': merged_detections,
-            'merge_stats': merge_stats,
-            'timing': {
-                'total_detection_time': total_detection_time,
-                'parallel_detection_time': results['timing']['parallel_detection_time'],
-                'merge_time': results['timing']['merge_time']
-            }
+    detection_start = time.time()
+    results = incremental_detector.detect(img_bgr, previous_detections, change_mask, "temp")
+    total_detection_time = time.time() - detection_start
+    
+    yolo_detections, ocr_detections = assign_intelligent_ids(results['yolo_detections'], results['ocr_detections'])
+    merged_detections = results['new_detections']
+    for i, detection in enumerate(merged_detections):
+        detection['m_id'] = f"M{i+1:03d}"
+    
+    debug_print(f"  🧩 Mode: {results['mode']}, {results['dirty_fraction']:.0%} of the frame changed, "
+                f"{len(results['dirty_regions'])} region(s)")
+    debug_print(f"  🔗 NEW detections: {len(merged_detections)}, reused: {len(results['reused_detections'])}, "
+                f"replaced: {results['removed_count']}")
+    debug_print(f"  ⏱️  Total time: {total_detection_time:.3f}s")
+    
+    return {
+        'yolo_detections': yolo_detections,
+        'ocr_detections': ocr_detections,
+        'merged_detections': merged_detections,
+        'all_detections': results['merged_detections'],
+        'merge_stats': {},
+        'incremental': {
+            'mode': results['mode'],
+            'dirty_fraction': results['dirty_fraction'],
+            'dirty_regions': results['dirty_regions'],
+            'reused_count': len(results['reused_detections']),
+            'removed_count': results['removed_count']
+        },
+        'timing': {
+            'total_detection_time': total_detection_time,
+            'parallel_detection_time': total_detection_time,
+            'merge_time': 0.0
         }
-        
-    finally:
-        # Clean up temporary file
-        if os.path.exists(temp_image_path):
-            os.remove(temp_image_path)
+    }
 
 def run_seraphine_grouping(merged_detections, config, image_path=None):
     """
@@ -226,12 +306,15 @@ def run_seraphine_grouping(merged_detections, config, image_path=None):
         
         if hasattr(bbox_processor, 'final_groups') and bbox_processor.final_groups:
             app_name = os.path.splitext(os.path.basename(image_path))[0]
-            visualization_path = create_group_visualization(bbox_processor.final_groups, image_path, 
-                                     config.get("output_dir", "outputs"), app_name)
-            enhanced_analysis['supergroup_visualization_path'] = visualization_path
             
             # Run Gemini analysis and integrate results into existing structure
             try:
+                visualization_path = create_group_visualization(bbox_processor.final_groups, image_path, 
+                                         config.get("output_dir", "outputs"), app_name)
+                enhanced_analysis['supergroup_visualization_path'] = visualization_path
+                if not visualization_path:
+                    raise RuntimeError(f"Group visualization could not be created for {image_path}")
+                
                 # Handle event loop correctly
                 try:
                     loop = asyncio.get_running_loop()
@@ -406,8 +489,7 @@ def create_visualizations(image_path, detection_results, seraphine_analysis, con
     if gemini_results and config.get("save_gemini_visualization", True):
         debug_print("🎨 Creating Gemini analysis visualization...")
         try:
-            from PIL import Image as PILImage
-            original_image = PILImage.open(image_path)
+            original_image = open_frame_image(image_path)
             
             # Use the EXACT gemini_results format - the visualizer expects this!
             gemini_viz_path = visualizer._create_gemini_visualization(
@@ -486,18 +568,14 @@ def display_enhanced_pipeline_summary(image_path, detection_results, seraphine_a
 
     debug_print(f"🔗 Perfect ID Traceability: Y/O IDs → M IDs → Seraphine Groups → Gemini Analysis")
 
-async def main(image_path=None):
-    """Main enhanced pipeline execution - MODE AWARE"""
-    pipeline_start = time.time()
-    
+def load_pipeline_config():
+    """config.json with the deploy_mcp overrides applied (None if it cannot be loaded)"""
     config = load_configuration()
     if not config:
         return None
     
-    mode = config.get("mode", "debug")
-    
     # Force disable ALL debug output in deploy mode
-    if mode == "deploy_mcp":
+    if config.get("mode", "debug") == "deploy_mcp":
         config.update({
             "yolo_enable_debug": False,
             "yolo_enable_timing": False,
@@ -510,6 +588,130 @@ async def main(image_path=None):
             "save_gemini_visualization": False,
             "save_gemini_json": False,
         })
+    return config
+
+def create_group_images(image_path, seraphine_analysis, config):
+    """Step 3: Generate the grouped images sent to Gemini (None when disabled)"""
+    debug_print("\n🎨 Step 3: Generate Grouped Images for Gemini Analysis")
+    if not config.get("generate_grouped_images", True):
+        return None
+    
+    debug_print("\n🖼️  Step 3: Generating Seraphine Grouped Images")
+    
+    output_dir = config.get("output_dir", "outputs")
+    filename_base = os.path.splitext(os.path.basename(image_path))[0]
+    
+    final_group_generator = FinalGroupImageGenerator(
+        output_dir=output_dir,
+        save_mapping=False
+    )
+    
+    with span("group_images"):
+        grouped_image_paths = final_group_generator.create_grouped_images(
+            image_path, 
+            seraphine_analysis, 
+            filename_base
+        )
+    
+    debug_print(f"✅ Generated {len(grouped_image_paths)} grouped images")
+    return grouped_image_paths
+
+async def run_gemini_step(seraphine_analysis, detection_results, grouped_image_paths, image_path, config,
+                          scheduler=None):
+    """
+    Step 4: Gemini analysis + integration into the seraphine analysis
+    
+    Args:
+        scheduler: Shared Gemini request scheduler (defaults to the process-wide one from config)
+    
+    Returns:
+        (seraphine_analysis, gemini_results) - gemini_results is None when disabled or failed
+    """
+    gemini_results = None
+    if not config.get("gemini_enabled", False):
+        return seraphine_analysis, gemini_results
+    
+    try:
+        with span("gemini") as gemini_span:
+            gemini_results = await run_gemini_analysis(
+                seraphine_analysis, grouped_image_paths, image_path, config, scheduler=scheduler
+            )
+            if gemini_span and gemini_results:
+                gemini_span.set(icons=gemini_results.get('total_icons_found', 0),
+                                cached_icons=gemini_results.get('cached_icons', 0))
+    
+        if gemini_results:
+            # Store original merged detections for proper ID lookup
+            seraphine_analysis['original_merged_detections'] = detection_results['merged_detections']
+            seraphine_analysis = integrate_gemini_results(seraphine_analysis, gemini_results)
+        
+    except Exception as e:
+        debug_print(f"⚠️  Gemini analysis failed: {str(e)}")
+    
+    return seraphine_analysis, gemini_results
+
+def build_deploy_result(seraphine_analysis, detection_results, gemini_results, total_time):
+    """Essential deploy_mcp output: timing, icon count and the element groups with bbox data"""
+    icon_count = gemini_results.get('total_icons_found', 0) if gemini_results else 0
+    
+    field_name = 'seraphine_gemini_groups' if gemini_results else 'seraphine_groups'
+    result = {
+        'total_time': total_time,
+        'total_icons_found': icon_count,
+    }
+    
+    # ✅ FIX: Get the actual element groups with proper bbox data
+    if gemini_results and 'seraphine_gemini_groups' in seraphine_analysis:
+        result[field_name] = seraphine_analysis['seraphine_gemini_groups']
+    else:
+        # Create the enhanced structure from bbox_processor if it doesn't exist
+        # Get original merged detections for proper ID mapping
+        merged_detections = seraphine_analysis.get('original_merged_detections', [])
+        if not merged_detections:
+            merged_detections = detection_results.get('merged_detections', [])
+        
+        enhanced_groups = create_enhanced_seraphine_structure(seraphine_analysis, merged_detections)
+        result[field_name] = enhanced_groups
+    
+    return result
+
+def export_debug_results(image_path, detection_results, seraphine_analysis, gemini_results, grouped_image_paths, config, total_time):
+    """Debug mode: save JSON + visualizations, print the summary and return the full results"""
+    # Step 5: Save JSON
+    with span("save_json"):
+        json_path = save_enhanced_pipeline_json(image_path, detection_results, seraphine_analysis, gemini_results, config)
+    
+    # Step 6: Create Visualizations
+    with span("visualizations"):
+        visualization_paths = create_visualizations(image_path, detection_results, seraphine_analysis, config, gemini_results)
+    
+    # Summary
+    display_enhanced_pipeline_summary(image_path, detection_results, seraphine_analysis, gemini_results, visualization_paths, json_path, config)
+    
+    return {
+        'detection_results': detection_results,
+        'seraphine_analysis': seraphine_analysis,
+        'gemini_results': gemini_results,
+        'grouped_image_paths': grouped_image_paths,
+        'visualization_paths': visualization_paths,
+        'json_path': json_path,
+        'config': config,
+        'total_time': total_time
+    }
+
+async def main(image_path=None, previous_detections=None, change_mask=None):
+    """
+    Main enhanced pipeline execution - MODE AWARE
+    With previous_detections (the last frame's merged boxes) and change_mask (VisualDiffer
+    change mask) only the changed regions are detected, grouped and sent to Gemini.
+    """
+    pipeline_start = time.time()
+    
+    config = load_pipeline_config()
+    if not config:
+        return None
+    
+    mode = config.get("mode", "debug")
     
     debug_print("🚀 ENHANCED AI PIPELINE V1.2: Detection + Merging + Seraphine + Gemini + Export")
     debug_print("=" * 90)
@@ -534,166 +736,111 @@ async def main(image_path=None):
         # Reset pipeline start time for each attempt
         pipeline_start = time.time()
         
-        try:
-            # Step 1: Detection + Merging
-            detection_results = run_parallel_detection_and_merge(img_bgr, yolo_config, ocr_config, config)
+        trace_context = start_trace(
+            "seraphine", on_finish=lambda root: report_trace(root, config),
+            image=os.path.basename(image_path), attempt=restart_count + 1
+        ) if config.get("tracing_enabled", True) else nullcontext()
+        
+        with trace_context:
+            try:
+                # Step 1: Detection + Merging
+                with span("detection"):
+                    if previous_detections is not None and change_mask is not None:
+                        detection_results = run_incremental_detection_and_merge(
+                            img_bgr, previous_detections, change_mask, yolo_config, ocr_config, config
+                        )
+                    else:
+                        detection_results = run_parallel_detection_and_merge(img_bgr, yolo_config, ocr_config, config)
             
-            # Step 2: Seraphine Grouping (may raise PipelineRestartRequired)
-            seraphine_analysis = run_seraphine_grouping(detection_results['merged_detections'], config, image_path)
+                # Step 2: Seraphine Grouping (may raise PipelineRestartRequired)
+                with span("grouping", detections=len(detection_results['merged_detections'])):
+                    seraphine_analysis = run_seraphine_grouping(detection_results['merged_detections'], config, image_path)
             
-            # Continue with normal pipeline
-            # Step 3: Generate Grouped Images for Gemini Analysis
-            debug_print("\n🎨 Step 3: Generate Grouped Images for Gemini Analysis")
-            grouped_image_paths = None
-            if config.get("generate_grouped_images", True):
-                debug_print("\n🖼️  Step 3: Generating Seraphine Grouped Images")
-                
-                from seraphine_pipeline.seraphine_generator import FinalGroupImageGenerator
-                
-                output_dir = config.get("output_dir", "outputs")
-                filename_base = os.path.splitext(os.path.basename(image_path))[0]
-                
-                final_group_generator = FinalGroupImageGenerator(
-                    output_dir=output_dir,
-                    save_mapping=False
-                )
-                
-                grouped_image_paths = final_group_generator.create_grouped_images(
-                    image_path, 
-                    seraphine_analysis, 
-                    filename_base
-                )
-                
-                debug_print(f"✅ Generated {len(grouped_image_paths)} grouped images")
+                # Continue with normal pipeline
+                # Step 3: Generate Grouped Images for Gemini Analysis
+                grouped_image_paths = create_group_images(image_path, seraphine_analysis, config)
             
-            # Step 4: Gemini Analysis
-            gemini_results = None
-            if config.get("gemini_enabled", False):
-                try:
-                    gemini_results = await run_gemini_analysis(
-                        seraphine_analysis, grouped_image_paths, image_path, config
-                    )
-                    
-                    if gemini_results:
-                        # Store original merged detections for proper ID lookup
-                        seraphine_analysis['original_merged_detections'] = detection_results['merged_detections']
-                        seraphine_analysis = integrate_gemini_results(seraphine_analysis, gemini_results)
-                        
-                except Exception as e:
-                    debug_print(f"⚠️  Gemini analysis failed: {str(e)}")
+                # Step 4: Gemini Analysis
+                seraphine_analysis, gemini_results = await run_gemini_step(
+                    seraphine_analysis, detection_results, grouped_image_paths, image_path, config
+                )
             
-            # Calculate total time BEFORE mode check
-            total_time = time.time() - pipeline_start
+                # Calculate total time BEFORE mode check
+                total_time = time.time() - pipeline_start
             
-            # Get icon count BEFORE mode check
-            icon_count = gemini_results.get('total_icons_found', 0) if gemini_results else 0
+                # Get icon count BEFORE mode check
+                icon_count = gemini_results.get('total_icons_found', 0) if gemini_results else 0
             
-            # MODE-SPECIFIC OUTPUTS
-            if mode == "deploy_mcp":
-                # 🎯 DEPLOY MODE: Clean, emoji-free output
-                print(f"Pipeline completed in {total_time:.3f}s, found {icon_count} icons.")
-                
-                # 🧹 COMPLETE FILE CLEANUP
-                output_dir = config.get("output_dir", "outputs")
-                if os.path.exists(output_dir):
-                    import shutil
-                    shutil.rmtree(output_dir)
-                    os.makedirs(output_dir, exist_ok=True)
+                # MODE-SPECIFIC OUTPUTS
+                if mode == "deploy_mcp":
+                    # 🎯 DEPLOY MODE: Clean, emoji-free output
+                    print(f"Pipeline completed in {total_time:.3f}s, found {icon_count} icons.")
                 
-                # Return only essential data
-                field_name = 'seraphine_gemini_groups' if gemini_results else 'seraphine_groups'
-                result = {
-                    'total_time': total_time,
-                    'total_icons_found': icon_count,
-                }
-                
-                # ✅ FIX: Get the actual element groups with proper bbox data
-                if gemini_results and 'seraphine_gemini_groups' in seraphine_analysis:
-                    result[field_name] = seraphine_analysis['seraphine_gemini_groups']
-                else:
-                    # Create the enhanced structure from bbox_processor if it doesn't exist
-                    from utils.seraphine_pipeline.pipeline_exporter import create_enhanced_seraphine_structure
-                    
-                    # Get original merged detections for proper ID mapping
-                    merged_detections = seraphine_analysis.get('original_merged_detections', [])
-                    if not merged_detections:
-                        merged_detections = detection_results.get('merged_detections', [])
-                    
-                    enhanced_groups = create_enhanced_seraphine_structure(seraphine_analysis, merged_detections)
-                    result[field_name] = enhanced_groups
+                    # 🧹 COMPLETE FILE CLEANUP
+                    output_dir = config.get("output_dir", "outputs")
+                    if os.path.exists(output_dir):
+                        import shutil
+                        shutil.rmtree(output_dir)
+                        os.makedirs(output_dir, exist_ok=True)
                 
-                return result
+                    # Return only essential data
+                    return build_deploy_result(seraphine_analysis, detection_results, gemini_results, total_time)
             
-            else:  # DEBUG MODE - Full verbose output with emojis
-                # Step 5: Save JSON
-                json_path = save_enhanced_pipeline_json(image_path, detection_results, seraphine_analysis, gemini_results, config)
-                
-                # Step 6: Create Visualizations
-                visualization_paths = create_visualizations(image_path, detection_results, seraphine_analysis, config, gemini_results)
-                
-                # Summary
-                display_enhanced_pipeline_summary(image_path, detection_results, seraphine_analysis, gemini_results, visualization_paths, json_path, config)
-                
-                return {
-                    'detection_results': detection_results,
-                    'seraphine_analysis': seraphine_analysis,
-                    'gemini_results': gemini_results,
-                    'grouped_image_paths': grouped_image_paths,
-                    'visualization_paths': visualization_paths,
-                    'json_path': json_path,
-                    'config': config,
-                    'total_time': total_time
-                }
+                else:  # DEBUG MODE - Full verbose output with emojis
+                    return export_debug_results(image_path, detection_results, seraphine_analysis, gemini_results,
+                                                grouped_image_paths, config, total_time)
             
-            # If we get here, pipeline completed successfully
-            break  # Exit the retry loop
+                # If we get here, pipeline completed successfully
+                break  # Exit the retry loop
             
-        except PipelineRestartRequired as restart_exception:
-            restart_count += 1
-            new_screenshot_path = restart_exception.new_screenshot_path
+            except PipelineRestartRequired as restart_exception:
+                restart_count += 1
+                new_screenshot_path = restart_exception.new_screenshot_path
             
-            print(f"🔄 Pipeline restart #{restart_count}: {restart_exception}")
-            print(f"📸 Using new screenshot: {new_screenshot_path}")
+                print(f"🔄 Pipeline restart #{restart_count}: {restart_exception}")
+                print(f"📸 Using new screenshot: {new_screenshot_path}")
             
-            if restart_count >= max_restarts:
-                print(f"⚠️ Maximum restarts ({max_restarts}) reached, continuing with last screenshot")
-                break
+                if restart_count >= max_restarts:
+                    print(f"⚠️ Maximum restarts ({max_restarts}) reached, continuing with last screenshot")
+                    break
             
-            # Update paths and reload image for restart
-            image_path = new_screenshot_path
-            img_bgr = load_image_opencv(image_path)
-            if img_bgr is None:
-                print(f"❌ Could not load new screenshot: {image_path}")
-                break
+                # Update paths and reload image for restart
+                image_path = new_screenshot_path
+                img_bgr = load_image_opencv(image_path)
+                if img_bgr is None:
+                    print(f"❌ Could not load new screenshot: {image_path}")
+                    break
             
-            print(f"✅ Reloaded image: {img_bgr.shape[1]}x{img_bgr.shape[0]} pixels")
-            # Continue the while loop to restart the pipeline
+                print(f"✅ Reloaded image: {img_bgr.shape[1]}x{img_bgr.shape[0]} pixels")
+                # Continue the while loop to restart the pipeline
             
-        except Exception as e:
-            # Calculate time even on error
-            total_time = time.time() - pipeline_start
+            except Exception as e:
+                # Calculate time even on error
+                total_time = time.time() - pipeline_start
             
-            if mode == "deploy_mcp":
-                # Clean error message without emojis
-                print(f"Pipeline failed after {total_time:.3f}s: {str(e)}")
-            else:
-                debug_print(f"❌ Error during pipeline execution: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                if mode == "deploy_mcp":
+                    # Clean error message without emojis
+                    print(f"Pipeline failed after {total_time:.3f}s: {str(e)}")
+                else:
+                    debug_print(f"❌ Error during pipeline execution: {str(e)}")
+                    import traceback
+                    traceback.print_exc()
             
-            return None
+                return None
     
     # If max restarts reached without success, return None
     return None
 
 # Add a convenience function for easy module usage
-async def process_image(image_path, config_path=None):
+async def process_image(image_path, config_path=None, previous_detections=None, change_mask=None):
     """
     Convenience function for processing a single image
     
     Args:
         image_path (str): Path to the image to process
         config_path (str, optional): Path to config file. Uses default if None.
+        previous_detections (list, optional): Last frame's merged detections (incremental mode)
+        change_mask (ndarray, optional): Changed pixels since that frame (incremental mode)
     
     Returns:
         dict: Processing results or None if failed
@@ -703,9 +850,9 @@ async def process_image(image_path, config_path=None):
         # For now, assume load_configuration() uses a default path
         pass
     
-    return await main(image_path)
+    return await main(image_path, previous_detections, change_mask)
 
-def process_image_sync(image_path, config_path=None):
+def process_image_sync(image_path, config_path=None, previous_detections=None, change_mask=None):
     """Synchronous wrapper with built-in restart handling"""
     max_attempts = 2
     attempt = 0
@@ -713,7 +860,7 @@ def process_image_sync(image_path, config_path=None):
     while attempt < max_attempts:
         attempt += 1
         try:
-            return asyncio.run(process_image(image_path, config_path))
+            return asyncio.run(process_image(image_path, config_path, previous_detections, change_mask))
         except Exception as e:
             if "PipelineRestartRequired" in str(e) and attempt < max_attempts:
                 print(f"🔄 Splash screen handled, retrying analysis...")
@@ -723,17 +870,185 @@ def process_image_sync(image_path, config_path=None):
     
     return None
 
+def _remove_job_outputs(seraphine_analysis, grouped_image_paths):
+    """Deploy mode: delete only this image's intermediate files (other images may still be in flight)"""
+    paths = list(grouped_image_paths or [])
+    if seraphine_analysis and seraphine_analysis.get('supergroup_visualization_path'):
+        paths.append(seraphine_analysis['supergroup_visualization_path'])
+    for path in paths:
+        try:
+            if isinstance(path, str) and os.path.isfile(path):
+                os.remove(path)
+        except OSError:
+            pass
+
+def create_pipeline_service(config=None):
+    """
+    Long-lived pipelined service: detection → grouping → Gemini → export
+    Each stage works on a different screenshot, so the CPU stages of the next image run
+    while the current one waits on Gemini. Results match process_image_sync for the mode.
+    
+    config.json:
+        service_queue_size: Images allowed to wait in front of each stage (backpressure)
+        service_gemini_workers: Images whose Gemini requests may be in flight at once
+                                (all workers share one request scheduler / RPM budget)
+    """
+    config = config or load_pipeline_config()
+    if not config:
+        return None
+    
+    mode = config.get("mode", "debug")
+    yolo_config, ocr_config = setup_detector_configs(config)
+    
+    # Load + warm the ONNX session pools while the first screenshot is still being captured
+    ParallelProcessor(yolo_config=yolo_config, ocr_config=ocr_config, enable_timing=False,
+                      create_visualizations=False, save_intermediate_results=False,
+                      merger_iou_threshold=config.get("merger_iou_threshold"),
+                      backend=config.get("detection_backend", "thread"),
+                      num_processes=config.get("detection_processes", 0)).warm_up(background=True)
+    
+    def detect(image_path):
+        started = time.time()
+        img_bgr = load_image_opencv(image_path)
+        if img_bgr is None:
+            return None
+        return {
+            'image_path': image_path,
+            'started': started,
+            'detection_results': run_parallel_detection_and_merge(img_bgr, yolo_config, ocr_config, config)
+        }
+    
+    def group(job):
+        image_path = job['image_path']
+        seraphine_analysis = run_seraphine_grouping(job['detection_results']['merged_detections'], config, image_path)
+        if not seraphine_analysis:
+            return None
+        job['seraphine_analysis'] = seraphine_analysis
+        job['grouped_image_paths'] = create_group_images(image_path, seraphine_analysis, config)
+        return job
+    
+    # One scheduler for every Gemini worker: rate limit and learned concurrency span images
+    gemini_scheduler = get_gemini_scheduler(config) if config.get("gemini_enabled", False) else None
+    
+    async def gemini(job):
+        job['seraphine_analysis'], job['gemini_results'] = await run_gemini_step(
+            job['seraphine_analysis'], job['detection_results'], job['grouped_image_paths'], job['image_path'], config,
+            scheduler=gemini_scheduler
+        )
+        return job
+    
+    def export(job):
+        # Wall time from first pixel to last output - includes time spent queued between stages
+        total_time = time.time() - job['started']
+        seraphine_analysis, gemini_results = job['seraphine_analysis'], job['gemini_results']
+        
+        if mode == "deploy_mcp":
+            icon_count = gemini_results.get('total_icons_found', 0) if gemini_results else 0
+            print(f"Pipeline completed in {total_time:.3f}s, found {icon_count} icons.")
+            result = build_deploy_result(seraphine_analysis, job['detection_results'], gemini_results, total_time)
+            _remove_job_outputs(seraphine_analysis, job['grouped_image_paths'])
+            return result
+        
+        return export_debug_results(job['image_path'], job['detection_results'], seraphine_analysis, gemini_results,
+                                    job['grouped_image_paths'], config, total_time)
+    
+    stages = [
+        # Images detected concurrently - worthwhile once yolo/ocr_num_sessions > 1
+        PipelineStage("detection", detect, workers=max(1, config.get("service_detection_workers", 1))),
+        PipelineStage("grouping", group),
+        PipelineStage("gemini", gemini, workers=max(1, config.get("service_gemini_workers", 2))),
+        PipelineStage("export", export),
+    ]
+    
+    return PipelineService(
+        stages,
+        queue_size=config.get("service_queue_size", 2),
+        trace_name="seraphine" if config.get("tracing_enabled", True) else None,
+        on_trace_finish=lambda root: report_trace(root, config),
+        name="seraphine_service"
+    )
+
+_shared_service = None
+_shared_service_lock = threading.Lock()
+
+def get_pipeline_service():
+    """Process-wide service, started on first use and stopped (drained) at exit"""
+    global _shared_service
+    with _shared_service_lock:
+        if _shared_service is None or not _shared_service.running:
+            _shared_service = create_pipeline_service()
+            if _shared_service is None:
+                return None
+            _shared_service.start()
+            atexit.register(_shared_service.stop)
+        return _shared_service
+
+def submit_image(image_path):
+    """Queue one screenshot on the shared service; returns a Future for its results"""
+    service = get_pipeline_service()
+    if service is None:
+        raise RuntimeError("Could not load pipeline configuration")
+    return service.submit(image_path)
+
+def process_images(image_paths):
+    """Process a batch of screenshots with overlapping stages; failed images give None"""
+    service = get_pipeline_service()
+    if service is None:
+        return [None] * len(image_paths)
+    
+    results = service.process_many(image_paths, return_exceptions=True)
+    for image_path, result in zip(image_paths, results):
+        if isinstance(result, Exception):
+            print(f"Pipeline failed for {image_path}: {result}")
+    return [None if isinstance(result, Exception) else result for result in results]
+
+def test_incremental_frame_store(image_path):
+    """Incremental analysis of a screenshot that only lives in the frame store gets through grouping"""
+    from seraphine_pipeline.frame_store import Frame, frame_store
+    
+    config = load_pipeline_config()
+    yolo_config, ocr_config = setup_detector_configs(config)
+    img_bgr = load_image_opencv(image_path)
+    assert img_bgr is not None, f"could not load {image_path}"
+    previous_detections = run_parallel_detection_and_merge(img_bgr, yolo_config, ocr_config, config)['merged_detections']
+    
+    # Same pixels as a ScreenshotManager capture: read-only, in memory, never written to disk
+    frame_path = os.path.join(os.path.dirname(os.path.abspath(image_path)), "incremental_frame_store_test.png")
+    frame = frame_store.put(Frame(bgr=img_bgr.copy(), path=frame_path), archive=False)
+    height, width = img_bgr.shape[:2]
+    change_mask = np.zeros((height, width), dtype=bool)
+    change_mask[height // 4:height // 2, width // 4:width // 2] = True
+    
+    try:
+        results = process_image_sync(frame_path, previous_detections=previous_detections, change_mask=change_mask)
+        assert results is not None, "incremental pipeline failed on a frame store path"
+        assert np.array_equal(frame.bgr, img_bgr), "shared frame was modified"
+    finally:
+        frame_store.discard(frame_path)
+    
+    print(f"✅ Incremental analysis of a frame store screenshot reused {len(previous_detections)} detections")
+    return True
+
 if __name__ == "__main__":
     import argparse
     
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="Seraphine AI Pipeline - Enhanced Detection & Analysis")
     parser.add_argument("--image", "-i", type=str, help="Path to input image")
+    parser.add_argument("--images", nargs="+", help="Several images, processed by the pipelined service")
     parser.add_argument("--config", "-c", type=str, help="Path to config file")
+    parser.add_argument("--test-incremental", type=str, metavar="IMAGE",
+                        help="Self-test: incremental analysis of IMAGE served from the frame store")
     args = parser.parse_args()
     
+    if args.test_incremental:
+        exit(0 if test_incremental_frame_store(args.test_incremental) else 1)
+    
     try:
-        if args.image:
+        if args.images:
+            results = process_images(args.images)
+            print(f"Processed {sum(1 for r in results if r)}/{len(results)} images")
+        elif args.image:
             results = asyncio.run(main(args.image))
         else:
             # Use default image if no argument provided
@@ -756,6 +1071,10 @@ if __name__ == "__main__":
 # # Async usage
 # results = await process_image("path/to/your/image.jpg")
 
+# # Stream of screenshots (stages overlap across images)
+# results = process_images(["s1.png", "s2.png", "s3.png"])
+# future = submit_image("s4.png"); results = future.result()
+
 
 # # With specific image
 # python utils/seraphine.py --image "path/to/image.jpg"
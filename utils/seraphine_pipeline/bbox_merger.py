@@ -5,7 +5,9 @@ No imports from original files allowed.
 """
 import numpy as np
 from typing import List, Dict, Any, Tuple
-from .helpers import debug_print
+from .helpers import debug_print, is_debug_enabled
+from .bbox_overlap import boxes_to_array, valid_areas, pairwise_iou, containment_matrix
+from .tracing import span
 
 def calculate_iou(box1: List[int], box2: List[int]) -> float:
     """Calculate IoU between two boxes in [x1, y1, x2, y2] format"""
@@ -118,32 +120,25 @@ class BBoxMerger:
         if self.enable_timing:
             debug_print(f"  🔄 Stage 1: Removing YOLO self-overlaps...")
         
-        filtered_yolo = []
+        verbose = self.enable_timing and is_debug_enabled()  # Skip per-box message formatting when logging is off
+        
+        # 🚀 One pairwise IoU matrix instead of N² scalar calls
+        boxes = boxes_to_array(yolo_detections)
+        areas = valid_areas(boxes)
+        iou = pairwise_iou(boxes, boxes)
+        
+        # Box i is discarded if any other box overlaps it enough and is smaller
+        discard_pairs = (iou > self.iou_threshold) & (areas[:, None] > areas[None, :])
+        np.fill_diagonal(discard_pairs, False)
         
+        filtered_yolo = []
         for i, yolo1 in enumerate(yolo_detections):
-            bbox1 = yolo1['bbox']
-            area1 = calculate_box_area(bbox1)
-            is_valid_box = True
-            
-            # Check against all other YOLO boxes
-            for j, yolo2 in enumerate(yolo_detections):
-                if i == j:
-                    continue
-                    
-                bbox2 = yolo2['bbox']
-                area2 = calculate_box_area(bbox2)
-                
-                iou = calculate_iou(bbox1, bbox2)
-                
-                # If significant overlap and current box is larger, discard it (keep smaller box)
-                if iou > self.iou_threshold and area1 > area2:
-                    is_valid_box = False
-                    if self.enable_timing:
-                        debug_print(f"    🗑️ Discarding larger YOLO box (area: {area1:.1f}) in favor of smaller (area: {area2:.1f}), IoU: {iou:.3f}")
-                    break
-            
-            if is_valid_box:
-                filtered_yolo.append(yolo1)
+            if discard_pairs[i].any():
+                if verbose:
+                    j = int(np.argmax(discard_pairs[i]))  # First offending box, as in the scalar scan
+                    debug_print(f"    🗑️ Discarding larger YOLO box (area: {areas[i]:.1f}) in favor of smaller (area: {areas[j]:.1f}), IoU: {iou[i, j]:.3f}")
+                continue
+            filtered_yolo.append(yolo1)
         
         if self.enable_timing:
             debug_print(f"    ✅ YOLO self-overlap removal: {len(yolo_detections)} -> {len(filtered_yolo)} boxes")
@@ -168,30 +163,21 @@ class BBoxMerger:
         if self.enable_timing:
             debug_print(f"  🔄 Stage 1.5: Filtering YOLO boxes with >{max_ocr_inside} OCR inside...")
         
-        filtered_yolo = []
+        verbose = self.enable_timing and is_debug_enabled()
         
-        for yolo_det in yolo_detections:
-            yolo_bbox = yolo_det['bbox']
-            ocr_inside_count = 0
-            
-            # Count how many OCR boxes are inside this YOLO box
-            for ocr_det in ocr_detections:
-                ocr_bbox = ocr_det['bbox']
-                
-                # Check if OCR box is inside YOLO box
-                if is_box_inside(ocr_bbox, yolo_bbox, self.containment_threshold):
-                    ocr_inside_count += 1
-                    
-                    # Early exit if we exceed the threshold
-                    if ocr_inside_count > max_ocr_inside:
-                        break
-            
+        # 🚀 Count OCR boxes inside every YOLO box in one containment pass
+        inside = containment_matrix(boxes_to_array(ocr_detections), boxes_to_array(yolo_detections),
+                                    self.containment_threshold)
+        ocr_inside_counts = inside.sum(axis=0)
+        
+        filtered_yolo = []
+        for yolo_det, ocr_inside_count in zip(yolo_detections, ocr_inside_counts):
             if ocr_inside_count <= max_ocr_inside:
                 filtered_yolo.append(yolo_det)
-                if self.enable_timing and ocr_inside_count > 0:
+                if verbose and ocr_inside_count > 0:
                     debug_print(f"    ✅ Keeping YOLO box with {ocr_inside_count} OCR inside")
             else:
-                if self.enable_timing:
+                if verbose:
                     debug_print(f"    🗑️ Discarding YOLO box with {ocr_inside_count} OCR inside (>{max_ocr_inside})")
         
         if self.enable_timing:
@@ -218,42 +204,41 @@ class BBoxMerger:
         
         merged_detections = []
         ocr_used = [False] * len(ocr_detections)
+        verbose = self.enable_timing and is_debug_enabled()
+        
+        # 🚀 Precompute every YOLO×OCR relationship; the loop below only visits overlapping pairs
+        yolo_boxes = boxes_to_array(yolo_detections)
+        ocr_boxes = boxes_to_array(ocr_detections)
+        iou = pairwise_iou(yolo_boxes, ocr_boxes)
+        yolo_inside_ocr = containment_matrix(yolo_boxes, ocr_boxes, self.containment_threshold)
+        ocr_inside_yolo = containment_matrix(ocr_boxes, yolo_boxes, self.containment_threshold).T
         
         # Process each YOLO box
-        for yolo_det in yolo_detections:
-            yolo_bbox = yolo_det['bbox']
+        for i, yolo_det in enumerate(yolo_detections):
             box_added = False
             
-            # Check relationships with all OCR boxes
-            for j, ocr_det in enumerate(ocr_detections):
+            # Candidate OCR boxes in the original scan order (ascending j)
+            for j in np.flatnonzero(iou[i] > self.iou_threshold):
                 if ocr_used[j]:
                     continue
-                    
-                ocr_bbox = ocr_det['bbox']
-                iou = calculate_iou(yolo_bbox, ocr_bbox)
                 
-                if iou > self.iou_threshold:
-                    # Check containment relationships
-                    yolo_inside_ocr = is_box_inside(yolo_bbox, ocr_bbox, self.containment_threshold)
-                    ocr_inside_yolo = is_box_inside(ocr_bbox, yolo_bbox, self.containment_threshold)
+                if yolo_inside_ocr[i, j]:
+                    # YOLO inside OCR -> Keep OCR, discard YOLO
+                    if not box_added:  # Only add once
+                        merged_detections.append(ocr_detections[j].copy())
+                        box_added = True
+                        if verbose:
+                            debug_print(f"    🔄 YOLO inside OCR -> Keeping OCR (IoU: {iou[i, j]:.3f})")
+                    ocr_used[j] = True
+                    break  # YOLO can only be inside one OCR box
                     
-                    if yolo_inside_ocr:
-                        # YOLO inside OCR -> Keep OCR, discard YOLO
-                        if not box_added:  # Only add once
-                            merged_detections.append(ocr_det.copy())
-                            box_added = True
-                            if self.enable_timing:
-                                debug_print(f"    🔄 YOLO inside OCR -> Keeping OCR (IoU: {iou:.3f})")
-                        ocr_used[j] = True
-                        break  # YOLO can only be inside one OCR box
-                        
-                    elif ocr_inside_yolo:
-                        # OCR inside YOLO -> Keep YOLO, mark OCR as used
-                        yolo_det['type'] = 'text'  # ← ONLY CHANGE: Set type to text
-                        # Note: We'll add the YOLO box after checking all OCR boxes
-                        ocr_used[j] = True
-                        if self.enable_timing:
-                            debug_print(f"    🔄 OCR inside YOLO -> Will keep YOLO as TEXT (IoU: {iou:.3f})")
+                elif ocr_inside_yolo[i, j]:
+                    # OCR inside YOLO -> Keep YOLO, mark OCR as used
+                    yolo_det['type'] = 'text'  # ← ONLY CHANGE: Set type to text
+                    # Note: We'll add the YOLO box after checking all OCR boxes
+                    ocr_used[j] = True
+                    if verbose:
+                        debug_print(f"    🔄 OCR inside YOLO -> Will keep YOLO as TEXT (IoU: {iou[i, j]:.3f})")
             
             # If YOLO wasn't absorbed into an OCR box, add it
             if not box_added:
@@ -306,17 +291,20 @@ class BBoxMerger:
         
         # 🔧 STAGE 1: Remove YOLO self-overlaps
         stage1_start = time.time()
-        yolo_after_stage1 = self._remove_yolo_self_overlaps(yolo_detections)
+        with span("stage1_self_overlap"):
+            yolo_after_stage1 = self._remove_yolo_self_overlaps(yolo_detections)
         stage1_time = time.time() - stage1_start
         
         # 🔧 STAGE 1.5: Filter YOLO boxes with too many OCR inside (NEW!)
         stage1_5_start = time.time()
-        yolo_after_stage1_5 = self._filter_yolo_with_many_ocr(yolo_after_stage1, ocr_detections, max_ocr_inside=2)
+        with span("stage1_5_ocr_density"):
+            yolo_after_stage1_5 = self._filter_yolo_with_many_ocr(yolo_after_stage1, ocr_detections, max_ocr_inside=2)
         stage1_5_time = time.time() - stage1_5_start
         
         # 🔧 STAGE 2: Handle YOLO-OCR relationships  
         stage2_start = time.time()
-        final_detections = self._merge_yolo_ocr_relationships(yolo_after_stage1_5, ocr_detections)
+        with span("stage2_yolo_ocr"):
+            final_detections = self._merge_yolo_ocr_relationships(yolo_after_stage1_5, ocr_detections)
         stage2_time = time.time() - stage2_start
         
         # Reassign IDs to final detections
@@ -0,0 +1,292 @@
+"""
+Vectorized bounding box overlap engine
+NumPy pairwise IoU / containment matrices used by BBoxMerger.
+Every formula mirrors the scalar calculate_iou / is_box_inside operation-for-operation,
+so the matrices are bit-identical to calling the scalar helpers pair by pair.
+"""
+import copy
+import numpy as np
+from typing import List, Dict, Any
+
+def boxes_to_array(detections: List[Dict[str, Any]]) -> np.ndarray:
+    """Stack detection bboxes into an (N, 4) array, keeping int dtype when all coords are ints"""
+    if not detections:
+        return np.empty((0, 4), dtype=np.int64)
+    return np.asarray([detection['bbox'] for detection in detections]).reshape(-1, 4)
+
+def raw_areas(boxes: np.ndarray) -> np.ndarray:
+    """(x2 - x1) * (y2 - y1) without clamping - same as the scalar IoU/containment area terms"""
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+def valid_areas(boxes: np.ndarray) -> np.ndarray:
+    """Areas with invalid (non-positive width/height) boxes set to 0.0, like calculate_box_area"""
+    width = boxes[:, 2] - boxes[:, 0]
+    height = boxes[:, 3] - boxes[:, 1]
+    return np.where((width > 0) & (height > 0), width * height, 0.0)
+
+def _pairwise_intersection(boxes_a: np.ndarray, boxes_b: np.ndarray):
+    """Intersection area matrix (A, B) plus the mask of pairs that actually overlap"""
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+
+    overlaps = (x2 > x1) & (y2 > y1)
+    intersection = (x2 - x1) * (y2 - y1)
+    return intersection, overlaps
+
+def pairwise_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    IoU matrix of shape (A, B), equal to calculate_iou(boxes_a[i], boxes_b[j])
+
+    Args:
+        boxes_a: (A, 4) array in [x1, y1, x2, y2] format
+        boxes_b: (B, 4) array in [x1, y1, x2, y2] format
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float64)
+
+    intersection, overlaps = _pairwise_intersection(boxes_a, boxes_b)
+    union = raw_areas(boxes_a)[:, None] + raw_areas(boxes_b)[None, :] - intersection
+
+    valid = overlaps & (union > 0)
+    iou = np.zeros(intersection.shape, dtype=np.float64)
+    np.divide(intersection, union, out=iou, where=valid)
+    return iou
+
+def containment_matrix(inner_boxes: np.ndarray, outer_boxes: np.ndarray, threshold: float = 0.8) -> np.ndarray:
+    """
+    Boolean matrix of shape (I, O), equal to is_box_inside(inner_boxes[i], outer_boxes[j], threshold)
+
+    Args:
+        inner_boxes: (I, 4) candidate inner boxes
+        outer_boxes: (O, 4) candidate outer boxes
+        threshold: Minimum fraction of the inner box area that must lie inside the outer box
+    """
+    if len(inner_boxes) == 0 or len(outer_boxes) == 0:
+        return np.zeros((len(inner_boxes), len(outer_boxes)), dtype=bool)
+
+    intersection, overlaps = _pairwise_intersection(inner_boxes, outer_boxes)
+    inner_area = np.broadcast_to(raw_areas(inner_boxes)[:, None], intersection.shape)
+
+    valid = overlaps & (inner_area > 0)
+    ratio = np.zeros(intersection.shape, dtype=np.float64)
+    np.divide(intersection, inner_area, out=ratio, where=valid)
+    return valid & (ratio >= threshold)
+
+def test_parity(num_boxes: int = 300, seed: int = 0) -> bool:
+    """Check the matrices against the scalar helpers pair by pair (exact equality)"""
+    from .bbox_merger import calculate_iou, is_box_inside
+
+    rng = np.random.default_rng(seed)
+    all_passed = True
+
+    for label, as_float in (("int", False), ("float", True)):
+        xy = rng.integers(0, 1920, size=(num_boxes, 2))
+        wh = rng.integers(-5, 200, size=(num_boxes, 2))  # Includes degenerate boxes
+        boxes = np.concatenate([xy, xy + wh], axis=1)
+        if as_float:
+            boxes = boxes + rng.random(boxes.shape)
+        box_list = boxes.tolist()
+
+        iou = pairwise_iou(boxes, boxes)
+        inside = containment_matrix(boxes, boxes, 0.8)
+
+        iou_mismatches = 0
+        inside_mismatches = 0
+        for i, box1 in enumerate(box_list):
+            for j, box2 in enumerate(box_list):
+                if iou[i, j] != calculate_iou(box1, box2):
+                    iou_mismatches += 1
+                if bool(inside[i, j]) != is_box_inside(box1, box2, 0.8):
+                    inside_mismatches += 1
+
+        passed = iou_mismatches == 0 and inside_mismatches == 0
+        all_passed = all_passed and passed
+        status = "✅" if passed else "❌"
+        print(f"{status} {label} boxes: {num_boxes * num_boxes} pairs, "
+              f"{iou_mismatches} IoU mismatches, {inside_mismatches} containment mismatches")
+
+    return all_passed
+
+def _reference_merger(**kwargs):
+    """BBoxMerger whose stages are the original scalar loops, verbatim (parity reference)"""
+    from .bbox_merger import BBoxMerger, calculate_iou, calculate_box_area, is_box_inside
+
+    class ScalarBBoxMerger(BBoxMerger):
+        def _remove_yolo_self_overlaps(self, yolo_detections):
+            filtered_yolo = []
+
+            for i, yolo1 in enumerate(yolo_detections):
+                bbox1 = yolo1['bbox']
+                area1 = calculate_box_area(bbox1)
+                is_valid_box = True
+
+                # Check against all other YOLO boxes
+                for j, yolo2 in enumerate(yolo_detections):
+                    if i == j:
+                        continue
+
+                    bbox2 = yolo2['bbox']
+                    area2 = calculate_box_area(bbox2)
+
+                    iou = calculate_iou(bbox1, bbox2)
+
+                    # If significant overlap and current box is larger, discard it (keep smaller box)
+                    if iou > self.iou_threshold and area1 > area2:
+                        is_valid_box = False
+                        break
+
+                if is_valid_box:
+                    filtered_yolo.append(yolo1)
+
+            return filtered_yolo
+
+        def _filter_yolo_with_many_ocr(self, yolo_detections, ocr_detections, max_ocr_inside=2):
+            filtered_yolo = []
+
+            for yolo_det in yolo_detections:
+                yolo_bbox = yolo_det['bbox']
+                ocr_inside_count = 0
+
+                # Count how many OCR boxes are inside this YOLO box
+                for ocr_det in ocr_detections:
+                    ocr_bbox = ocr_det['bbox']
+
+                    # Check if OCR box is inside YOLO box
+                    if is_box_inside(ocr_bbox, yolo_bbox, self.containment_threshold):
+                        ocr_inside_count += 1
+
+                        # Early exit if we exceed the threshold
+                        if ocr_inside_count > max_ocr_inside:
+                            break
+
+                if ocr_inside_count <= max_ocr_inside:
+                    filtered_yolo.append(yolo_det)
+
+            return filtered_yolo
+
+        def _merge_yolo_ocr_relationships(self, yolo_detections, ocr_detections):
+            merged_detections = []
+            ocr_used = [False] * len(ocr_detections)
+
+            # Process each YOLO box
+            for yolo_det in yolo_detections:
+                yolo_bbox = yolo_det['bbox']
+                box_added = False
+
+                # Check relationships with all OCR boxes
+                for j, ocr_det in enumerate(ocr_detections):
+                    if ocr_used[j]:
+                        continue
+
+                    ocr_bbox = ocr_det['bbox']
+                    iou = calculate_iou(yolo_bbox, ocr_bbox)
+
+                    if iou > self.iou_threshold:
+                        # Check containment relationships
+                        yolo_inside_ocr = is_box_inside(yolo_bbox, ocr_bbox, self.containment_threshold)
+                        ocr_inside_yolo = is_box_inside(ocr_bbox, yolo_bbox, self.containment_threshold)
+
+                        if yolo_inside_ocr:
+                            # YOLO inside OCR -> Keep OCR, discard YOLO
+                            if not box_added:  # Only add once
+                                merged_detections.append(ocr_det.copy())
+                                box_added = True
+                            ocr_used[j] = True
+                            break  # YOLO can only be inside one OCR box
+
+                        elif ocr_inside_yolo:
+                            # OCR inside YOLO -> Keep YOLO, mark OCR as used
+                            yolo_det['type'] = 'text'
+                            ocr_used[j] = True
+
+                # If YOLO wasn't absorbed into an OCR box, add it
+                if not box_added:
+                    merged_detections.append(yolo_det.copy())
+
+            # Add remaining unused OCR detections
+            for j, ocr_det in enumerate(ocr_detections):
+                if not ocr_used[j]:
+                    merged_detections.append(ocr_det.copy())
+
+            return merged_detections
+
+    return ScalarBBoxMerger(enable_timing=False, **kwargs)
+
+def _random_detections(rng, num_ocr: int, num_yolo: int, as_float: bool):
+    """OCR boxes plus YOLO boxes that duplicate, sit inside, contain or miss them - every merge rule fires"""
+    def box(x, y, w, h):
+        coords = [x, y, x + w, y + h]
+        return [float(c) + float(rng.random()) for c in coords] if as_float else [int(c) for c in coords]
+
+    ocr = []
+    for j in range(num_ocr):
+        if ocr and rng.random() < 0.5:
+            x, y = ocr[-1]['bbox'][0], ocr[-1]['bbox'][1] + rng.integers(18, 30)  # Next line of a text block
+        else:
+            x, y = rng.integers(0, 1800), rng.integers(0, 1000)
+        ocr.append({'bbox': box(x, y, rng.integers(-3, 120), rng.integers(-3, 16)),
+                    'type': 'text', 'source': 'ocr', 'id': j})
+    yolo = []
+    for i in range(num_yolo):
+        kind = rng.integers(0, 6)
+        if kind < 5 and ocr:
+            x1, y1, x2, y2 = ocr[rng.integers(0, len(ocr))]['bbox']
+            pad = [0, 2, -3, 25, 70][kind]  # Near-duplicate, slightly larger, inside, around, spanning a text block
+            bbox = box(x1 - pad, y1 - pad, (x2 - x1) + 2 * pad + rng.integers(-2, 3), (y2 - y1) + 2 * pad)
+        else:
+            bbox = box(rng.integers(0, 1800), rng.integers(0, 1000), rng.integers(-3, 90), rng.integers(-3, 90))
+        yolo.append({'bbox': bbox, 'type': 'icon', 'source': 'yolo', 'id': i})
+    yolo += [{**copy.deepcopy(yolo[i]), 'id': num_yolo + i} for i in rng.integers(0, num_yolo, num_yolo // 10)]
+    return ocr, yolo
+
+def test_merge_parity(num_sets: int = 30, seed: int = 0) -> bool:
+    """Every BBoxMerger stage (and the full merge) returns the same list as the original scalar loops"""
+    from .bbox_merger import BBoxMerger, filter_valid_boxes
+
+    rng = np.random.default_rng(seed)
+    mismatches = {'stage1': 0, 'stage1_5': 0, 'stage2': 0, 'merge': 0}
+    runs = 0
+
+    for iou_threshold in (0.05, 0.5, 0.9):
+        new = BBoxMerger(iou_threshold=iou_threshold, enable_timing=False)
+        old = _reference_merger(iou_threshold=iou_threshold)
+        for set_index in range(num_sets):
+            ocr, yolo = _random_detections(rng, int(rng.integers(0, 120)), int(rng.integers(0, 150)), set_index % 2 == 1)
+            ocr, yolo = filter_valid_boxes(ocr), filter_valid_boxes(yolo)
+            runs += 1
+
+            stages = {
+                'stage1': lambda merger, o, y: merger._remove_yolo_self_overlaps(y),
+                'stage1_5': lambda merger, o, y: merger._filter_yolo_with_many_ocr(y, o, max_ocr_inside=2),
+                'stage2': lambda merger, o, y: merger._merge_yolo_ocr_relationships(y, o),
+                'merge': lambda merger, o, y: merger.merge_detections(y, o)[0],
+            }
+            for stage, run in stages.items():
+                # Fresh copies: stage 2 retypes YOLO boxes in place
+                expected = run(old, copy.deepcopy(ocr), copy.deepcopy(yolo))
+                actual = run(new, copy.deepcopy(ocr), copy.deepcopy(yolo))
+                if actual != expected:
+                    mismatches[stage] += 1
+
+    passed = not any(mismatches.values())
+    status = "✅" if passed else "❌"
+    print(f"{status} Merge stages vs original loops: {runs} random box sets per stage, mismatching sets {mismatches}")
+    return passed
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vectorized bbox overlap engine")
+    parser.add_argument("--test-parity", action="store_true",
+                        help="Compare against the scalar IoU/containment helpers and the original merge loops")
+    parser.add_argument("--num-boxes", type=int, default=300, help="Random boxes per parity run")
+    args = parser.parse_args()
+
+    if args.test_parity:
+        ok = test_parity(args.num_boxes)
+        ok = test_merge_parity() and ok
+        exit(0 if ok else 1)
+    else:
+        print("Usage: PYTHONPATH=utils python -m seraphine_pipeline.bbox_overlap --test-parity")
@@ -0,0 +1,224 @@
+"""
+Frame stability detection
+Replaces fixed post-action sleeps with "wait until the UI settles": low-resolution frames
+are captured at a high rate and compared as small grayscale thumbnails; the wait ends as
+soon as K consecutive frames match (or a timeout expires). With a reference frame (the
+screen before a click) the wait first waits for the screen to change, so a UI that has not
+started reacting yet is not mistaken for a settled one.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+from .helpers import debug_print
+from .frame_store import load_frame_bgr
+
+@dataclass
+class StabilityConfig:
+    """Settings for wait_for_stable_frame"""
+    stable_frames: int = 3          # K consecutive matching frames = settled
+    interval: float = 0.05          # Seconds between captures
+    timeout: float = 3.0            # Give up (return not stable) after this many seconds
+    min_wait: float = 0.0           # Never return earlier than this
+    thumbnail_width: int = 160      # Comparison resolution (height keeps the aspect ratio)
+    pixel_tolerance: int = 12       # Gray-level difference a thumbnail cell may have and still match
+    max_changed_cells: int = 8      # Cells allowed to differ (a blinking caret, a spinner)
+
+@dataclass
+class StabilityResult:
+    """Outcome of one wait"""
+    stable: bool                    # K consecutive frames matched before the timeout
+    changed: bool                   # The screen differed from the reference (True without a reference)
+    elapsed: float                  # Seconds spent waiting
+    frames: int                     # Frames captured
+
+def frame_thumbnail(frame: np.ndarray, width: int = 160) -> np.ndarray:
+    """
+    Small grayscale version of a BGR / BGRA / gray frame, always exactly `width` cells wide
+    (height keeps the aspect ratio), so a cell tolerance means the same share of the screen at
+    every frame size. Large frames are first reduced by k x k block means, k = frame width // width:
+    an integer block size keeps INTER_AREA on its fast path (several times faster than an
+    arbitrary scale), and the final resize to the fixed grid only touches that small image.
+    """
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+    height, frame_width = frame.shape[:2]
+    width = max(1, width)
+    rows = max(1, round(height * width / frame_width))
+    k = frame_width // width
+    if k >= 2:
+        frame = cv2.resize(frame[:height // k * k, :frame_width // k * k], (frame_width // k, max(1, height // k)),
+                           interpolation=cv2.INTER_AREA)
+    if frame.shape[:2] != (rows, width):
+        frame = cv2.resize(frame, (width, rows), interpolation=cv2.INTER_AREA)
+    return frame.astype(np.int16)
+
+def thumbnails_match(a: np.ndarray, b: np.ndarray, config: StabilityConfig) -> bool:
+    """Same screen, allowing max_changed_cells cells to differ by more than pixel_tolerance"""
+    if a.shape != b.shape:
+        return False
+    return int(np.count_nonzero(np.abs(a - b) > config.pixel_tolerance)) <= config.max_changed_cells
+
+def wait_for_stable_frame(capture: Callable[[], Optional[np.ndarray]], config: StabilityConfig = None,
+                          reference: Optional[np.ndarray] = None,
+                          clock: Callable[[], float] = time.monotonic,
+                          sleep: Callable[[float], None] = time.sleep) -> StabilityResult:
+    """
+    Block until the captured frames stop changing
+
+    Args:
+        capture: Returns the current frame (BGR/BGRA/gray) or None if capture failed
+        config: StabilityConfig
+        reference: Frame from before the action - stability only counts once the screen differs from it
+        clock / sleep: Time source (injectable for tests)
+
+    Returns:
+        StabilityResult (stable=False after a timeout; changed=False if the screen never left the reference)
+    """
+    config = config or StabilityConfig()
+    reference_thumb = frame_thumbnail(reference, config.thumbnail_width) if reference is not None else None
+    start = clock()
+    deadline = start + config.timeout
+    previous = None
+    matches = 0
+    frames = 0
+    changed = reference_thumb is None
+
+    while True:
+        frame = capture()
+        if frame is not None:
+            frames += 1
+            thumb = frame_thumbnail(frame, config.thumbnail_width)
+            if not changed and not thumbnails_match(thumb, reference_thumb, config):
+                changed = True
+                matches = 0
+            elif previous is not None and thumbnails_match(thumb, previous, config):
+                matches += 1
+            else:
+                matches = 0
+            previous = thumb
+
+            # K consecutive matching frames = K - 1 matching pairs
+            if changed and matches >= config.stable_frames - 1 and clock() - start >= config.min_wait:
+                return StabilityResult(True, True, clock() - start, frames)
+
+        if clock() + config.interval > deadline:
+            elapsed = clock() - start
+            debug_print(f"⏱️  Frame stability timeout after {elapsed:.2f}s ({frames} frames, "
+                        f"{'changed' if changed else 'no change'})")
+            return StabilityResult(False, changed, elapsed, frames)
+        sleep(config.interval)
+
+def region_capture(bbox: Optional[Dict[str, int]] = None) -> Callable[[], Optional[np.ndarray]]:
+    """
+    Capture callable for wait_for_stable_frame: a screen region ({'left','top','width','height'})
+    or the primary monitor (bbox=None, like ImageGrab.grab()), as a BGRA array. One mss handle
+    is reused per wait.
+    """
+    import mss
+
+    sct = mss.mss()
+
+    def capture() -> Optional[np.ndarray]:
+        try:
+            shot = sct.grab(bbox or sct.monitors[1])
+            return np.frombuffer(shot.bgra, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        except Exception as e:
+            debug_print(f"⚠️  Stability capture failed: {e}")
+            return None
+
+    capture.close = sct.close
+    return capture
+
+def wait_for_screen_to_settle(bbox: Optional[Dict[str, int]] = None, config: StabilityConfig = None,
+                              reference_path: Optional[str] = None) -> StabilityResult:
+    """
+    Wait until a screen region stops changing
+    reference_path: Screenshot taken before the action (same region) - wait for a change first
+    """
+    config = config or StabilityConfig()
+    reference = load_frame_bgr(reference_path) if reference_path else None
+    try:
+        capture = region_capture(bbox)
+    except Exception as e:
+        # No screen to watch (headless, mss missing) - keep the old fixed wait
+        debug_print(f"⚠️  Frame stability unavailable ({e}) - sleeping {config.timeout}s")
+        time.sleep(config.timeout)
+        return StabilityResult(False, True, config.timeout, 0)
+    try:
+        return wait_for_stable_frame(capture, config, reference)
+    finally:
+        capture.close()
+
+def test_frame_stability() -> bool:
+    """Simulated screen: a menu animates in after a delay, a caret keeps blinking"""
+
+    class SimulatedScreen:
+        def __init__(self, react_after: float, animate_for: float):
+            self.now = 0.0
+            self.react_after = react_after
+            self.animate_for = animate_for
+
+        def clock(self) -> float:
+            return self.now
+
+        def sleep(self, seconds: float):
+            self.now += seconds
+
+        def capture(self) -> np.ndarray:
+            frame = np.full((600, 800, 3), 240, dtype=np.uint8)
+            frame[300:316, 400:401] = 0 if int(self.now / 0.5) % 2 else 240  # Caret blink
+            progress = (self.now - self.react_after) / self.animate_for
+            if progress > 0:
+                frame[50:50 + int(300 * min(1.0, progress)), 100:300] = 60  # Menu sliding open
+            self.now += 0.01  # Capture cost
+            return frame
+
+    config = StabilityConfig(stable_frames=3, interval=0.05, timeout=2.0)
+
+    # The UI reacts 0.3s after the click and animates for 0.2s
+    screen = SimulatedScreen(react_after=0.3, animate_for=0.2)
+    reference = screen.capture()
+    screen.now = 0.0
+    result = wait_for_stable_frame(screen.capture, config, reference, clock=screen.clock, sleep=screen.sleep)
+    assert result.stable and result.changed, result
+    assert 0.5 <= result.elapsed < 0.8, result.elapsed
+
+    # Without a reference the still screen before the reaction counts as settled
+    screen.now = 0.0
+    early = wait_for_stable_frame(screen.capture, config, clock=screen.clock, sleep=screen.sleep)
+    assert early.stable and early.elapsed < 0.3, early
+
+    # Nothing ever happens: no change, the wait ends at the timeout
+    screen = SimulatedScreen(react_after=99.0, animate_for=0.2)
+    reference = screen.capture()
+    screen.now = 0.0
+    idle = wait_for_stable_frame(screen.capture, config, reference, clock=screen.clock, sleep=screen.sleep)
+    assert not idle.stable and not idle.changed and 1.9 <= idle.elapsed <= 2.1, idle
+
+    # One fixed grid for every frame size - narrow windows are reduced too
+    for frame_width, frame_height in ((200, 120), (319, 200), (800, 600), (2880, 1800)):
+        thumb = frame_thumbnail(np.zeros((frame_height, frame_width, 3), dtype=np.uint8), config.thumbnail_width)
+        assert thumb.shape == (round(frame_height * config.thumbnail_width / frame_width), config.thumbnail_width), \
+            (frame_width, thumb.shape)
+
+    print(f"✅ Frame stability: settled after {result.elapsed:.2f}s ({result.frames} frames) instead of a fixed "
+          f"{config.timeout:.0f}s sleep; no-change timeout after {idle.elapsed:.2f}s")
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Wait until the screen stops changing")
+    parser.add_argument("--test", action="store_true", help="Run the simulated-screen self-test")
+    parser.add_argument("--timeout", type=float, default=3.0, help="Seconds to wait at most")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_frame_stability() else 1)
+    else:
+        result = wait_for_screen_to_settle(config=StabilityConfig(timeout=args.timeout))
+        print(f"{'Stable' if result.stable else 'Not stable'} after {result.elapsed:.2f}s ({result.frames} frames)")
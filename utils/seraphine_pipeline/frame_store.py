@@ -0,0 +1,285 @@
+"""
+In-memory frame store
+Keeps freshly captured screenshots as decoded BGR buffers keyed by their file path, so
+detection, OCR, diffing and grouping read pixels from memory instead of decoding the
+same PNG again. PNG encoding happens on a background thread, for archival only.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, Dict, Any
+
+import cv2
+import numpy as np
+from PIL import Image
+
+@dataclass
+class Frame:
+    """One captured screen: read-only BGR pixels plus capture metadata"""
+    bgr: np.ndarray
+    path: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+    origin: Tuple[int, int] = (0, 0)  # Screen position of the top-left pixel
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.bgr.setflags(write=False)  # Shared between threads - nobody may mutate it
+        self._rgb = None
+
+    @classmethod
+    def from_bgra(cls, bgra: bytes, size: Tuple[int, int], **kwargs) -> "Frame":
+        """Build from a raw BGRA capture buffer (e.g. mss ScreenShot.bgra) with a single copy"""
+        width, height = size
+        bgra_view = np.frombuffer(bgra, dtype=np.uint8).reshape(height, width, 4)
+        return cls(bgr=cv2.cvtColor(bgra_view, cv2.COLOR_BGRA2BGR), **kwargs)
+
+    @property
+    def width(self) -> int:
+        return self.bgr.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.bgr.shape[0]
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """RGB copy, converted once and reused"""
+        if self._rgb is None:
+            rgb = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)
+            rgb.setflags(write=False)
+            self._rgb = rgb
+        return self._rgb
+
+    def to_pil(self) -> Image.Image:
+        """PIL RGB image - pixel-identical to Image.open(path).convert('RGB') of the archived PNG"""
+        return Image.fromarray(self.rgb)
+
+class FrameStore:
+    """
+    Bounded LRU of recent frames keyed by absolute path, with asynchronous PNG archival
+    A cached frame is only served while the file on disk is still the one we wrote
+    (size + mtime match), so files replaced by other code are never shadowed.
+    """
+
+    def __init__(self, max_frames: int = 8, archive_workers: int = 1):
+        self.max_frames = max_frames
+        self._frames: "OrderedDict[str, Frame]" = OrderedDict()
+        self._archives: Dict[str, Future] = {}
+        self._file_stamps: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=archive_workers, thread_name_prefix="png_archive")
+
+    @staticmethod
+    def _key(path) -> str:
+        return os.path.abspath(str(path))
+
+    def put(self, frame: Frame, archive: bool = True, async_archive: bool = True) -> Frame:
+        """
+        Register a frame under frame.path
+
+        Args:
+            archive: Write the PNG to frame.path at all
+            async_archive: Encode on the background thread instead of blocking the caller
+        """
+        key = self._key(frame.path)
+
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            self._file_stamps.pop(key, None)
+
+            if archive:
+                future = self._executor.submit(self._write_png, key, frame)
+                self._archives[key] = future
+            evicted = self._evict_locked()
+
+        for evicted_key in evicted:
+            self.wait_archived(evicted_key)
+
+        if archive and not async_archive:
+            self.wait_archived(key)
+        return frame
+
+    def _write_png(self, key: str, frame: Frame) -> str:
+        cv2.imwrite(key, frame.bgr)
+        stat = os.stat(key)
+        with self._lock:
+            if self._frames.get(key) is frame:
+                self._file_stamps[key] = (stat.st_size, stat.st_mtime_ns)
+        return key
+
+    def _evict_locked(self):
+        evicted = []
+        while len(self._frames) > self.max_frames:
+            key, _ = self._frames.popitem(last=False)
+            self._file_stamps.pop(key, None)
+            evicted.append(key)
+        return evicted
+
+    def get(self, path) -> Optional[Frame]:
+        """In-memory frame for path, or None if unknown or the file changed on disk since"""
+        key = self._key(path)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                return None
+
+            archive = self._archives.get(key)
+            stamp = self._file_stamps.get(key)
+
+        if stamp is not None:
+            try:
+                stat = os.stat(key)
+                current = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                current = None
+            if current != stamp:
+                self.discard(path, wait=False)  # Replaced or deleted by someone else
+                return None
+        elif archive is None or archive.done():
+            # Never archived (memory only) is fine; archived but unstamped means it was replaced
+            if archive is not None:
+                self.discard(path, wait=False)
+                return None
+
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+        return frame
+
+    def wait_archived(self, path, timeout: Optional[float] = None) -> bool:
+        """Block until the PNG for path is on disk (no-op if it was never queued)"""
+        key = self._key(path)
+        with self._lock:
+            future = self._archives.get(key)
+        if future is None:
+            return True
+        try:
+            future.result(timeout=timeout)
+            with self._lock:
+                if self._archives.get(key) is future:
+                    del self._archives[key]
+            return True
+        except Exception:
+            return False
+
+    def discard(self, path, wait: bool = True) -> None:
+        """Forget the in-memory frame (optionally after its pending archive finishes)"""
+        if wait:
+            self.wait_archived(path)
+        key = self._key(path)
+        with self._lock:
+            self._frames.pop(key, None)
+            self._file_stamps.pop(key, None)
+
+    def flush(self) -> None:
+        """Wait for every pending PNG write"""
+        with self._lock:
+            keys = list(self._archives.keys())
+        for key in keys:
+            self.wait_archived(key)
+
+# Global instance
+frame_store = FrameStore()
+
+def load_frame_bgr(image_input) -> Optional[np.ndarray]:
+    """
+    BGR pixels for a path, Frame, BGR ndarray or PIL image
+    Paths are served from the frame store when possible, otherwise decoded from disk.
+    """
+    if isinstance(image_input, Frame):
+        return image_input.bgr
+    if isinstance(image_input, np.ndarray):
+        return image_input
+    if isinstance(image_input, (str, os.PathLike)):
+        frame = frame_store.get(image_input)
+        if frame is not None:
+            return frame.bgr
+        return cv2.imread(str(image_input), cv2.IMREAD_COLOR)
+    return cv2.cvtColor(np.array(image_input.convert('RGB')), cv2.COLOR_RGB2BGR)
+
+def load_frame_pil(image_input) -> Image.Image:
+    """PIL RGB image for a path, Frame, BGR ndarray or PIL image (store-aware like load_frame_bgr)"""
+    if isinstance(image_input, Frame):
+        return image_input.to_pil()
+    if isinstance(image_input, np.ndarray):
+        return Image.fromarray(cv2.cvtColor(image_input, cv2.COLOR_BGR2RGB))
+    if isinstance(image_input, (str, os.PathLike)):
+        frame = frame_store.get(image_input)
+        if frame is not None:
+            return frame.to_pil()
+        with Image.open(image_input) as img:
+            return img.convert('RGB')
+    return image_input.convert('RGB')
+
+def open_frame_image(image_path) -> Image.Image:
+    """Drop-in for Image.open(path): the in-memory frame if it was just captured, else the file as-is"""
+    frame = frame_store.get(image_path)
+    if frame is not None:
+        return frame.to_pil()
+    return Image.open(image_path)
+
+def describe_image_input(image_input) -> str:
+    """Short printable name for a path, Frame, numpy array or PIL image"""
+    if isinstance(image_input, Frame):
+        return image_input.path or f"<frame {image_input.width}x{image_input.height}>"
+    if isinstance(image_input, np.ndarray):
+        return f"<array {image_input.shape[1]}x{image_input.shape[0]}>"
+    if isinstance(image_input, Image.Image):
+        return f"<PIL {image_input.width}x{image_input.height}>"
+    return str(image_input)
+
+def frame_exists(image_input) -> bool:
+    """True if the image is in memory or on disk"""
+    if isinstance(image_input, (Frame, np.ndarray, Image.Image)):
+        return True
+    return frame_store.get(image_input) is not None or os.path.exists(image_input)
+
+def test_frame_store() -> bool:
+    """Memory hits match the archived PNG exactly, and replaced files are never shadowed"""
+    import tempfile
+    import shutil
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = FrameStore(max_frames=2)
+        path = os.path.join(temp_dir, "frame.png")
+
+        bgra = np.random.default_rng(0).integers(0, 256, size=(48, 64, 4), dtype=np.uint8)
+        frame = store.put(Frame.from_bgra(bgra.tobytes(), (64, 48), path=path))
+        assert store.get(path) is frame
+
+        store.wait_archived(path)
+        assert np.array_equal(cv2.imread(path, cv2.IMREAD_COLOR), frame.bgr)
+        with Image.open(path) as img:
+            assert np.array_equal(np.array(img.convert('RGB')), np.array(frame.to_pil()))
+        assert store.get(path) is frame
+
+        # Someone else overwrites the file -> the stale in-memory frame must not be served
+        other_path = os.path.join(temp_dir, "other.png")
+        cv2.imwrite(other_path, np.zeros((48, 64, 3), dtype=np.uint8))
+        time.sleep(0.01)
+        shutil.copy2(other_path, path)
+        assert store.get(path) is None
+
+        for i in range(3):
+            store.put(Frame(np.zeros((4, 4, 3), dtype=np.uint8), path=os.path.join(temp_dir, f"{i}.png")))
+        assert len(store._frames) == 2
+        store.flush()
+
+    print("✅ FrameStore memory hits, archival and staleness checks passed")
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="In-memory frame store")
+    parser.add_argument("--test", action="store_true", help="Run the frame store self-test")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_frame_store() else 1)
+    else:
+        print("Usage: python -m seraphine_pipeline.frame_store --test")
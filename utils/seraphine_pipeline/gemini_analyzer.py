@@ -5,12 +5,17 @@ Sends Seraphine-generated grouped images to Gemini for intelligent analysis
 
 import os
 import json
+import time
+import random
 import asyncio
+import threading
+import weakref
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
 from PIL import Image
 from datetime import datetime
 from .helpers import debug_print
+from .gemini_label_cache import GeminiLabelCache, compute_prompt_hash
 
 try:
     from google import genai
@@ -26,6 +31,226 @@ try:
 except ImportError:
     debug_print("⚠️  Warning: python-dotenv not installed. Make sure GEMINI_API_KEY is set manually.")
 
+GEMINI_MODEL = "gemini-2.0-flash-exp"
+
+# HTTP status codes worth retrying: rate limited or transient server-side failures
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# How often a waiter re-checks limits released from another event loop
+CROSS_LOOP_POLL_SECONDS = 0.05
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter for API requests
+    Allows bursts up to `capacity`, refilling at `rate` tokens per second.
+    State sits behind a threading lock so one bucket can serve several event loops.
+    """
+    
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+    
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        if self.rate <= 0:
+            return  # Rate limiting disabled
+        
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+
+
+class AIMDConcurrencyLimiter:
+    """
+    Adaptive concurrency limit (additive increase, multiplicative decrease)
+    Grows by ~1 slot per window of fast successes, halves on overload signals
+    (429/5xx, timeouts, or latency above target_latency).
+    Counters are thread-safe; the asyncio.Condition used for waiting is created
+    lazily for each running loop, and waiters also poll so a slot freed on
+    another loop is picked up within CROSS_LOOP_POLL_SECONDS.
+    """
+    
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 16,
+                 target_latency: float = 20.0, decrease_factor: float = 0.5,
+                 decrease_cooldown: float = 2.0):
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._conditions = weakref.WeakKeyDictionary()
+    
+    def _condition(self) -> asyncio.Condition:
+        """Condition bound to the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            condition = self._conditions.get(loop)
+            if condition is None:
+                condition = self._conditions[loop] = asyncio.Condition()
+        return condition
+    
+    def _try_take(self) -> bool:
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+    
+    async def acquire(self):
+        condition = self._condition()
+        async with condition:
+            while not self._try_take():
+                try:
+                    await asyncio.wait_for(condition.wait(), timeout=CROSS_LOOP_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+    
+    async def release(self, latency: Optional[float] = None, overloaded: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            
+            if overloaded or (latency is not None and latency > self.target_latency):
+                # One decrease per cooldown - a burst of failures from the same window counts once
+                now = time.monotonic()
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            elif latency is not None:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        
+        condition = self._condition()
+        async with condition:
+            condition.notify_all()
+
+
+class GeminiRequestScheduler:
+    """
+    Runs Gemini API calls with rate limiting, retries and adaptive concurrency
+    - Token bucket caps requests per minute
+    - AIMD limiter adapts the number of in-flight requests to observed latency/errors
+    - Per-request timeout, exponential backoff with full jitter on 429/5xx/timeouts
+    """
+    
+    def __init__(self, max_concurrency: int = 4,
+                 requests_per_minute: float = 60,
+                 request_timeout: float = 60.0,
+                 max_retries: int = 4,
+                 base_backoff: float = 1.0,
+                 max_backoff: float = 30.0,
+                 target_latency: float = 20.0):
+        self.rate_limiter = TokenBucket(rate=requests_per_minute / 60.0,
+                                        capacity=max(1.0, max_concurrency))
+        self.concurrency = AIMDConcurrencyLimiter(initial_limit=max_concurrency,
+                                                  max_limit=max(max_concurrency * 2, 1),
+                                                  target_latency=target_latency)
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.stats = {'requests': 0, 'retries': 0, 'timeouts': 0, 'failures': 0}
+    
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """429/5xx API errors, timeouts and connection failures are transient"""
+        if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+            return True
+        if GEMINI_AVAILABLE and isinstance(error, ServerError):
+            return True
+        
+        status = getattr(error, 'code', None) or getattr(error, 'status_code', None) or getattr(error, 'status', None)
+        return isinstance(status, int) and status in RETRYABLE_STATUS_CODES
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+    
+    async def run(self, request_factory: Callable[[], Awaitable[Any]], label: str = "request") -> Any:
+        """
+        Execute request_factory() under the scheduler's limits, retrying transient failures
+        
+        Args:
+            request_factory: Zero-argument callable returning a fresh awaitable per attempt
+            label: Name used in debug output
+            
+        Raises:
+            The last error once retries are exhausted, or any non-retryable error immediately
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            await self.concurrency.acquire()
+            
+            self.stats['requests'] += 1
+            start = time.monotonic()
+            try:
+                result = await asyncio.wait_for(request_factory(), timeout=self.request_timeout)
+            except Exception as e:
+                retryable = self.is_retryable(e)
+                if isinstance(e, asyncio.TimeoutError):
+                    self.stats['timeouts'] += 1
+                await self.concurrency.release(overloaded=retryable)
+                
+                if not retryable or attempt >= self.max_retries:
+                    self.stats['failures'] += 1
+                    raise
+                
+                delay = self._backoff_delay(attempt)
+                self.stats['retries'] += 1
+                debug_print(f"    🔁 {label}: {type(e).__name__} ({e}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s "
+                            f"(concurrency limit {self.concurrency.limit:.1f})")
+                await asyncio.sleep(delay)
+            else:
+                await self.concurrency.release(latency=time.monotonic() - start)
+                return result
+
+
+_shared_scheduler: Optional[GeminiRequestScheduler] = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_shared_scheduler(max_concurrency: Optional[int] = None,
+                         requests_per_minute: Optional[float] = None,
+                         request_timeout: Optional[float] = None,
+                         max_retries: Optional[int] = None) -> GeminiRequestScheduler:
+    """
+    Process-wide Gemini scheduler shared by every analyzer
+    The RPM budget belongs to the API key, not to one image, so all analyzers
+    (including concurrent pipeline-service workers) draw from one bucket and
+    keep the AIMD limit learned so far. The first call creates it; later calls
+    apply any settings they pass without resetting that state (None keeps the current value).
+    """
+    global _shared_scheduler
+    settings = {'max_concurrency': max_concurrency, 'requests_per_minute': requests_per_minute,
+                'request_timeout': request_timeout, 'max_retries': max_retries}
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = GeminiRequestScheduler(**{k: v for k, v in settings.items() if v is not None})
+        else:
+            if requests_per_minute is not None:
+                _shared_scheduler.rate_limiter.rate = requests_per_minute / 60.0
+            if request_timeout is not None:
+                _shared_scheduler.request_timeout = request_timeout
+            if max_retries is not None:
+                _shared_scheduler.max_retries = max_retries
+        return _shared_scheduler
+
 
 class GeminiIconAnalyzer:
     """
@@ -36,8 +261,15 @@ class GeminiIconAnalyzer:
     def __init__(self, prompt_path: str = None, 
                  output_dir: str = "outputs", 
                  max_concurrent_requests: int = 4,
-                 save_results: bool = True):
+                 save_results: bool = True,
+                 label_cache: Optional[GeminiLabelCache] = None,
+                 requests_per_minute: float = 60,
+                 request_timeout: float = 60.0,
+                 max_retries: int = 4,
+                 base_url: Optional[str] = None,
+                 scheduler: Optional[GeminiRequestScheduler] = None):
         self.output_dir = output_dir
+        self.label_cache = label_cache
         
         # Fix: Handle prompt path correctly
         if prompt_path is None:
@@ -50,6 +282,13 @@ class GeminiIconAnalyzer:
             self.prompt_path = prompt_path
         
         self.max_concurrent_requests = max_concurrent_requests
+        # All analyzers share the process-wide scheduler unless one is injected
+        self.scheduler = scheduler or get_shared_scheduler(
+            max_concurrency=max_concurrent_requests,
+            requests_per_minute=requests_per_minute,
+            request_timeout=request_timeout,
+            max_retries=max_retries
+        )
         self.save_results = save_results
         
         if not GEMINI_AVAILABLE:
@@ -60,8 +299,14 @@ class GeminiIconAnalyzer:
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
         
-        self.client = genai.Client(api_key=self.api_key)
+        # base_url (or GEMINI_BASE_URL) points the client at a local fake server for testing
+        base_url = base_url or os.getenv("GEMINI_BASE_URL")
+        if base_url:
+            self.client = genai.Client(api_key=self.api_key, http_options={'base_url': base_url})
+        else:
+            self.client = genai.Client(api_key=self.api_key)
         self.prompt = self._load_prompt()
+        self.prompt_hash = compute_prompt_hash(self.prompt, GEMINI_MODEL)
         
         debug_print(f"🤖 Gemini analyzer initialized with prompt from: {self.prompt_path}")
     
@@ -75,9 +320,52 @@ class GeminiIconAnalyzer:
         except FileNotFoundError:
             raise FileNotFoundError(f"Prompt file not found: {self.prompt_path}")
     
+    def lookup_cached_labels(self, crop_hashes: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Fill icon labels from the per-crop cache
+        
+        Args:
+            crop_hashes: Composite item label ("H1_2") -> crop hash
+            
+        Returns:
+            Icons in _parse_gemini_response format for every label whose crop is cached
+        """
+        if not self.label_cache or not crop_hashes:
+            return []
+        
+        cached = self.label_cache.get_many(crop_hashes.values(), self.prompt_hash)
+        cached_icons = []
+        for icon_id, crop_hash in crop_hashes.items():
+            if crop_hash in cached:
+                cached_icons.append({
+                    'id': icon_id,
+                    **cached[crop_hash],
+                    'group_type': icon_id[0]
+                })
+        
+        debug_print(f"💾 Label cache: {len(cached_icons)}/{len(crop_hashes)} crops already labelled")
+        return cached_icons
+    
+    def _store_labels(self, image_results: List[Dict[str, Any]], crop_hashes: Dict[str, str]):
+        """Cache freshly returned labels under their crop hashes"""
+        if not self.label_cache or not crop_hashes:
+            return
+        
+        new_labels = []
+        for image_result in image_results:
+            if image_result['analysis_success']:
+                for icon in image_result['icons']:
+                    crop_hash = crop_hashes.get(icon.get('id'))
+                    if crop_hash:
+                        new_labels.append((crop_hash, icon))
+        
+        self.label_cache.put_many(new_labels, self.prompt_hash)
+    
     async def analyze_grouped_images(self, grouped_image_paths: List[str] = None, 
                                    filename_base: str = None,
-                                   direct_images: List[Tuple] = None) -> Dict[str, Any]:
+                                   direct_images: List[Tuple] = None,
+                                   crop_hashes: Dict[str, str] = None,
+                                   cached_icons: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Analyze grouped images generated by Seraphine
         
@@ -85,11 +373,13 @@ class GeminiIconAnalyzer:
             grouped_image_paths: List of paths to final_*.png images (traditional method)
             filename_base: Base filename for saving results
             direct_images: List of (PIL.Image, filename) tuples (optimized method)
+            crop_hashes: Composite item label -> crop hash; new labels are written to the cache
+            cached_icons: Icons already filled from the cache (see lookup_cached_labels)
             
         Returns:
             Dictionary containing analysis results
         """
-        if direct_images:
+        if direct_images is not None:
             debug_print(f"\n🤖 Starting Gemini analysis of {len(direct_images)} grouped images (direct mode)...")
             valid_images = [(img, name) for img, name in direct_images if "combined" in name]
         else:
@@ -100,7 +390,7 @@ class GeminiIconAnalyzer:
             ]
             valid_images = [(path, os.path.basename(path)) for path in valid_image_paths]
         
-        if not valid_images:
+        if not valid_images and not cached_icons:
             debug_print("❌ No valid combined images found for analysis")
             return {'images': [], 'total_icons': 0, 'analysis_time': 0}
         
@@ -109,64 +399,60 @@ class GeminiIconAnalyzer:
         
         debug_print(f"  📸 Starting parallel analysis of {len(valid_images)} images...")
         
-        # Execute all tasks in parallel with concurrency limit
-        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
-        
-        # Modified analysis function with semaphore for direct images
+        # Execute all tasks in parallel - GeminiRequestScheduler handles rate, concurrency and retries
         async def analyze_and_process_image_direct(image_data, filename: str, index: int) -> Dict[str, Any]:
             """Analyze a single image with concurrency control - supports both file paths and PIL images"""
-            async with semaphore:
-                debug_print(f"  📸 Analyzing image {index+1}/{len(valid_images)}: {filename}")
+            debug_print(f"  📸 Analyzing image {index+1}/{len(valid_images)}: {filename}")
+            
+            try:
+                # Analyze with Gemini - supports both PIL and file path
+                response = await self._analyze_single_image_direct(image_data, filename)
                 
-                try:
-                    # Analyze with Gemini - supports both PIL and file path
-                    response = await self._analyze_single_image_direct(image_data, filename)
+                if response:
+                    icons = self._parse_gemini_response(response)
                     
-                    if response:
-                        icons = self._parse_gemini_response(response)
-                        
-                        image_result = {
-                            'image_path': filename if isinstance(image_data, str) else f"direct:{filename}",
-                            'image_name': filename,
-                            'icons_found': len(icons),
-                            'icons': icons,
-                            'raw_response': response,
-                            'analysis_success': True
-                        }
-                        
-                        debug_print(f"    ✅ Found {len(icons)} icons in {filename}")
-                        return image_result
-                    else:
-                        image_result = {
-                            'image_path': filename if isinstance(image_data, str) else f"direct:{filename}",
-                            'image_name': filename,
-                            'icons_found': 0,
-                            'icons': [],
-                            'raw_response': None,
-                            'analysis_success': False,
-                            'error': 'Failed to get response from Gemini'
-                        }
-                        debug_print(f"    ❌ Analysis failed for {filename}")
-                        return image_result
+                    image_result = {
+                        'image_path': filename if isinstance(image_data, str) else f"direct:{filename}",
+                        'image_name': filename,
+                        'icons_found': len(icons),
+                        'icons': icons,
+                        'raw_response': response,
+                        'analysis_success': True
+                    }
                     
-                except Exception as e:
-                    debug_print(f"    ❌ Error analyzing {filename}: {str(e)}")
-                    return {
+                    debug_print(f"    ✅ Found {len(icons)} icons in {filename}")
+                    return image_result
+                else:
+                    image_result = {
                         'image_path': filename if isinstance(image_data, str) else f"direct:{filename}",
                         'image_name': filename,
                         'icons_found': 0,
                         'icons': [],
                         'raw_response': None,
                         'analysis_success': False,
-                        'error': str(e)
+                        'error': 'Failed to get response from Gemini'
                     }
+                    debug_print(f"    ❌ Analysis failed for {filename}")
+                    return image_result
+                
+            except Exception as e:
+                debug_print(f"    ❌ Error analyzing {filename}: {str(e)}")
+                return {
+                    'image_path': filename if isinstance(image_data, str) else f"direct:{filename}",
+                    'image_name': filename,
+                    'icons_found': 0,
+                    'icons': [],
+                    'raw_response': None,
+                    'analysis_success': False,
+                    'error': str(e)
+                }
         
         # Create tasks for all images
         tasks = []
         for i, (image_data, filename) in enumerate(valid_images):
             tasks.append(analyze_and_process_image_direct(image_data, filename, i))
         
-        debug_print(f"🚀 Executing {len(tasks)} requests to Gemini (max {self.max_concurrent_requests} concurrent)...")
+        debug_print(f"🚀 Executing {len(tasks)} requests to Gemini (adaptive concurrency, start {self.max_concurrent_requests})...")
         image_results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Handle any exceptions from gather
@@ -192,6 +478,20 @@ class GeminiIconAnalyzer:
                     total_icons_found += result['icons_found']
         
         image_results = processed_results
+        self._store_labels(image_results, crop_hashes)
+        
+        # Cached labels are reported as one extra, already-successful "image"
+        if cached_icons:
+            image_results.append({
+                'image_path': 'cache:gemini_label_cache',
+                'image_name': 'gemini_label_cache',
+                'icons_found': len(cached_icons),
+                'icons': cached_icons,
+                'raw_response': None,
+                'analysis_success': True,
+                'from_cache': True
+            })
+            total_icons_found += len(cached_icons)
         
         end_time = datetime.now()
         analysis_duration = (end_time - start_time).total_seconds()
@@ -202,8 +502,9 @@ class GeminiIconAnalyzer:
             'analysis_timestamp': end_time.isoformat(),
             'analysis_duration_seconds': analysis_duration,
             'total_images_analyzed': len(valid_images),
-            'total_input_images': len(direct_images) if direct_images else len(grouped_image_paths),
-            'analysis_mode': 'direct' if direct_images else 'file',
+            'total_input_images': len(direct_images) if direct_images is not None else len(grouped_image_paths),
+            'analysis_mode': 'direct' if direct_images is not None else 'file',
+            'cached_icons': len(cached_icons) if cached_icons else 0,
             'successful_analyses': len([r for r in image_results if r['analysis_success']]),
             'total_icons_found': total_icons_found,
             'images': image_results
@@ -229,16 +530,19 @@ class GeminiIconAnalyzer:
                 # Direct PIL image method (optimization!)
                 image = image_data
             
-            # Call Gemini API
-            response = await self.client.aio.models.generate_content(
-                model="gemini-2.0-flash-exp",
-                contents=[self.prompt, image],
+            # Call Gemini API (rate limited, retried on 429/5xx/timeouts)
+            response = await self.scheduler.run(
+                lambda: self.client.aio.models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents=[self.prompt, image],
+                ),
+                label=filename
             )
             
             return response.text
             
         except ServerError as e:
-            debug_print(f"    ⚠️  Server error: {e}")
+            debug_print(f"    ⚠️  Server error after {self.scheduler.max_retries} retries: {e}")
             return None
         except Exception as e:
             debug_print(f"    ❌ Analysis error: {e}")
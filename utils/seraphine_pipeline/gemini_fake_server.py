@@ -0,0 +1,234 @@
+"""
+Local fake Gemini server for exercising GeminiRequestScheduler
+Serves the generateContent REST endpoint with configurable latency and injected
+429/503 failures, so retries, timeouts, adaptive concurrency and the shared rate
+limit can be tested offline through the real google-genai client.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List
+from PIL import Image
+
+DEFAULT_RESPONSE_TEXT = 'H0_1: "Save" | Usage: "Saves the current file" | Enabled: "true" | Interactive: "true" | Type: "icon"'
+
+class FakeGeminiServer:
+    """
+    Threaded HTTP server answering POST .../models/<model>:generateContent
+
+    Args:
+        failure_rate: Probability of answering 429 or 503 instead of a result
+        latency: Seconds to sleep before answering (simulates model time)
+        response_text: Text returned in the single candidate
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, failure_rate: float = 0.0,
+                 latency: float = 0.0, response_text: str = DEFAULT_RESPONSE_TEXT, seed: int = 0):
+        self.failure_rate = failure_rate
+        self.latency = latency
+        self.response_text = response_text
+        self.stats = {'requests': 0, 'failures': 0, 'max_in_flight': 0}
+        self.request_times: List[float] = []  # time.monotonic() of each arrival
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                self.rfile.read(length)
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass  # Keep test output clean
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.request_times.append(time.monotonic())
+            self._in_flight += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self._in_flight)
+            fail_roll = self._random.random()
+
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+
+            if fail_roll < self.failure_rate:
+                with self._lock:
+                    self.stats['failures'] += 1
+                status = 429 if fail_roll < self.failure_rate / 2 else 503
+                body = {'error': {'code': status, 'message': 'Injected failure', 'status': 'UNAVAILABLE'}}
+            else:
+                status = 200
+                body = {
+                    'candidates': [{
+                        'content': {'role': 'model', 'parts': [{'text': self.response_text}]},
+                        'finishReason': 'STOP'
+                    }]
+                }
+
+            payload = json.dumps(body).encode('utf-8')
+            handler.send_response(status)
+            handler.send_header('Content-Type', 'application/json')
+            handler.send_header('Content-Length', str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client gave up (request timeout) before the answer was ready
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def start(self) -> "FakeGeminiServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def _make_analyzer(base_url: str, scheduler=None, **settings):
+    """GeminiIconAnalyzer wired to the fake server, exactly as the pipeline builds it"""
+    from .gemini_analyzer import GeminiIconAnalyzer
+
+    os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+    return GeminiIconAnalyzer(output_dir=tempfile.gettempdir(), save_results=False,
+                              base_url=base_url, scheduler=scheduler, **settings)
+
+def _test_image() -> Image.Image:
+    return Image.new("RGB", (64, 32), (255, 255, 255))
+
+async def run_scheduler_test(num_requests: int = 24, failure_rate: float = 0.3, latency: float = 0.05,
+                             max_concurrency: int = 4) -> bool:
+    """Every request must eventually succeed despite injected 429/503s, within the concurrency cap"""
+    from .gemini_analyzer import GeminiRequestScheduler
+
+    with FakeGeminiServer(failure_rate=failure_rate, latency=latency) as server:
+        scheduler = GeminiRequestScheduler(max_concurrency=max_concurrency, requests_per_minute=6000,
+                                           request_timeout=5.0, max_retries=8, base_backoff=0.02, max_backoff=0.2)
+        analyzer = _make_analyzer(server.base_url, scheduler=scheduler)
+        image = _test_image()
+
+        start = time.monotonic()
+        results = await asyncio.gather(*[analyzer._analyze_single_image_direct(image, f"fake_{i}")
+                                         for i in range(num_requests)])
+        elapsed = time.monotonic() - start
+
+    succeeded = sum(1 for r in results if r == server.response_text)
+    passed = succeeded == num_requests and server.stats['max_in_flight'] <= scheduler.concurrency.max_limit
+    status = "✅" if passed else "❌"
+    print(f"{status} {succeeded}/{num_requests} succeeded in {elapsed:.2f}s | server: {server.stats} | "
+          f"scheduler: {scheduler.stats} | final concurrency limit {scheduler.concurrency.limit:.2f}")
+    return passed
+
+async def run_timeout_test() -> bool:
+    """A request slower than request_timeout is retried and then surfaces asyncio.TimeoutError"""
+    from .gemini_analyzer import GeminiRequestScheduler
+
+    with FakeGeminiServer(latency=0.5) as server:
+        scheduler = GeminiRequestScheduler(max_concurrency=1, requests_per_minute=6000,
+                                           request_timeout=0.1, max_retries=1, base_backoff=0.01)
+        analyzer = _make_analyzer(server.base_url, scheduler=scheduler)
+        response = await analyzer._analyze_single_image_direct(_test_image(), "slow")
+        passed = (response is None and scheduler.stats['timeouts'] == 2
+                  and scheduler.stats['retries'] == 1 and scheduler.stats['failures'] == 1)
+
+    status = "✅" if passed else "❌"
+    print(f"{status} Timeout handling: {scheduler.stats}")
+    return passed
+
+def run_shared_rate_test(requests_per_analyzer: int = 8, requests_per_minute: float = 600,
+                         max_concurrency: int = 2) -> bool:
+    """
+    Analyzers built independently (as run_gemini_analysis does per image) must share one RPM budget
+    Two analyzers run concurrently on one loop (pipeline-service workers) and a third on its own
+    loop in another thread (process_image_sync); arrivals at the server must never outrun the
+    single token bucket: burst capacity plus rate * elapsed.
+    """
+    from . import gemini_analyzer
+
+    gemini_analyzer._shared_scheduler = None  # Start from a fresh process-wide bucket
+    settings = {'max_concurrent_requests': max_concurrency, 'requests_per_minute': requests_per_minute,
+                'request_timeout': 5.0}
+
+    async def analyze_all(analyzer, prefix: str):
+        image = _test_image()
+        return await asyncio.gather(*[analyzer._analyze_single_image_direct(image, f"{prefix}_{i}")
+                                      for i in range(requests_per_analyzer)])
+
+    with FakeGeminiServer(latency=0.01) as server:
+        analyzers = [_make_analyzer(server.base_url, **settings) for _ in range(3)]
+        shared = len({id(a.scheduler) for a in analyzers}) == 1
+
+        async def service_workers():
+            return await asyncio.gather(analyze_all(analyzers[0], "worker_a"), analyze_all(analyzers[1], "worker_b"))
+
+        other_loop = {}
+        thread = threading.Thread(target=lambda: other_loop.update(results=asyncio.run(analyze_all(analyzers[2], "sync"))))
+        start = time.monotonic()
+        thread.start()
+        worker_results = asyncio.run(service_workers())
+        thread.join()
+        elapsed = time.monotonic() - start
+
+        arrivals = sorted(server.request_times)
+
+    responses = [r for batch in worker_results for r in batch] + other_loop.get('results', [])
+    succeeded = sum(1 for r in responses if r == server.response_text)
+    rate = requests_per_minute / 60.0
+    # k-th arrival may not precede the k-th token; +1 absorbs arrival jitter
+    violations = [k for k, t in enumerate(arrivals, start=1)
+                  if k > max_concurrency + rate * (t - arrivals[0]) + 1]
+
+    total = 3 * requests_per_analyzer
+    passed = shared and succeeded == total and not violations
+    status = "✅" if passed else "❌"
+    print(f"{status} Shared rate limit: {succeeded}/{total} succeeded in {elapsed:.2f}s "
+          f"(cap {requests_per_minute:.0f} RPM, burst {max_concurrency}) | shared scheduler: {shared} | "
+          f"arrivals over budget: {len(violations)}")
+    return passed
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fake Gemini server / scheduler tests")
+    parser.add_argument("--test-scheduler", action="store_true", help="Run scheduler tests against the fake server")
+    parser.add_argument("--serve", action="store_true", help="Run the fake server in the foreground")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.test_scheduler:
+        ok = asyncio.run(run_scheduler_test()) and asyncio.run(run_timeout_test()) and run_shared_rate_test()
+        exit(0 if ok else 1)
+    elif args.serve:
+        server = FakeGeminiServer(port=args.port, failure_rate=args.failure_rate, latency=args.latency)
+        print(f"Fake Gemini server on {server.base_url} - set GEMINI_BASE_URL to use it")
+        server._httpd.serve_forever()
+    else:
+        print("Usage: python -m seraphine_pipeline.gemini_fake_server --test-scheduler | --serve")
@@ -3,6 +3,8 @@ Gemini Integration Utility
 Handles integration of Gemini LLM results into seraphine structure
 """
 from .helpers import debug_print
+from .gemini_label_cache import GeminiLabelCache, compute_group_crop_hashes
+from .frame_store import load_frame_pil
 
 def integrate_gemini_results(seraphine_analysis, gemini_results):
     """
@@ -79,9 +81,37 @@ def integrate_gemini_results(seraphine_analysis, gemini_results):
     
     return seraphine_analysis
 
-async def run_gemini_analysis(seraphine_analysis, grouped_image_paths, image_path, config):
+def get_explore_crop_hashes(seraphine_analysis, image_path):
+    """Crop hashes for every item of the explore=True groups (the ones sent to Gemini)"""
+    bbox_processor = seraphine_analysis['bbox_processor']
+    group_details = seraphine_analysis.get('analysis', {}).get('group_details', {})
+    explore_group_ids = [
+        group_id for group_id in bbox_processor.final_groups
+        if group_details.get(group_id, {}).get('explore', False)
+    ]
+    
+    return compute_group_crop_hashes(bbox_processor, load_frame_pil(image_path), explore_group_ids)
+
+def get_gemini_scheduler(config):
+    """
+    Process-wide Gemini request scheduler, configured from config.json
+    Shared by every image and pipeline-service worker so they stay inside one RPM budget
+    """
+    from .gemini_analyzer import get_shared_scheduler
+    
+    return get_shared_scheduler(
+        max_concurrency=config.get("gemini_max_concurrent", 4),
+        requests_per_minute=config.get("gemini_requests_per_minute", 60),
+        request_timeout=config.get("gemini_request_timeout", 60.0),
+        max_retries=config.get("gemini_max_retries", 4)
+    )
+
+async def run_gemini_analysis(seraphine_analysis, grouped_image_paths, image_path, config, scheduler=None):
     """
     Run Gemini LLM analysis with optimized image sharing
+    
+    Args:
+        scheduler: Request scheduler to use (defaults to get_gemini_scheduler(config))
     """
     if not config.get("gemini_enabled", False):
         debug_print("\n⏭️  Gemini analysis disabled in config")
@@ -90,6 +120,7 @@ async def run_gemini_analysis(seraphine_analysis, grouped_image_paths, image_pat
     debug_print("\n🤖 Step 4: Gemini LLM Analysis (Optimized Image Sharing)")
     debug_print("=" * 70)
     
+    label_cache = None
     try:
         from .gemini_analyzer import GeminiIconAnalyzer
         import os
@@ -97,12 +128,32 @@ async def run_gemini_analysis(seraphine_analysis, grouped_image_paths, image_pat
         output_dir = config.get("output_dir", "outputs")
         filename_base = os.path.splitext(os.path.basename(image_path))[0]
         
+        # Per-crop label cache - icons labelled in earlier states/runs are not re-sent
+        crop_hashes = None
+        cached_icons = []
+        if config.get("gemini_label_cache_enabled", True):
+            try:
+                label_cache = GeminiLabelCache(config.get("gemini_label_cache_path", "cache/gemini_label_cache.db"))
+                crop_hashes = get_explore_crop_hashes(seraphine_analysis, image_path)
+            except Exception as e:
+                debug_print(f"⚠️  Gemini label cache unavailable: {str(e)}")
+                label_cache = None
+                crop_hashes = None
+        
         # Initialize analyzer - let it use default prompt path (relative to module)
+        # Analyzers are per image, but all share the process-wide request scheduler (one RPM budget)
+        scheduler = scheduler or get_gemini_scheduler(config)
         analyzer = GeminiIconAnalyzer(
             prompt_path=config.get("gemini_prompt_path"),  # Pass None to use default
             output_dir=output_dir,
             max_concurrent_requests=config.get("gemini_max_concurrent", 4),
-            save_results=config.get("save_gemini_json", True)
+            save_results=config.get("save_gemini_json", True),
+            label_cache=label_cache,
+            requests_per_minute=config.get("gemini_requests_per_minute", 60),
+            request_timeout=config.get("gemini_request_timeout", 60.0),
+            max_retries=config.get("gemini_max_retries", 4),
+            base_url=config.get("gemini_base_url"),
+            scheduler=scheduler
         )
         
         # Use direct image mode for optimized sharing
@@ -111,6 +162,9 @@ async def run_gemini_analysis(seraphine_analysis, grouped_image_paths, image_pat
             
             from .seraphine_generator import FinalGroupImageGenerator
             
+            # Only unseen crops go into the composites
+            cached_icons = analyzer.lookup_cached_labels(crop_hashes)
+            
             # Create generator to get direct images
             final_group_generator = FinalGroupImageGenerator(
                 output_dir=output_dir,
@@ -122,7 +176,8 @@ async def run_gemini_analysis(seraphine_analysis, grouped_image_paths, image_pat
                 image_path=image_path,
                 seraphine_analysis=seraphine_analysis,
                 filename_base=filename_base,
-                return_direct_images=True
+                return_direct_images=True,
+                exclude_labels={icon['id'] for icon in cached_icons}
             )
             
             # Extract direct images from result
@@ -134,20 +189,23 @@ async def run_gemini_analysis(seraphine_analysis, grouped_image_paths, image_pat
             gemini_results = await analyzer.analyze_grouped_images(
                 grouped_image_paths=None,
                 filename_base=filename_base,
-                direct_images=direct_images
+                direct_images=direct_images,
+                crop_hashes=crop_hashes,
+                cached_icons=cached_icons
             )
         else:
             debug_print("   📁 Using file mode (traditional)")
-            # Use traditional file mode
+            # Use traditional file mode - composites already exist, so the cache is only filled here
             gemini_results = await analyzer.analyze_grouped_images(
                 grouped_image_paths=grouped_image_paths,
                 filename_base=filename_base,
-                direct_images=None
+                direct_images=None,
+                crop_hashes=crop_hashes
             )
         
         debug_print(f"✅ Gemini analysis complete:")
         debug_print(f"   🖼️  Analyzed: {gemini_results['successful_analyses']}/{gemini_results['total_images_analyzed']} images")
-        debug_print(f"   🎯 Total icons found: {gemini_results['total_icons_found']}")
+        debug_print(f"   🎯 Total icons found: {gemini_results['total_icons_found']} ({gemini_results['cached_icons']} from label cache)")
         debug_print(f"   ⏱️  Analysis time: {gemini_results['analysis_duration_seconds']:.2f}s")
         
         return gemini_results
@@ -158,3 +216,6 @@ async def run_gemini_analysis(seraphine_analysis, grouped_image_paths, image_pat
     except Exception as e:
         debug_print(f"❌ Gemini analysis failed: {str(e)}")
         return None
+    finally:
+        if label_cache:
+            label_cache.close()
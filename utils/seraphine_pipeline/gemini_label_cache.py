@@ -0,0 +1,194 @@
+"""
+Gemini label cache
+Persists Gemini icon labels per individual crop (crop pixel hash + prompt hash) in SQLite,
+so icons that repeat across states and apps are labelled once and never re-sent.
+"""
+
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Iterable, Tuple
+from PIL import Image
+from .helpers import debug_print
+
+LABEL_FIELDS = ('name', 'usage', 'enabled', 'interactive', 'type')
+
+def compute_crop_hash(crop: Image.Image) -> str:
+    """Exact pixel hash of a single crop (size + RGB bytes)"""
+    rgb = crop.convert('RGB')
+    hash_obj = hashlib.sha256(f"{rgb.size[0]}x{rgb.size[1]}".encode('utf-8'))
+    hash_obj.update(rgb.tobytes())
+    return hash_obj.hexdigest()
+
+def compute_prompt_hash(prompt: str, model_name: str) -> str:
+    """Labels are only reused for the same prompt text and model"""
+    return hashlib.sha256(f"{model_name}\n{prompt}".encode('utf-8')).hexdigest()[:16]
+
+def compute_group_crop_hashes(bbox_processor, image: Image.Image, group_ids: Iterable[str]) -> Dict[str, str]:
+    """
+    Hash every crop that would be placed in the Gemini composites
+
+    Returns:
+        Dict mapping composite label ("H1_2") -> crop hash
+    """
+    crop_hashes = {}
+    for group_id in group_ids:
+        for i, bbox in enumerate(bbox_processor.final_groups.get(group_id, [])):
+            x1, y1 = max(0, bbox.x1), max(0, bbox.y1)
+            x2, y2 = min(image.width, bbox.x2), min(image.height, bbox.y2)
+            if x1 >= x2 or y1 >= y2:
+                continue  # Placeholder crop - always send to Gemini
+            crop_hashes[f"{group_id}_{i+1}"] = compute_crop_hash(image.crop((x1, y1, x2, y2)))
+    return crop_hashes
+
+class GeminiLabelCache:
+    """
+    SQLite store of Gemini labels keyed by (crop_hash, prompt_hash)
+    Survives restarts; safe to share between the async analysis tasks of one process.
+    """
+
+    def __init__(self, cache_path: str = "cache/gemini_label_cache.db"):
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS crop_labels (
+                crop_hash TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                name TEXT NOT NULL,
+                usage TEXT NOT NULL,
+                enabled INTEGER NOT NULL,
+                interactive INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (crop_hash, prompt_hash)
+            )
+        """)
+        self._conn.commit()
+
+    def get_many(self, crop_hashes: Iterable[str], prompt_hash: str) -> Dict[str, Dict[str, Any]]:
+        """Look up labels for a batch of crops; returns {crop_hash: label} for the hits only"""
+        unique_hashes = list(set(crop_hashes))
+        found = {}
+
+        with self._lock:
+            # Chunk to stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique_hashes), 500):
+                chunk = unique_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT crop_hash, name, usage, enabled, interactive, type FROM crop_labels "
+                    f"WHERE prompt_hash = ? AND crop_hash IN ({placeholders})",
+                    [prompt_hash, *chunk]
+                ).fetchall()
+
+                for crop_hash, name, usage, enabled, interactive, g_type in rows:
+                    found[crop_hash] = {
+                        'name': name,
+                        'usage': usage,
+                        'enabled': bool(enabled),
+                        'interactive': bool(interactive),
+                        'type': g_type
+                    }
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE crop_labels SET last_used = ? WHERE crop_hash = ? AND prompt_hash = ?",
+                    [(now, crop_hash, prompt_hash) for crop_hash in found]
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(unique_hashes) - len(found)
+
+        return found
+
+    def put_many(self, labels: List[Tuple[str, Dict[str, Any]]], prompt_hash: str) -> int:
+        """Store (crop_hash, icon) pairs as returned by GeminiIconAnalyzer._parse_gemini_response"""
+        now = time.time()
+        rows = [
+            (crop_hash, prompt_hash, str(icon.get('name', 'unknown')), str(icon.get('usage', '')),
+             int(bool(icon.get('enabled', True))), int(bool(icon.get('interactive', True))),
+             str(icon.get('type', 'icon')), now, now)
+            for crop_hash, icon in labels
+        ]
+        if not rows:
+            return 0
+
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO crop_labels VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+        debug_print(f"💾 Cached {len(rows)} Gemini crop labels")
+        return len(rows)
+
+    def clear(self, prompt_hash: str = None) -> None:
+        """Drop all labels, or only those produced with one prompt"""
+        with self._lock:
+            if prompt_hash:
+                self._conn.execute("DELETE FROM crop_labels WHERE prompt_hash = ?", (prompt_hash,))
+            else:
+                self._conn.execute("DELETE FROM crop_labels")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM crop_labels").fetchone()[0]
+        return {'labels': count, 'hits': self.hits, 'misses': self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def test_label_cache() -> bool:
+    """Round-trip labels for two synthetic crops on a throwaway database"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = GeminiLabelCache(os.path.join(temp_dir, "labels.db"))
+        red = compute_crop_hash(Image.new('RGB', (16, 16), 'red'))
+        blue = compute_crop_hash(Image.new('RGB', (16, 16), 'blue'))
+        prompt_hash = compute_prompt_hash("prompt", "model")
+
+        icon = {'id': 'H0_1', 'name': 'Save', 'usage': 'Saves the file', 'enabled': True, 'interactive': True, 'type': 'icon'}
+        cache.put_many([(red, icon)], prompt_hash)
+
+        assert cache.get_many([red, blue], prompt_hash) == {red: {k: icon[k] for k in LABEL_FIELDS}}
+        assert cache.get_many([red], compute_prompt_hash("new prompt", "model")) == {}
+        cache.close()
+
+    print("✅ Gemini label cache round-trip passed")
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gemini per-crop label cache")
+    parser.add_argument("--test", action="store_true", help="Run the cache self-test")
+    parser.add_argument("--stats", action="store_true", help="Show label count for the cache file")
+    parser.add_argument("--clear", action="store_true", help="Delete all cached labels")
+    parser.add_argument("--cache-path", default="cache/gemini_label_cache.db", help="Cache database path")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_label_cache() else 1)
+    elif args.stats or args.clear:
+        cache = GeminiLabelCache(args.cache_path)
+        if args.clear:
+            cache.clear()
+        print(cache.stats())
+        cache.close()
+    else:
+        print("Usage: python -m seraphine_pipeline.gemini_label_cache --test | --stats | --clear")
@@ -1,31 +1,93 @@
 import os
 import json
+import copy
+import time
+import threading
 from functools import wraps
 
+CONFIG_PATH = "utils/seraphine_pipeline/config.json"
+CONFIG_RECHECK_INTERVAL = 1.0  # Seconds between mtime checks on the hot debug path
+
+class ConfigCache:
+    """
+    Process-wide cache for config.json
+    Loads the file once, hot-reloads it when its mtime changes and keeps a
+    precomputed debug flag so disabled debug_print calls skip all file I/O.
+    """
+
+    def __init__(self, config_path: str = CONFIG_PATH, recheck_interval: float = CONFIG_RECHECK_INTERVAL):
+        self.config_path = config_path
+        self.recheck_interval = recheck_interval
+        self.debug_enabled = False
+        self._config = None
+        self._mtime = None
+        self._last_check = None
+        self._lock = threading.Lock()
+
+    def _refresh(self, report_errors: bool) -> None:
+        """Reload config.json if it changed on disk since the last load"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                mtime = os.stat(self.config_path).st_mtime_ns
+            except OSError:
+                if report_errors:
+                    print(f"Error: Configuration file '{self.config_path}' not found!")
+                self._config, self._mtime, self.debug_enabled = None, None, False
+                return
+
+            if mtime == self._mtime and self._config is not None:
+                return
+
+            try:
+                with open(self.config_path, "r") as f:
+                    config = json.load(f)
+            except Exception as e:
+                if report_errors:
+                    print(f"Error loading configuration: {e}")
+                self._config, self._mtime, self.debug_enabled = None, None, False
+                return
+
+            self._config = config
+            self._mtime = mtime
+            self.debug_enabled = config.get("mode", "").lower() == "debug"
+
+    def get(self):
+        """Return a private copy of the current config (callers may mutate it)"""
+        self._refresh(report_errors=True)
+        return copy.deepcopy(self._config) if self._config is not None else None
+
+    def is_debug(self) -> bool:
+        """Cheap debug check - only stats the file every recheck_interval seconds"""
+        if self._last_check is None or time.monotonic() - self._last_check >= self.recheck_interval:
+            self._refresh(report_errors=False)
+        return self.debug_enabled
+
+    def invalidate(self) -> None:
+        """Force a reload on the next access"""
+        with self._lock:
+            self._config = None
+            self._mtime = None
+            self._last_check = None
+
+# Global instance
+config_cache = ConfigCache()
+
 def load_configuration():
-    """Load and validate configuration from config.json"""
-    config_path = "utils/seraphine_pipeline/config.json"
-    
-    if not os.path.exists(config_path):
-        print(f"Error: Configuration file '{config_path}' not found!")
-        return None
-    
-    try:
-        with open(config_path, "r") as f:
-            config = json.load(f)
-        return config
-    except Exception as e:
-        print(f"Error loading configuration: {e}")
-        return None
+    """Load and validate configuration from config.json (cached, reloaded on change)"""
+    return config_cache.get()
+
+def is_debug_enabled() -> bool:
+    """Precomputed debug flag - use to skip building expensive debug messages"""
+    return config_cache.is_debug()
 
 def debug_only(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        config = load_configuration()
-        if config and config.get("mode", "").lower() == "debug":
+        if config_cache.is_debug():
             return func(*args, **kwargs)
     return wrapper
 
 @debug_only
 def debug_print(*args, **kwargs):
-    print(*args, **kwargs)
\ No newline at end of file
+    print(*args, **kwargs)
@@ -0,0 +1,276 @@
+"""
+Region-of-interest incremental detection
+A click usually changes a small part of the screen (a menu, a dialog, a tooltip). Given the
+previous frame's merged detections and the changed-pixel mask from
+VisualDiffer.compute_change_mask, only the dirty tiles are detected again - each connected
+group of dirty tiles as one crop with some unchanged context around it - and the new boxes
+are spliced into the previous set. Too large a change falls back to a full detection.
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .helpers import debug_print
+from .tracing import span
+from .yolo_detector import tile_edge_cuts
+
+@dataclass
+class IncrementalConfig:
+    """Settings for IncrementalDetector"""
+    tile_size: int = 128               # Dirty-tile grid cell in frame pixels
+    context: int = 48                  # Unchanged pixels around a dirty region given to the detectors
+    min_changed_pixels: int = 16       # Changed pixels needed to mark a tile dirty (ignores speckle)
+    max_dirty_fraction: float = 0.5    # Above this share of dirty tiles the whole frame is detected again
+    containment: float = 0.5           # Overlap (of the smaller box) for a cut box to count as the same object
+
+Box = Tuple[int, int, int, int]
+
+def dirty_tile_grid(change_mask: np.ndarray, tile_size: int = 128, min_changed_pixels: int = 16) -> np.ndarray:
+    """(rows, cols) bool grid - tiles with at least min_changed_pixels changed pixels"""
+    height, width = change_mask.shape[:2]
+    rows, cols = -(-height // tile_size), -(-width // tile_size)
+    padded = np.zeros((rows * tile_size, cols * tile_size), dtype=np.int32)
+    padded[:height, :width] = change_mask[:, :, 0] if change_mask.ndim == 3 else change_mask
+    counts = np.count_nonzero(padded.reshape(rows, tile_size, cols, tile_size), axis=(1, 3))
+    return counts >= max(1, min_changed_pixels)
+
+def _expand(region: Box, margin: int, frame_size: Tuple[int, int]) -> Box:
+    x1, y1, x2, y2 = region
+    return max(0, x1 - margin), max(0, y1 - margin), min(frame_size[0], x2 + margin), min(frame_size[1], y2 + margin)
+
+def _touches(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def dirty_regions(grid: np.ndarray, tile_size: int, frame_size: Tuple[int, int], context: int = 0) -> List[Box]:
+    """
+    Crop rectangles (x1, y1, x2, y2) covering the dirty tiles, context included
+    Connected dirty tiles form one region; regions whose crops would overlap are joined,
+    so no part of the frame is detected twice.
+    """
+    count, _, stats, _ = cv2.connectedComponentsWithStats(grid.astype(np.uint8), connectivity=8)
+    regions = []
+    for col, row, cols, rows, _ in stats[1:count]:
+        tiles = (col * tile_size, row * tile_size, (col + cols) * tile_size, (row + rows) * tile_size)
+        regions.append(_expand(tiles, context, frame_size))
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                if _touches(regions[i], regions[j]):
+                    a, b = regions[i], regions.pop(j)
+                    regions[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    merged = True
+                    break
+            if merged:
+                break
+    return sorted(regions, key=lambda region: (region[1], region[0]))
+
+def _tile_hits(boxes: np.ndarray, grid: np.ndarray, tile_size: int) -> np.ndarray:
+    """Mask of boxes overlapping at least one dirty tile"""
+    hits = np.zeros(len(boxes), dtype=bool)
+    rows, cols = grid.shape
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        c1, r1 = max(0, int(x1) // tile_size), max(0, int(y1) // tile_size)
+        c2, r2 = min(cols, -(-int(x2) // tile_size)), min(rows, -(-int(y2) // tile_size))
+        hits[i] = c2 > c1 and r2 > r1 and bool(grid[r1:r2, c1:c2].any())
+    return hits
+
+def _bbox_array(detections: List[Dict[str, Any]]) -> np.ndarray:
+    return np.array([detection['bbox'][:4] for detection in detections], dtype=np.float64).reshape(-1, 4)
+
+def _overlap_of_smaller(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    iw = np.clip(np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0, None)
+    ih = np.clip(np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return iw * ih / np.maximum(np.minimum(area, areas), 1e-9)
+
+class IncrementalDetector:
+    """
+    Detect only what changed since the previous frame
+
+    Args:
+        processor: ParallelProcessor (or anything with process_image(img_bgr, output_dir) -> results)
+        config: IncrementalConfig
+    """
+
+    def __init__(self, processor, config: IncrementalConfig = None):
+        self.processor = processor
+        self.config = config or IncrementalConfig()
+
+    def _detect_full(self, img_bgr: np.ndarray, output_dir: str) -> Dict[str, List[Dict[str, Any]]]:
+        results = self.processor.process_image(img_bgr, output_dir)
+        return {key: results.get(key, []) for key in ('yolo_detections', 'ocr_detections', 'merged_detections')}
+
+    @staticmethod
+    def _offset(detections: List[Dict[str, Any]], dx: int, dy: int) -> List[Dict[str, Any]]:
+        """Copies of crop detections in frame coordinates"""
+        shifted = []
+        for detection in detections:
+            x1, y1, x2, y2 = detection['bbox'][:4]
+            shifted.append(dict(detection, bbox=[x1 + dx, y1 + dy, x2 + dx, y2 + dy]))
+        return shifted
+
+    def detect(self, img_bgr: np.ndarray, previous_detections: Optional[List[Dict[str, Any]]],
+               change_mask: Optional[np.ndarray], output_dir: str = "temp") -> Dict[str, Any]:
+        """
+        Merged detections for img_bgr, reusing previous_detections outside the changed area
+
+        Returns:
+            merged_detections: Reused + new detections for the whole frame
+            new_detections: Detections found in the dirty regions (what changed)
+            yolo_detections / ocr_detections: Raw detector output for the re-detected area
+            reused_detections: Previous detections outside the dirty tiles
+            removed_count: Previous detections dropped because their area changed
+            dirty_regions / dirty_fraction / mode ("incremental", "full" or "unchanged") / timing
+        """
+        start = time.time()
+        cfg = self.config
+        height, width = img_bgr.shape[:2]
+        frame_size = (width, height)
+
+        result = {'merged_detections': [], 'new_detections': [], 'reused_detections': [], 'removed_count': 0,
+                  'yolo_detections': [], 'ocr_detections': [],
+                  'dirty_regions': [], 'dirty_fraction': 1.0, 'mode': 'full', 'timing': {}}
+
+        grid = None
+        if previous_detections is not None and change_mask is not None:
+            if change_mask.shape[:2] != (height, width):
+                change_mask = cv2.resize(change_mask.astype(np.uint8), frame_size, interpolation=cv2.INTER_NEAREST)
+            grid = dirty_tile_grid(change_mask, cfg.tile_size, cfg.min_changed_pixels)
+            result['dirty_fraction'] = float(grid.mean()) if grid.size else 0.0
+
+        if grid is None or result['dirty_fraction'] > cfg.max_dirty_fraction:
+            with span("incremental_full"):
+                detections = self._detect_full(img_bgr, output_dir)
+            result.update(detections, new_detections=detections['merged_detections'])
+            result['timing']['total_time'] = time.time() - start
+            debug_print(f"🧩 Incremental detection: full frame ({result['dirty_fraction']:.0%} dirty)")
+            return result
+
+        previous_boxes = _bbox_array(previous_detections)
+        stale = _tile_hits(previous_boxes, grid, cfg.tile_size)
+        reused = [detection for detection, is_stale in zip(previous_detections, stale) if not is_stale]
+        stale_detections = [detection for detection, is_stale in zip(previous_detections, stale) if is_stale]
+        regions = dirty_regions(grid, cfg.tile_size, frame_size, cfg.context)
+        result.update(reused_detections=reused, removed_count=len(stale_detections), dirty_regions=regions)
+
+        if not regions:
+            result.update(merged_detections=list(previous_detections), mode='unchanged')
+            result['timing']['total_time'] = time.time() - start
+            return result
+
+        new_detections = []
+        restored = set()
+        stale_boxes = _bbox_array(stale_detections)
+        for region in regions:
+            x1, y1, x2, y2 = region
+            with span("incremental_region", region=f"{x2 - x1}x{y2 - y1}"):
+                crop_detections = self._detect_full(np.ascontiguousarray(img_bgr[y1:y2, x1:x2]), output_dir)
+            for key in ('yolo_detections', 'ocr_detections'):
+                result[key].extend(self._offset(crop_detections[key], x1, y1))
+
+            shifted = self._offset(crop_detections['merged_detections'], x1, y1)
+            boxes = _bbox_array(shifted)
+
+            # Boxes only in the context band are already covered by reused detections
+            in_dirty_area = _tile_hits(boxes, grid, cfg.tile_size)
+            cut = tile_edge_cuts(boxes, region, frame_size)
+            for i, detection in enumerate(shifted):
+                if not in_dirty_area[i]:
+                    continue
+                if cut[i] and len(stale_boxes):
+                    # Cut by the crop: an object larger than the region - keep its previous box if it had one
+                    overlaps = _overlap_of_smaller(boxes[i], stale_boxes)
+                    best = int(np.argmax(overlaps))
+                    if overlaps[best] >= cfg.containment:
+                        restored.add(best)
+                        continue
+                new_detections.append(detection)
+
+        reused = reused + [stale_detections[i] for i in sorted(restored)]
+        merged = sorted(reused + new_detections, key=lambda detection: (detection['bbox'][1], detection['bbox'][0]))
+        result.update(merged_detections=merged, new_detections=new_detections, reused_detections=reused,
+                      removed_count=len(stale_detections) - len(restored), mode='incremental')
+        result['timing']['total_time'] = time.time() - start
+
+        debug_print(f"🧩 Incremental detection: {len(regions)} region(s), {result['dirty_fraction']:.0%} dirty, "
+                    f"{len(reused)} reused + {len(new_detections)} new ({result['removed_count']} replaced) "
+                    f"in {result['timing']['total_time']:.3f}s")
+        return result
+
+def test_incremental_detector() -> bool:
+    """Reuse, splicing and fallback on a synthetic screen (a dark-blob detector keeps the check model-free)"""
+
+    class BlobProcessor:
+        """Stand-in for ParallelProcessor: every dark blob is one detection"""
+        def __init__(self):
+            self.pixels = 0
+
+        def process_image(self, img_bgr, output_dir):
+            self.pixels += img_bgr.shape[0] * img_bgr.shape[1]
+            dark = (img_bgr.mean(axis=2) < 128).astype(np.uint8)
+            count, _, stats, _ = cv2.connectedComponentsWithStats(dark)
+            return {'merged_detections': [{'bbox': [int(x), int(y), int(x + w), int(y + h)], 'type': 'icon'}
+                                          for x, y, w, h, _ in stats[1:count]]}
+
+    def draw(image, boxes):
+        for x1, y1, x2, y2 in boxes:
+            image[y1:y2, x1:x2] = 0
+
+    root = np.full((1080, 1920, 3), 255, dtype=np.uint8)
+    icons = [(40 + 90 * i, 20, 80 + 90 * i, 60) for i in range(20)] + [(100, 900, 700, 940)]
+    draw(root, icons)
+
+    processor = BlobProcessor()
+    detector = IncrementalDetector(processor)
+    previous = processor.process_image(root, "temp")['merged_detections']
+
+    # A menu opens below the toolbar
+    after = root.copy()
+    menu = [(400, 200, 600, 230), (400, 250, 560, 280), (400, 300, 620, 330)]
+    draw(after, menu)
+    change_mask = (np.abs(after.astype(np.int16) - root).max(axis=2) > 15)
+
+    processor.pixels = 0
+    result = detector.detect(after, previous, change_mask)
+    full = processor.process_image(after, "temp")['merged_detections']
+    assert result['mode'] == 'incremental', result['mode']
+    assert sorted(map(tuple, (d['bbox'] for d in result['merged_detections']))) == \
+        sorted(map(tuple, (d['bbox'] for d in full)))
+    assert sorted(tuple(d['bbox']) for d in result['new_detections']) == sorted(menu)
+    assert len(result['reused_detections']) == len(icons) and result['removed_count'] == 0
+    detected_share = (processor.pixels - after.shape[0] * after.shape[1]) / (after.shape[0] * after.shape[1])
+    assert detected_share < 0.1, detected_share
+
+    # A label changes inside a bar wider than the dirty region - the bar keeps its previous box
+    edited = after.copy()
+    edited[905:935, 300:340] = 255
+    result = detector.detect(edited, result['merged_detections'], np.abs(edited.astype(np.int16) - after).max(axis=2) > 15)
+    assert (100, 900, 700, 940) in [tuple(d['bbox']) for d in result['merged_detections']], result['merged_detections']
+
+    # Nothing changed / everything changed
+    assert detector.detect(after, previous, np.zeros(after.shape[:2], bool))['mode'] == 'unchanged'
+    full_result = detector.detect(after, previous, np.ones(after.shape[:2], bool))
+    assert full_result['mode'] == 'full' and len(full_result['merged_detections']) == len(full)
+
+    print(f"✅ Incremental detection: {len(menu)} new + {len(icons)} reused boxes, "
+          f"{detected_share:.1%} of the frame detected again")
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Region-of-interest incremental detection")
+    parser.add_argument("--test", action="store_true", help="Run the incremental detection self-test")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_incremental_detector() else 1)
+    else:
+        print("Usage: python -m seraphine_pipeline.incremental_detector --test")
@@ -6,13 +6,14 @@ No imports from original files allowed.
 import time
 import numpy as np
 import cv2
-import onnxruntime as ort
-from PIL import Image
 from dataclasses import dataclass
 from typing import List, Dict, Any, Tuple
 import requests
 import os
 from .helpers import debug_print
+from .frame_store import load_frame_bgr
+from .tracing import span
+from .session_pool import SessionPool, SessionPoolConfig, get_session_pool, resolve_model_variant
 
 @dataclass
 class OCRDetConfig:
@@ -22,11 +23,27 @@ class OCRDetConfig:
     enable_timing: bool = True
     enable_debug: bool = False
     model_path: str = "models/ch_PP-OCRv3_det_infer.onnx"
+    model_variant: str = "fp32"  # "int8_dynamic" / "int8_static" - built by quantization.py
     min_box_size: int = 3
     use_dilation: bool = True
     padding_x: int = 5  # Fixed horizontal padding
     padding_y_percent: float = 0.30  # Vertical padding percentage
     min_padding_y: int = 5
+    # ONNX session pool (0 threads = OCR's share of the cores)
+    intra_op_threads: int = 0
+    inter_op_threads: int = 1
+    num_sessions: int = 1
+    pin_threads: bool = False
+    warmup: bool = True
+    
+    def session_pool_config(self) -> SessionPoolConfig:
+        return SessionPoolConfig(role="ocr", intra_op_threads=self.intra_op_threads,
+                                 inter_op_threads=self.inter_op_threads, num_sessions=self.num_sessions,
+                                 pin_threads=self.pin_threads, warmup=self.warmup)
+    
+    def inference_model_path(self) -> str:
+        """Model file actually loaded for model_variant (falls back to FP32 when not built)"""
+        return resolve_model_variant(self.model_path, self.model_variant)
 
 class OCRDetMemoryPool:
     """Memory pool for OCR detection"""
@@ -46,56 +63,58 @@ class OCRDetMemoryPool:
         self.used_boxes = 0
 
 class OCRModelCache:
-    """Singleton cache for OCR detection model"""
+    """Singleton cache of warm OCR detection session pools (see session_pool.py)"""
     _instance = None
-    _session = None
-    _model_path = None
+    _pool = None
+    _pool_key = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def get_session(self, model_path):
-        if self._session is None or self._model_path != model_path:
-            if self._session is None:
+    def get_pool(self, model_path, pool_config: SessionPoolConfig = None) -> SessionPool:
+        pool_config = pool_config or OCRDetConfig().session_pool_config()
+        if self._pool is None or self._pool_key != (model_path, pool_config):
+            if self._pool is None:
                 debug_print("  Loading CPU-optimized OCR detection model...")
             else:
                 debug_print("  Reloading OCR detection model...")
             load_start = time.time()
             
-            so = ort.SessionOptions()
-            so.log_severity_level = 3
-            so.enable_mem_pattern = True
-            so.enable_mem_reuse = True
-            so.enable_cpu_mem_arena = True
-            so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-            
-            providers = [("CPUExecutionProvider", {
-                "enable_cpu_mem_arena": True,
-                "arena_extend_strategy": "kSameAsRequested",
-                "initial_chunk_size_bytes": 1024 * 1024 * 32,
-                "max_mem": 1024 * 1024 * 512
-            })]
-            
-            self._session = ort.InferenceSession(model_path, sess_options=so, providers=providers)
-            self._model_path = model_path
+            self._pool = get_session_pool(model_path, pool_config)
+            self._pool_key = (model_path, pool_config)
             
             load_time = time.time() - load_start
             debug_print(f"  OCR detection model loading: {load_time:.3f}s")
         
-        return self._session
+        return self._pool
+    
+    def get_session(self, model_path):
+        """First session of the pool (single-session callers)"""
+        return self.get_pool(model_path).sessions[0]
 
 # Global instances
 ocr_memory_pool = OCRDetMemoryPool()
 ocr_model_cache = OCRModelCache()
 
+# Normalisation folded into one scale + offset per channel (RGB order)
+DET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+DET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+DET_SCALE = (1.0 / (255.0 * DET_STD)).astype(np.float32)
+DET_OFFSET = (DET_MEAN / DET_STD).astype(np.float32)
+
 def preprocess_det(image, max_side_len, enable_timing=True):
-    """Detection preprocessing"""
+    """
+    Detection preprocessing
+    
+    Args:
+        image: BGR numpy array (read directly, no copy) or PIL image
+    """
     preprocess_start = time.time()
     
-    img = np.array(image)
-    height, width, _ = img.shape
+    img_bgr = load_frame_bgr(image)
+    height, width, _ = img_bgr.shape
     
     ratio = min(max_side_len / float(width), max_side_len / float(height))
     resize_w = int(width * ratio)
@@ -104,12 +123,16 @@ def preprocess_det(image, max_side_len, enable_timing=True):
     resize_w = resize_w if resize_w % 32 == 0 else (resize_w // 32) * 32
     resize_h = resize_h if resize_h % 32 == 0 else (resize_h // 32) * 32
 
-    resized_img = image.resize((resize_w, resize_h), resample=Image.BILINEAR)
+    # Resize the full-size BGR array directly; INTER_AREA when shrinking matches PIL's
+    # antialiased bilinear closely and is much faster
+    interpolation = cv2.INTER_AREA if resize_w < width or resize_h < height else cv2.INTER_LINEAR
+    resized_bgr = cv2.resize(img_bgr, (resize_w, resize_h), interpolation=interpolation)
     
-    norm_img = np.array(resized_img).astype(np.float32) / 255.0
-    norm_img -= np.array([0.485, 0.456, 0.406])
-    norm_img /= np.array([0.229, 0.224, 0.225])
-    norm_img = norm_img.transpose(2, 0, 1)[np.newaxis, :]
+    # BGR -> RGB, CHW and normalisation on the small image only, one float32 buffer
+    norm_img = np.empty((1, 3, resize_h, resize_w), dtype=np.float32)
+    for channel in range(3):
+        np.multiply(resized_bgr[:, :, 2 - channel], DET_SCALE[channel], out=norm_img[0, channel], casting='unsafe')
+        norm_img[0, channel] -= DET_OFFSET[channel]
 
     ratio_h = height / float(resize_h)
     ratio_w = width / float(resize_w)
@@ -164,7 +187,7 @@ class OCRDetector:
         Run OCR detection on image (no text recognition)
         
         Args:
-            image_input: Path to image file or numpy array
+            image_input: Path to image file, BGR numpy array, Frame or PIL image
             
         Returns:
             List of detection dictionaries with 'bbox' and metadata
@@ -173,34 +196,29 @@ class OCRDetector:
         
         if self.config.enable_timing:
             debug_print(f"\n📝 Starting OCR detection pipeline...")
-            debug_print(f"🤖 Model: {self.config.model_path}")
+            debug_print(f"🤖 Model: {self.config.inference_model_path()}")
             debug_print("=" * 60)
         
-        # Load image
-        if isinstance(image_input, np.ndarray):
-            # Convert BGR numpy to PIL RGB
-            img_rgb = cv2.cvtColor(image_input, cv2.COLOR_BGR2RGB) 
-            image = Image.fromarray(img_rgb)
-        elif isinstance(image_input, str):
-            image = Image.open(image_input).convert("RGB")
-        else:
-            image = image_input.convert("RGB")
-        
-        # Image setup
+        # Image setup - BGR arrays (e.g. shared by ParallelProcessor) are used as-is, no copy;
+        # paths and Frames come from the in-memory frame store when just captured
         setup_start = time.time()
-        np_img = np.array(image)
-        img_height, img_width = np_img.shape[:2]
+        img_bgr = load_frame_bgr(image_input)
+        if img_bgr is None:
+            raise ValueError(f"Could not load image for OCR: {image_input}")
+        img_height, img_width = img_bgr.shape[:2]
         setup_time = time.time() - setup_start
         
         # Detection preprocessing
-        det_input, ratio_h, ratio_w, det_preprocess_time = preprocess_det(
-            image, self.config.max_side_len, self.config.enable_timing
-        )
+        with span("preprocess"):
+            det_input, ratio_h, ratio_w, det_preprocess_time = preprocess_det(
+                img_bgr, self.config.max_side_len, self.config.enable_timing
+            )
         
         # Detection inference
         det_inference_start = time.time()
-        session = ocr_model_cache.get_session(self.config.model_path)
-        det_output = session.run(None, {"x": det_input})[0]
+        with span("inference", input_size=f"{det_input.shape[3]}x{det_input.shape[2]}"):
+            pool = ocr_model_cache.get_pool(self.config.inference_model_path(), self.config.session_pool_config())
+            det_output = pool.run(None, {pool.input_name: det_input})[0]
         det_inference_time = time.time() - det_inference_start
         
         if self.config.enable_timing:
@@ -208,11 +226,12 @@ class OCRDetector:
         
         # Extract boxes
         score_map = det_output[0][0]
-        boxes, box_extraction_time = extract_boxes_opencv(
-            score_map, ratio_w, ratio_h, 
-            self.config.det_threshold, self.config.min_box_size, 
-            self.config.use_dilation, self.config.enable_timing
-        )
+        with span("box_extraction"):
+            boxes, box_extraction_time = extract_boxes_opencv(
+                score_map, ratio_w, ratio_h, 
+                self.config.det_threshold, self.config.min_box_size, 
+                self.config.use_dilation, self.config.enable_timing
+            )
         
         if not boxes:
             if self.config.enable_timing:
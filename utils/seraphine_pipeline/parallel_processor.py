@@ -6,12 +6,15 @@ import time
 import threading
 import json
 import os
+import numpy as np
 from typing import List, Dict, Any, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from .helpers import debug_print
+from .frame_store import Frame, load_frame_bgr, describe_image_input
+from .tracing import span, current_span
 
-from .yolo_detector import YOLODetector, YOLOConfig
-from .ocr_detector import OCRDetector, OCRDetConfig
+from .yolo_detector import YOLODetector, YOLOConfig, model_cache
+from .ocr_detector import OCRDetector, OCRDetConfig, ocr_model_cache
 from .bbox_merger import BBoxMerger
 try:
     from .yolo_visualizer import DetectionVisualizer
@@ -30,7 +33,9 @@ class ParallelProcessor:
                  merger_iou_threshold: float = 0.1,
                  enable_timing: bool = True,
                  create_visualizations: bool = True,
-                 save_intermediate_results: bool = True):
+                 save_intermediate_results: bool = True,
+                 backend: str = "thread",
+                 num_processes: int = 0):
         """
         Initialize parallel processor
         
@@ -41,6 +46,9 @@ class ParallelProcessor:
             enable_timing: Whether to print timing information
             create_visualizations: Whether to create visualization images
             save_intermediate_results: Whether to save intermediate JSON files
+            backend: "thread" (detectors on threads of this process) or "process" (worker
+                     processes fed through shared memory - see process_backend.py)
+            num_processes: Worker processes for the process backend (0 = automatic)
         """
         self.yolo_config = yolo_config or YOLOConfig()
         self.ocr_config = ocr_config or OCRDetConfig()
@@ -53,6 +61,15 @@ class ParallelProcessor:
         self.ocr_detector = OCRDetector(self.ocr_config)
         self.merger = BBoxMerger(iou_threshold=merger_iou_threshold, enable_timing=enable_timing)
         
+        # Optional worker processes - shared by every ParallelProcessor with the same settings
+        self.process_backend = None
+        if backend == "process":
+            from .process_backend import get_process_backend
+            self.process_backend = get_process_backend(self.yolo_config, self.ocr_config,
+                                                       merger_iou_threshold, num_processes)
+        elif backend != "thread":
+            raise ValueError(f"Unknown detection backend: {backend}")
+        
         # Initialize visualizer if needed
         if self.create_visualizations and DetectionVisualizer is not None:
             self.visualizer = DetectionVisualizer()
@@ -60,12 +77,40 @@ class ParallelProcessor:
             debug_print("⚠️  DetectionVisualizer not available, skipping visualizations")
             self.create_visualizations = False
     
-    def process_image(self, image_path: str, output_dir: str = "outputs") -> Dict[str, Any]:
+    def warm_up(self, background: bool = False) -> List[threading.Thread]:
+        """
+        Load and warm both session pools ahead of the first screenshot (in parallel)
+        
+        Args:
+            background: Return immediately; the first detect() waits for the pools instead
+        """
+        if self.process_backend is not None:
+            self.process_backend.warm_up(wait=not background)  # Workers hold the sessions
+            return []
+        
+        def load(cache, config, name):
+            try:
+                cache.get_pool(config.inference_model_path(), config.session_pool_config())
+            except Exception as e:
+                debug_print(f"⚠️  {name} warm-up failed: {e}")
+        
+        threads = [
+            threading.Thread(target=load, args=(model_cache, self.yolo_config, "YOLO"), name="yolo_warmup", daemon=True),
+            threading.Thread(target=load, args=(ocr_model_cache, self.ocr_config, "OCR"), name="ocr_warmup", daemon=True)
+        ]
+        for thread in threads:
+            thread.start()
+        if not background:
+            for thread in threads:
+                thread.join()
+        return threads
+    
+    def process_image(self, image_input, output_dir: str = "outputs") -> Dict[str, Any]:
         """
         Process image with parallel YOLO and OCR detection, then merge results
         
         Args:
-            image_path: Path to input image
+            image_input: Path to input image, BGR numpy array or captured Frame
             output_dir: Directory to save results
             
         Returns:
@@ -73,9 +118,20 @@ class ParallelProcessor:
         """
         total_start = time.time()
         
+        # Decode once - both detectors read the same in-memory BGR pixels
+        if isinstance(image_input, Frame):
+            image_path = image_input.path or "frame"
+        elif isinstance(image_input, np.ndarray):
+            image_path = "frame"
+        else:
+            image_path = image_input
+        img_bgr = load_frame_bgr(image_input)
+        if img_bgr is None:
+            raise ValueError(f"Could not load image: {describe_image_input(image_input)}")
+        
         if self.enable_timing:
             debug_print(f"\n🚀 Starting parallel detection pipeline...")
-            debug_print(f"📁 Image: {image_path}")
+            debug_print(f"📁 Image: {describe_image_input(image_input)}")
             debug_print(f"📁 Output directory: {output_dir}")
             debug_print("=" * 80)
         
@@ -96,25 +152,14 @@ class ParallelProcessor:
         # Run YOLO and OCR detection in parallel
         parallel_start = time.time()
         
-        def run_yolo():
-            if self.enable_timing:
-                debug_print(f"🎯 Thread: Starting YOLO detection...")
-            return self.yolo_detector.detect(image_path)
-        
-        def run_ocr():
-            if self.enable_timing:
-                debug_print(f"📝 Thread: Starting OCR detection...")
-            return self.ocr_detector.detect(image_path)
+        # Worker threads don't inherit the span context - hand them the parent explicitly
+        parent_span = current_span()
         
-        # Execute in parallel using ThreadPoolExecutor
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            # Submit both tasks
-            yolo_future = executor.submit(run_yolo)
-            ocr_future = executor.submit(run_ocr)
-            
-            # Wait for both to complete
-            yolo_detections = yolo_future.result()
-            ocr_detections = ocr_future.result()
+        if self.process_backend is not None:
+            with span("detect_processes"):
+                yolo_detections, ocr_detections = self.process_backend.detect_pair(img_bgr)
+        else:
+            yolo_detections, ocr_detections = self._detect_in_threads(img_bgr, parent_span)
         
         # 🎯 FIX: Assign intelligent IDs BEFORE merging!
         yolo_detections, ocr_detections = self.assign_intelligent_ids(yolo_detections, ocr_detections)
@@ -132,9 +177,73 @@ class ParallelProcessor:
         
         # Merge detections
         merge_start = time.time()
-        merged_detections, merge_stats = self.merger.merge_detections(yolo_detections, ocr_detections)
+        with span("merge") as merge_span:
+            merged_detections, merge_stats = self.merger.merge_detections(yolo_detections, ocr_detections)
+            if merge_span:
+                merge_span.set(detections=len(merged_detections))
         merge_time = time.time() - merge_start
         
+        return self._finish_results(results, image_path, output_dir, total_start, parallel_time,
+                                    merged_detections, merge_stats, merge_time)
+    
+    def process_batch(self, images: List[Any], output_dir: str = "outputs") -> List[Dict[str, Any]]:
+        """
+        Detect + merge many images
+        With the process backend every worker takes whole images (detection and merging), so
+        throughput scales with the number of workers; otherwise images run one after another.
+        """
+        if self.process_backend is None:
+            return [self.process_image(image_input, output_dir) for image_input in images]
+        
+        batch_start = time.time()
+        with span("process_batch", images=len(images)):
+            results = self.process_backend.process_batch(images)
+        
+        if self.enable_timing:
+            batch_time = time.time() - batch_start
+            debug_print(f"🧵 Batch of {len(images)} images in {batch_time:.3f}s "
+                        f"({len(images) / max(batch_time, 1e-6):.2f} images/s, {self.process_backend.num_workers} workers)")
+        
+        for result in results:
+            self._save_results(result, output_dir, result['image_path'])
+        return results
+    
+    def _detect_in_threads(self, img_bgr, parent_span):
+        """YOLO and OCR on two threads of this process"""
+        
+        def run_yolo():
+            if self.enable_timing:
+                debug_print(f"🎯 Thread: Starting YOLO detection...")
+            with span("yolo", parent=parent_span) as yolo_span:
+                detections = self.yolo_detector.detect(img_bgr)
+                if yolo_span:
+                    yolo_span.set(detections=len(detections))
+                return detections
+        
+        def run_ocr():
+            if self.enable_timing:
+                debug_print(f"📝 Thread: Starting OCR detection...")
+            with span("ocr", parent=parent_span) as ocr_span:
+                detections = self.ocr_detector.detect(img_bgr)
+                if ocr_span:
+                    ocr_span.set(detections=len(detections))
+                return detections
+        
+        # Execute in parallel using ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # Submit both tasks
+            yolo_future = executor.submit(run_yolo)
+            ocr_future = executor.submit(run_ocr)
+            
+            # Wait for both to complete
+            yolo_detections = yolo_future.result()
+            ocr_detections = ocr_future.result()
+        
+        return yolo_detections, ocr_detections
+    
+    def _finish_results(self, results, image_path, output_dir, total_start, parallel_time,
+                        merged_detections, merge_stats, merge_time):
+        """Visualizations, timing summary and intermediate files for one processed image"""
         results['merged_detections'] = merged_detections
         results['merge_stats'] = merge_stats
         
@@ -0,0 +1,279 @@
+"""
+Perceptual frame hashing
+Screens are compared through a small signature computed once per frame (and cached on the
+in-memory Frame): a fine_width-wide grayscale thumbnail plus a 64-bit perceptual hash of it
+(dHash, pHash or aHash - pluggable via register_hasher). A comparison is coarse-to-fine: a
+Hamming distance above coarse_threshold means "changed" at once; otherwise the thumbnails
+decide, ignoring up to max_changed_cells noisy cells and any masked region (caret, clock).
+Both stages work on a few thousand numbers, so a "no change" decision costs microseconds.
+A thumbnail cell averages ~20x20 pixels of a 2880-wide frame, so a small toggle (a 10 px
+checkbox tick) is below its resolution; when the caller knows where it clicked or hovered,
+focus_changed compares the pixels around that point exactly before "no change" is final.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .frame_store import frame_store, load_frame_bgr, describe_image_input
+from .frame_stability import frame_thumbnail
+
+HASH_SIZE = 8  # 8x8 = 64-bit hashes
+
+def _dhash_bits(gray: np.ndarray) -> np.ndarray:
+    """Difference hash: is each pixel brighter than its left neighbour"""
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    return small[:, 1:] > small[:, :-1]
+
+def _ahash_bits(gray: np.ndarray) -> np.ndarray:
+    """Average hash: is each pixel brighter than the mean"""
+    small = cv2.resize(gray, (HASH_SIZE, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    return small > small.mean()
+
+def _phash_bits(gray: np.ndarray) -> np.ndarray:
+    """DCT hash: low-frequency coefficients above their median"""
+    small = cv2.resize(gray, (4 * HASH_SIZE, 4 * HASH_SIZE), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small)[:HASH_SIZE, :HASH_SIZE]
+    return low > np.median(low.ravel()[1:])  # The DC term only carries brightness
+
+HASHERS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    'dhash': _dhash_bits,
+    'phash': _phash_bits,
+    'ahash': _ahash_bits,
+}
+
+def register_hasher(name: str, hasher: Callable[[np.ndarray], np.ndarray]) -> None:
+    """Add a hash method: float32 grayscale thumbnail -> boolean bit array"""
+    HASHERS[name] = hasher
+
+def bits_to_hex(bits: np.ndarray) -> str:
+    return np.packbits(bits.ravel()).tobytes().hex()
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """Differing bits between two hex hashes (hashes of different lengths differ completely)"""
+    if len(hash_a) != len(hash_b):
+        return 4 * max(len(hash_a), len(hash_b))
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+Region = Tuple[int, int, int, int]
+
+@dataclass
+class HashConfig:
+    """Settings for frame signatures and comparisons"""
+    method: str = "dhash"                       # Key of HASHERS
+    fine_width: int = 128                       # Thumbnail width for the fine stage
+    coarse_threshold: int = 10                  # Hash bits that may differ before the fine stage is skipped
+    pixel_tolerance: int = 12                   # Gray-level difference a thumbnail cell may have and still match
+    max_changed_cells: int = 2                  # Cells allowed to differ (a blinking caret)
+    focus_margin: int = 40                      # Half-size (frame pixels) of the exactly compared focus region
+    ignore_regions: Sequence[Region] = ()       # Frame pixels to ignore (x1, y1, x2, y2); negative = from the far edge
+
+    def cache_key(self) -> tuple:
+        return (self.method, self.fine_width, tuple(tuple(region) for region in self.ignore_regions))
+
+@dataclass
+class FrameSignature:
+    """What a frame comparison needs, computed once per frame"""
+    hash: str                   # Perceptual hash (hex) of the masked thumbnail
+    grid: np.ndarray            # Grayscale thumbnail (int16)
+    valid: np.ndarray           # Thumbnail cells outside the ignored regions
+    size: Tuple[int, int]       # Frame (width, height)
+
+@dataclass
+class ChangeCheck:
+    """Result of compare_signatures"""
+    changed: bool
+    distance: int               # Hamming distance of the hashes
+    changed_cells: int          # Thumbnail cells above pixel_tolerance (-1 if the fine stage was skipped)
+    stage: str                  # Deciding stage: "size", "coarse" or "fine"
+
+def valid_cells(frame_size: Tuple[int, int], grid_shape: Tuple[int, int], regions: Sequence[Region]) -> np.ndarray:
+    """Thumbnail cells not touched by any ignored region"""
+    width, height = frame_size
+    rows, cols = grid_shape
+    valid = np.ones(grid_shape, dtype=bool)
+    for x1, y1, x2, y2 in regions:
+        x1, x2 = (x + width if x < 0 else x for x in (x1, x2))
+        y1, y2 = (y + height if y < 0 else y for y in (y1, y2))
+        c1, c2 = int(x1 * cols // width), -(-int(x2 * cols) // width)
+        r1, r2 = int(y1 * rows // height), -(-int(y2 * rows) // height)
+        valid[max(0, r1):max(0, r2), max(0, c1):max(0, c2)] = False
+    return valid
+
+def frame_signature(frame: np.ndarray, config: HashConfig = None) -> FrameSignature:
+    """Signature of a BGR / BGRA / gray frame"""
+    config = config or HashConfig()
+    grid = frame_thumbnail(frame, config.fine_width)
+    size = (frame.shape[1], frame.shape[0])
+    valid = valid_cells(size, grid.shape, config.ignore_regions)
+
+    # Masked cells get one constant value, so whatever happens there cannot flip hash bits
+    hash_input = grid.astype(np.float32)
+    if not valid.all():
+        hash_input[~valid] = float(grid[valid].mean()) if valid.any() else 0.0
+    return FrameSignature(bits_to_hex(HASHERS[config.method](hash_input)), grid, valid, size)
+
+def cached_signature(image_input, config: HashConfig = None) -> Optional[FrameSignature]:
+    """
+    Signature for a path / Frame / ndarray
+    Frames in the frame store keep their signature in Frame.metadata, so a "before" screenshot
+    compared against several "after" screenshots is reduced only once.
+    """
+    config = config or HashConfig()
+    frame = frame_store.get(image_input) if isinstance(image_input, str) else None
+    key = ('signature',) + config.cache_key()
+    if frame is not None and key in frame.metadata:
+        return frame.metadata[key]
+
+    img_bgr = frame.bgr if frame is not None else load_frame_bgr(image_input)
+    if img_bgr is None:
+        return None
+    signature = frame_signature(img_bgr, config)
+    if frame is not None:
+        frame.metadata[key] = signature
+    return signature
+
+def compare_signatures(before: FrameSignature, after: FrameSignature, config: HashConfig = None) -> ChangeCheck:
+    """Coarse-to-fine: different size -> hash distance -> thumbnail cells"""
+    config = config or HashConfig()
+    if before.size != after.size or before.grid.shape != after.grid.shape:
+        return ChangeCheck(True, hamming_distance(before.hash, after.hash), -1, "size")
+
+    distance = hamming_distance(before.hash, after.hash)
+    if distance > config.coarse_threshold:
+        return ChangeCheck(True, distance, -1, "coarse")
+
+    changed_cells = int(np.count_nonzero((np.abs(before.grid - after.grid) > config.pixel_tolerance)
+                                         & before.valid & after.valid))
+    return ChangeCheck(changed_cells > config.max_changed_cells, distance, changed_cells, "fine")
+
+def focus_changed(before, after, point: Tuple[int, int], config: HashConfig = None) -> bool:
+    """
+    Exact comparison around an interaction point (frame pixel coordinates)
+    True if any full-resolution pixel within focus_margin of `point`, outside ignore_regions,
+    moved more than pixel_tolerance gray levels. Frames of different size count as changed.
+    """
+    config = config or HashConfig()
+    before_bgr, after_bgr = load_frame_bgr(before), load_frame_bgr(after)
+    if before_bgr is None or after_bgr is None:
+        raise ValueError(f"Could not load {describe_image_input(before)} / {describe_image_input(after)}")
+    if before_bgr.shape[:2] != after_bgr.shape[:2]:
+        return True
+
+    height, width = before_bgr.shape[:2]
+    x, y = int(point[0]), int(point[1])
+    x1, x2 = max(0, x - config.focus_margin), min(width, x + config.focus_margin + 1)
+    y1, y2 = max(0, y - config.focus_margin), min(height, y + config.focus_margin + 1)
+    if x1 >= x2 or y1 >= y2:
+        return False  # Point outside the frame - nothing to compare
+
+    before_gray, after_gray = (frame_thumbnail(img[y1:y2, x1:x2], x2 - x1) for img in (before_bgr, after_bgr))
+    changed = np.abs(before_gray - after_gray) > config.pixel_tolerance
+    if config.ignore_regions:
+        changed &= valid_cells((width, height), (height, width), config.ignore_regions)[y1:y2, x1:x2]
+    return bool(changed.any())
+
+def frames_differ(before, after, config: HashConfig = None, focus: Optional[Tuple[int, int]] = None) -> bool:
+    """
+    True if two frames (paths, Frames or arrays) show a different screen
+    With a focus point (where the click / hover happened) a "no change" from the signatures is
+    confirmed pixel-exactly around that point, so small toggles there still count.
+    """
+    config = config or HashConfig()
+    before_signature = cached_signature(before, config)
+    after_signature = cached_signature(after, config)
+    if before_signature is None or after_signature is None:
+        raise ValueError(f"Could not load {describe_image_input(before)} / {describe_image_input(after)}")
+    if compare_signatures(before_signature, after_signature, config).changed:
+        return True
+    return focus is not None and focus_changed(before, after, focus, config)
+
+def test_perceptual_hash() -> bool:
+    """Caret blink and masked clock = same screen; a small menu = changed; decisions well under 1 ms"""
+    screen = np.full((1800, 2880, 3), 235, dtype=np.uint8)
+    for row in range(40):
+        screen[200 + 36 * row:216 + 36 * row, 300:300 + 40 * (row % 9 + 5)] = 40  # Text lines
+
+    caret = screen.copy()
+    caret[640:660, 900:902] = 0
+    clock = screen.copy()
+    clock[-40:-10, -200:-40] = 0
+    menu = screen.copy()
+    menu[300:700, 1200:1500] = 250
+    menu[320:340, 1220:1420] = 30
+
+    config = HashConfig(ignore_regions=[(-220, -60, -20, -1)])
+    signatures = {name: frame_signature(frame, config)
+                  for name, frame in (('screen', screen), ('caret', caret), ('clock', clock), ('menu', menu))}
+
+    for method in HASHERS:
+        method_config = HashConfig(method=method, ignore_regions=config.ignore_regions)
+        base = frame_signature(screen, method_config)
+        assert not compare_signatures(base, frame_signature(caret, method_config), method_config).changed, method
+        assert not compare_signatures(base, frame_signature(clock, method_config), method_config).changed, method
+        assert compare_signatures(base, frame_signature(menu, method_config), method_config).changed, method
+
+    # Without the mask the clock counts as a change
+    unmasked = HashConfig()
+    assert compare_signatures(frame_signature(screen, unmasked), frame_signature(clock, unmasked), unmasked).changed
+
+    # A 10x10 checkbox tick is below thumbnail resolution at any window width, but the exact focus
+    # check at the click point catches it; a caret blinking elsewhere stays "no change"
+    for width, height in ((1280, 800), (1920, 1080), (2880, 1800)):
+        unticked = np.full((height, width, 3), 235, dtype=np.uint8)
+        unticked[400:414, 600:614] = 120                        # Checkbox border
+        unticked[401:413, 601:613] = 255
+        ticked = unticked.copy()
+        for step in range(10):                                  # 2 px tick stroke
+            ticked[402 + step:404 + step, 602 + step // 2:604 + step // 2] = 30
+        blinked = unticked.copy()
+        blinked[640:660, 900:902] = 0
+
+        assert not frames_differ(unticked, ticked, unmasked), width  # Signatures alone miss it
+        assert frames_differ(unticked, ticked, unmasked, focus=(607, 407)), width
+        assert not frames_differ(unticked, blinked, unmasked, focus=(607, 407)), width
+        assert frames_differ(unticked, blinked, unmasked, focus=(901, 650)), width
+        assert frame_signature(ticked, unmasked).grid.shape[1] == unmasked.fine_width
+
+    # Ignored regions stay ignored by the focus check
+    assert not focus_changed(screen, clock, (screen.shape[1] - 100, screen.shape[0] - 25), config)
+
+    runs = 1000
+    start = time.perf_counter()
+    for _ in range(runs):
+        compare_signatures(signatures['screen'], signatures['caret'], config)
+    compare_time = (time.perf_counter() - start) / runs
+    assert compare_time < 0.001, compare_time
+
+    start = time.perf_counter()
+    for _ in range(20):
+        frame_signature(caret, config)
+    signature_time = (time.perf_counter() - start) / 20
+
+    print(f"✅ Perceptual hash ({', '.join(HASHERS)}): caret/clock ignored, menu detected, 10 px toggle caught "
+          f"by the focus check; "
+          f"no-change decision {compare_time * 1e6:.0f}µs, signature of a {screen.shape[1]}x{screen.shape[0]} "
+          f"frame {signature_time * 1000:.2f}ms (once per frame)")
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Perceptual frame hashing")
+    parser.add_argument("--test", action="store_true", help="Run the perceptual hash self-test")
+    parser.add_argument("--compare", nargs=2, metavar="IMAGE", help="Compare two screenshots")
+    parser.add_argument("--method", default="dhash", help=f"Hash method ({', '.join(HASHERS)})")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_perceptual_hash() else 1)
+    elif args.compare:
+        config = HashConfig(method=args.method)
+        before, after = (cached_signature(path, config) for path in args.compare)
+        check = compare_signatures(before, after, config)
+        print(f"{'CHANGED' if check.changed else 'SAME'} (stage={check.stage}, distance={check.distance}, "
+              f"changed cells={check.changed_cells})")
+    else:
+        print("Usage: python -m seraphine_pipeline.perceptual_hash --test | --compare BEFORE AFTER")
@@ -0,0 +1,342 @@
+"""
+Pipelined multi-screenshot service
+A long-lived asyncio loop on a background thread runs every pipeline stage as a pool of
+workers connected by bounded queues, so image N+1 is detected while image N is still
+waiting on Gemini. Full queues block submit() (backpressure) instead of growing a backlog.
+"""
+import time
+import asyncio
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, InvalidStateError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Dict, Any, Iterable
+
+from .helpers import debug_print
+from .tracing import Span, new_trace, use_span, span
+
+@dataclass
+class PipelineStage:
+    """
+    One pipeline step
+    func receives the previous stage's output (the submitted item for the first stage).
+    Plain functions run on the stage's own thread pool, coroutine functions on the service loop.
+    Returning None ends the job early with a None result.
+    """
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+
+@dataclass(eq=False)
+class PipelineJob:
+    """One submitted item travelling through the stages"""
+    item: Any
+    future: Future
+    value: Any = None
+    trace: Optional[Span] = None
+    submitted_at: float = field(default_factory=time.perf_counter)
+
+_STOP = object()
+
+class PipelineService:
+    """
+    Stage-overlapping pipeline for a stream of items
+
+    Args:
+        stages: Ordered stages; each has `workers` concurrent workers
+        queue_size: Capacity of the queue in front of every stage
+        trace_name: Root span name per job (None disables tracing)
+        on_trace_finish: Called with the finished root span of every job
+    """
+
+    def __init__(self, stages: List[PipelineStage], queue_size: int = 2, trace_name: Optional[str] = None,
+                 on_trace_finish: Optional[Callable[[Span], None]] = None, name: str = "pipeline"):
+        if not stages:
+            raise ValueError("PipelineService needs at least one stage")
+
+        self.stages = list(stages)
+        self.queue_size = max(1, queue_size)
+        self.trace_name = trace_name
+        self.on_trace_finish = on_trace_finish
+        self.name = name
+        self.stats = {
+            'submitted': 0, 'completed': 0, 'failed': 0, 'max_in_flight': 0,
+            'stage_busy_seconds': {stage.name: 0.0 for stage in self.stages}
+        }
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._started = threading.Event()
+        self._closed = False
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._closed
+
+    def start(self) -> "PipelineService":
+        """Start the loop thread and stage workers (idempotent)"""
+        if self._thread is not None:
+            return self
+
+        self._closed = False
+        self._started.clear()
+        self._thread = threading.Thread(target=self._run_loop, name=f"{self.name}_loop", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        debug_print(f"🚚 {self.name} started: " + " → ".join(f"{s.name}x{s.workers}" for s in self.stages))
+        return self
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+
+        # One bounded queue in front of every stage
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._workers = []
+        for index, stage in enumerate(self.stages):
+            if not inspect.iscoroutinefunction(stage.func):
+                self._executors[stage.name] = ThreadPoolExecutor(max_workers=stage.workers,
+                                                                 thread_name_prefix=f"{self.name}_{stage.name}")
+            for _ in range(stage.workers):
+                self._workers.append(loop.create_task(self._stage_worker(index)))
+
+        self._started.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    async def _stage_worker(self, index: int):
+        stage = self.stages[index]
+        queue = self._queues[index]
+        is_last = index == len(self.stages) - 1
+
+        while True:
+            job = await queue.get()
+            try:
+                if job is _STOP:
+                    return
+                if job.future.done():
+                    continue  # Cancelled by the caller
+
+                stage_start = time.perf_counter()
+                try:
+                    job.value = await self._run_stage(stage, job)
+                except Exception as e:
+                    self._finish(job, error=e)
+                    continue
+                finally:
+                    with self._lock:
+                        self.stats['stage_busy_seconds'][stage.name] += time.perf_counter() - stage_start
+
+                if job.value is None or is_last:
+                    self._finish(job)
+                else:
+                    await self._queues[index + 1].put(job)  # Blocks while the next stage is saturated
+            finally:
+                queue.task_done()
+
+    async def _run_stage(self, stage: PipelineStage, job: PipelineJob):
+        if inspect.iscoroutinefunction(stage.func):
+            with use_span(job.trace), span(stage.name):
+                return await stage.func(job.value)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executors[stage.name], self._call_in_span, stage, job)
+
+    @staticmethod
+    def _call_in_span(stage: PipelineStage, job: PipelineJob):
+        with use_span(job.trace), span(stage.name):
+            return stage.func(job.value)
+
+    def _finish(self, job: PipelineJob, error: Optional[BaseException] = None):
+        if job.trace is not None:
+            job.trace.finish()
+            if error is not None:
+                job.trace.error = f"{type(error).__name__}: {error}"
+            if self.on_trace_finish:
+                try:
+                    self.on_trace_finish(job.trace)
+                except Exception as e:
+                    print(f"Trace reporting failed: {e}")
+
+        with self._lock:
+            self._pending.discard(job)
+            self.stats['failed' if error is not None else 'completed'] += 1
+
+        try:
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(job.value)
+        except InvalidStateError:
+            pass  # Cancelled by the caller in the meantime
+
+    def _enqueue(self, item: Any):
+        if not self.running:
+            raise RuntimeError(f"{self.name} is not running")
+        if threading.current_thread() is self._thread:
+            raise RuntimeError(f"submit() would deadlock the {self.name} loop - call it from another thread")
+
+        job = PipelineJob(item=item, value=item, future=Future())
+        if self.trace_name:
+            job.trace = new_trace(self.trace_name, item=str(item))
+
+        with self._lock:
+            self._pending.add(job)
+            self.stats['submitted'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], len(self._pending))
+
+        return job, asyncio.run_coroutine_threadsafe(self._queues[0].put(job), self._loop)
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> Future:
+        """
+        Queue one item and return a Future for its final stage output
+        Blocks while the first stage's queue is full; raises TimeoutError after `timeout` seconds.
+        """
+        job, put = self._enqueue(item)
+        try:
+            put.result(timeout)
+        except FutureTimeoutError:
+            put.cancel()
+            with self._lock:
+                self._pending.discard(job)
+            raise TimeoutError(f"{self.name} queue stayed full for {timeout}s")
+        return job.future
+
+    async def submit_async(self, item: Any) -> Any:
+        """Await the result from another event loop without blocking it"""
+        job, put = self._enqueue(item)
+        await asyncio.wrap_future(put)
+        return await asyncio.wrap_future(job.future)
+
+    def process_many(self, items: Iterable[Any], return_exceptions: bool = False) -> List[Any]:
+        """Stream items through the pipeline; results come back in submission order"""
+        futures = [self.submit(item) for item in items]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats, stage_busy_seconds=dict(self.stats['stage_busy_seconds']))
+            stats['in_flight'] = len(self._pending)
+        stats['queue_depths'] = {stage.name: queue.qsize() for stage, queue in zip(self.stages, self._queues)}
+        return stats
+
+    async def _shutdown(self, drain: bool):
+        if drain:
+            # Stage by stage: everything queued in front of a stage is handed on before its workers stop
+            for index, stage in enumerate(self.stages):
+                await self._queues[index].join()
+                for _ in range(stage.workers):
+                    await self._queues[index].put(_STOP)
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        else:
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+
+        with self._lock:
+            leftovers = list(self._pending)
+        for job in leftovers:
+            self._finish(job, error=RuntimeError(f"{self.name} stopped before the job finished"))
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = None):
+        """Stop accepting items, optionally finish the queued ones, then stop the loop thread"""
+        if self._thread is None:
+            return
+
+        self._closed = True
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(drain), self._loop).result(timeout)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            for executor in self._executors.values():
+                executor.shutdown(wait=drain, cancel_futures=not drain)
+            self._executors = {}
+            self._thread = None
+
+        debug_print(f"🚚 {self.name} stopped: {self.stats['completed']} completed, {self.stats['failed']} failed")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def test_pipeline_service() -> bool:
+    """Stages overlap, order and errors are preserved, and queues bound the work in flight"""
+    detect_time, gemini_time, export_time = 0.05, 0.15, 0.01
+    finished_traces = []
+
+    def detect(item):
+        time.sleep(detect_time)
+        if item == "broken":
+            raise ValueError("unreadable image")
+        return None if item == "empty" else {'item': item}
+
+    async def gemini(job):
+        await asyncio.sleep(gemini_time)
+        job['labels'] = f"labels:{job['item']}"
+        return job
+
+    def export(job):
+        time.sleep(export_time)
+        return job['labels']
+
+    stages = [PipelineStage("detection", detect), PipelineStage("gemini", gemini, workers=2),
+              PipelineStage("export", export)]
+    items = [f"S{i:03d}.png" for i in range(8)]
+
+    with PipelineService(stages, queue_size=1, trace_name="image", on_trace_finish=finished_traces.append,
+                         name="test_service") as service:
+        start = time.perf_counter()
+        results = service.process_many(items)
+        elapsed = time.perf_counter() - start
+
+        assert results == [f"labels:{item}" for item in items]
+        sequential = len(items) * (detect_time + gemini_time + export_time)
+        assert elapsed < 0.75 * sequential, f"no overlap: {elapsed:.2f}s vs {sequential:.2f}s sequential"
+
+        mixed = service.process_many(["ok.png", "broken", "empty"], return_exceptions=True)
+        assert mixed[0] == "labels:ok.png" and isinstance(mixed[1], ValueError) and mixed[2] is None
+        stats = service.snapshot_stats()
+
+    # One queued item per stage, one per worker, plus the submitter blocked on the first queue
+    bound = len(stages) * service.queue_size + sum(stage.workers for stage in stages) + 1
+    assert stats['max_in_flight'] <= bound, stats
+    assert stats['completed'] == len(items) + 2 and stats['failed'] == 1
+
+    assert len(finished_traces) == len(items) + 3
+    assert [child.name for child in finished_traces[0].walk()][1:] == ["detection", "gemini", "export"]
+
+    print(f"✅ {len(items)} items in {elapsed:.2f}s (sequential {sequential:.2f}s), "
+          f"max in flight {stats['max_in_flight']}/{bound}, busy {stats['stage_busy_seconds']}")
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pipelined multi-screenshot service")
+    parser.add_argument("--test", action="store_true", help="Run the pipeline service self-test")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_pipeline_service() else 1)
+    else:
+        print("Usage: python -m seraphine_pipeline.pipeline_service --test")
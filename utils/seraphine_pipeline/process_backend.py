@@ -0,0 +1,312 @@
+"""
+Process-pool detection backend
+Runs YOLO, OCR and merging in worker processes, so their Python-level pre/post-processing
+loops are not serialized by the GIL of the main process. Frames travel through
+multiprocessing.shared_memory (one copy in, zero copies in the worker); only the small
+detection lists are pickled back. Every worker keeps its own warm ONNX session pools.
+Workers are spawned, so scripts using this backend need an `if __name__ == "__main__":` guard.
+"""
+import os
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from dataclasses import replace
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .helpers import debug_print
+from .frame_store import load_frame_bgr, describe_image_input
+from .yolo_detector import YOLOConfig
+from .ocr_detector import OCRDetConfig
+
+# Per-worker-process state, created by _init_worker
+_worker_processor = None
+
+def _init_worker(yolo_config: YOLOConfig, ocr_config: OCRDetConfig, merger_iou_threshold: float):
+    """Build this worker's detectors and warm its own session pools"""
+    global _worker_processor
+    from .parallel_processor import ParallelProcessor
+
+    _worker_processor = ParallelProcessor(
+        yolo_config=yolo_config,
+        ocr_config=ocr_config,
+        merger_iou_threshold=merger_iou_threshold,
+        enable_timing=False,
+        create_visualizations=False,
+        save_intermediate_results=False
+    )
+    _worker_processor.warm_up()
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to the parent's block without taking ownership
+    Before 3.13 attaching registers the name again - harmless, because spawned workers share
+    the parent's resource tracker and the parent unregisters it on unlink.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def _ping() -> int:
+    return os.getpid()
+
+def _run_task(task: str, shm_name: str, shape: Tuple[int, ...], dtype: str) -> Any:
+    """
+    Worker entry point
+    task: "yolo" / "ocr" -> detection list, "full" -> ParallelProcessor results (detect + merge)
+    """
+    shm = _attach_shared_memory(shm_name)
+    try:
+        frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        frame.setflags(write=False)
+
+        task_start = time.time()
+        if task == "yolo":
+            result = _worker_processor.yolo_detector.detect(frame)
+        elif task == "ocr":
+            result = _worker_processor.ocr_detector.detect(frame)
+        elif task == "full":
+            result = _worker_processor.process_image(frame, "temp")
+            result['timing']['worker_pid'] = os.getpid()
+        else:
+            raise ValueError(f"Unknown detection task: {task}")
+
+        if isinstance(result, dict):
+            result['timing']['worker_time'] = time.time() - task_start
+        del frame  # The buffer can only be closed once no array views it
+        return result
+    finally:
+        shm.close()
+
+class SharedFrame:
+    """A BGR frame copied once into a named shared memory block; unlinked by release()"""
+
+    def __init__(self, img_bgr: np.ndarray):
+        img_bgr = np.ascontiguousarray(img_bgr)
+        self.shape = img_bgr.shape
+        self.dtype = img_bgr.dtype.str
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, img_bgr.nbytes))
+        np.ndarray(self.shape, dtype=img_bgr.dtype, buffer=self._shm.buf)[...] = img_bgr
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def task_args(self, task: str) -> Tuple[str, str, Tuple[int, ...], str]:
+        return task, self.name, self.shape, self.dtype
+
+    def retain(self, future: Future) -> Future:
+        """Keep the block alive until `future` finishes"""
+        with self._lock:
+            self._pending += 1
+        future.add_done_callback(lambda _: self._done())
+        return future
+
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
+            last = self._pending == 0
+        if last:
+            self.release()
+
+    def release_if_unused(self):
+        """Unlink now unless a submitted task still holds the block"""
+        with self._lock:
+            unused = self._pending == 0
+        if unused:
+            self.release()
+
+    def release(self):
+        if self._shm is None:
+            return
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = None
+
+class ProcessDetectionBackend:
+    """
+    Pool of detection worker processes
+
+    Args:
+        num_workers: Worker processes (0 = half the cores, at least 2 so YOLO and OCR overlap)
+        max_in_flight: Frames held in shared memory at once by process_batch (0 = 2 per worker)
+    """
+
+    def __init__(self, yolo_config: YOLOConfig = None, ocr_config: OCRDetConfig = None,
+                 merger_iou_threshold: float = 0.1, num_workers: int = 0, max_in_flight: int = 0):
+        cpu_count = os.cpu_count() or 1
+        self.num_workers = num_workers or max(2, cpu_count // 2)
+        self.max_in_flight = max_in_flight or 2 * self.num_workers
+
+        # Each worker runs YOLO and OCR one after the other - give each model the worker's core share
+        threads = max(1, cpu_count // self.num_workers)
+        yolo_config = replace(yolo_config or YOLOConfig(), enable_timing=False, enable_debug=False,
+                              intra_op_threads=(yolo_config.intra_op_threads if yolo_config else 0) or threads,
+                              pin_threads=False)
+        ocr_config = replace(ocr_config or OCRDetConfig(), enable_timing=False, enable_debug=False,
+                             intra_op_threads=(ocr_config.intra_op_threads if ocr_config else 0) or threads,
+                             pin_threads=False)
+
+        # spawn: ONNX Runtime thread pools must not be inherited through fork
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(yolo_config, ocr_config, merger_iou_threshold)
+        )
+        debug_print(f"🧵 Process detection backend: {self.num_workers} workers x {threads} threads")
+
+    def warm_up(self, wait: bool = True) -> List[Future]:
+        """Start every worker now (each warms its session pools in its initializer)"""
+        futures = [self._executor.submit(_ping) for _ in range(self.num_workers)]
+        if wait:
+            for future in futures:
+                future.result()
+        return futures
+
+    def _submit(self, frame: SharedFrame, task: str) -> Future:
+        try:
+            future = self._executor.submit(_run_task, *frame.task_args(task))
+        except Exception:
+            # Pool shut down or broken: nothing will ever release the block - unlink it here
+            frame.release_if_unused()
+            raise
+        return frame.retain(future)
+
+    def run_detector(self, task: str, image_input) -> Any:
+        """Run one task ("yolo", "ocr" or "full") for one image in a worker"""
+        frame = SharedFrame(self._load(image_input))
+        return self._submit(frame, task).result()
+
+    def detect_pair(self, image_input) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """YOLO and OCR for one image in two workers at once (merging stays with the caller)"""
+        frame = SharedFrame(self._load(image_input))
+        yolo_future = self._submit(frame, "yolo")
+        ocr_future = self._submit(frame, "ocr")
+        return yolo_future.result(), ocr_future.result()
+
+    def process_batch(self, images: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Detect + merge many images, one image per worker at a time
+        Returns ParallelProcessor.process_image results in input order.
+        """
+        futures: List[Future] = []
+        for index, image_input in enumerate(images):
+            # Bound shared memory use: wait for the oldest frame before copying another one in
+            if index >= self.max_in_flight:
+                futures[index - self.max_in_flight].result()
+            futures.append(self._submit(SharedFrame(self._load(image_input)), "full"))
+
+        results = [future.result() for future in futures]
+        for image_input, result in zip(images, results):
+            result['image_path'] = describe_image_input(image_input)
+        return results
+
+    @staticmethod
+    def _load(image_input) -> np.ndarray:
+        img_bgr = load_frame_bgr(image_input)
+        if img_bgr is None:
+            raise ValueError(f"Could not load image: {describe_image_input(image_input)}")
+        return img_bgr
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+_backends: Dict[str, ProcessDetectionBackend] = {}
+_backends_lock = threading.Lock()
+
+def get_process_backend(yolo_config: YOLOConfig = None, ocr_config: OCRDetConfig = None,
+                        merger_iou_threshold: float = 0.1, num_workers: int = 0) -> ProcessDetectionBackend:
+    """Process-wide backend per configuration - worker start-up and warm-up are paid once"""
+    key = repr((yolo_config, ocr_config, merger_iou_threshold, num_workers))
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend = ProcessDetectionBackend(yolo_config, ocr_config, merger_iou_threshold, num_workers)
+            _backends[key] = backend
+        return backend
+
+@atexit.register
+def shutdown_process_backends():
+    with _backends_lock:
+        for backend in _backends.values():
+            backend.shutdown(wait=False)
+        _backends.clear()
+
+def test_process_backend(image_paths: List[str], num_workers: int = 2) -> bool:
+    """Worker results must equal in-process detection; prints batch throughput for both backends"""
+    from .parallel_processor import ParallelProcessor
+
+    ocr_config = OCRDetConfig(enable_timing=False, max_side_len=1280)
+    yolo_config = YOLOConfig(enable_timing=False)
+    has_yolo = os.path.exists(yolo_config.model_path)
+
+    # A failed submit (pool shut down / broken) must not leak the frame's shared memory
+    closed = ProcessDetectionBackend(yolo_config, ocr_config, num_workers=1)
+    closed.shutdown()
+    frame = SharedFrame(np.zeros((8, 8, 3), dtype=np.uint8))
+    shm_name = frame.name
+    try:
+        closed._submit(frame, "ocr")
+        raise AssertionError("submit to a shut-down pool succeeded")
+    except RuntimeError:
+        pass
+    try:
+        shared_memory.SharedMemory(name=shm_name).close()
+        raise AssertionError(f"shared memory {shm_name} leaked after a failed submit")
+    except FileNotFoundError:
+        print("✅ Failed submit unlinks the frame's shared memory")
+
+    backend = ProcessDetectionBackend(yolo_config, ocr_config, num_workers=num_workers)
+    try:
+        local = ParallelProcessor(yolo_config, ocr_config, enable_timing=False,
+                                  create_visualizations=False, save_intermediate_results=False)
+        local.warm_up()
+
+        image = load_frame_bgr(image_paths[0])
+        assert backend.run_detector("ocr", image) == local.ocr_detector.detect(image)
+        print(f"✅ OCR in a worker process matches in-process OCR ({describe_image_input(image_paths[0])})")
+
+        if not has_yolo:
+            print(f"⚠️  {yolo_config.model_path} not found - skipping YOLO / batch checks")
+            return True
+
+        start = time.time()
+        local_results = [local.process_image(load_frame_bgr(path), "temp") for path in image_paths]
+        local_time = time.time() - start
+
+        start = time.time()
+        process_results = backend.process_batch(image_paths)
+        process_time = time.time() - start
+
+        for local_result, process_result in zip(local_results, process_results):
+            assert local_result['merged_detections'] == process_result['merged_detections']
+
+        print(f"✅ {len(image_paths)} images: threads {len(image_paths) / local_time:.2f} img/s, "
+              f"{num_workers} processes {len(image_paths) / process_time:.2f} img/s")
+        return True
+    finally:
+        backend.shutdown()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Process-pool detection backend")
+    parser.add_argument("--test", nargs="+", metavar="IMAGE", help="Compare against in-process detection on these images")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_process_backend(args.test, args.workers) else 1)
+    else:
+        print("Usage: python -m seraphine_pipeline.process_backend --test IMAGE [IMAGE ...] [--workers N]")
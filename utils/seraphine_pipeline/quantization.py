@@ -0,0 +1,209 @@
+"""
+INT8 model variants
+Builds ONNX Runtime INT8 versions of the YOLO and OCR detection models next to the FP32
+files (models/<name>.int8_dynamic.onnx, models/<name>.int8_static.onnx). Static
+quantization is calibrated on apps/*/screenshots with the detectors' own preprocessing,
+so the activation ranges match real screenshots. Select a variant with
+yolo_model_variant / ocr_model_variant in config.json once
+benchmarks/eval_quantization.py shows the merged detections still match FP32.
+"""
+import os
+import glob
+import time
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import onnxruntime as ort
+
+from .helpers import debug_print
+from .session_pool import MODEL_VARIANTS, model_variant_path
+from .yolo_detector import YOLOConfig, load_and_prepare_image_ultra_fast
+from .ocr_detector import OCRDetConfig, preprocess_det
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+CALIBRATION_PATTERN = str(PROJECT_ROOT / "apps" / "*" / "screenshots" / "*.png")
+
+# Model roles: default FP32 model and the longest image side the detector feeds it
+DEFAULT_MODELS = {
+    'yolo': YOLOConfig.model_path,
+    'ocr': OCRDetConfig.model_path,
+}
+DEFAULT_MAX_SIDE = {
+    'yolo': max(YOLOConfig.max_resolution),
+    'ocr': OCRDetConfig.max_side_len,
+}
+
+def calibration_images(pattern: str = CALIBRATION_PATTERN, limit: int = 32) -> List[str]:
+    """Screenshots sampled evenly across the sorted list, so the calibration set is fixed per checkout"""
+    images = sorted(glob.glob(pattern))
+    if limit and len(images) > limit:
+        images = [images[int(i * len(images) / limit)] for i in range(limit)]
+    return images
+
+def preprocess_for_role(role: str, image_path: str, max_side: Optional[int] = None) -> np.ndarray:
+    """The exact input tensor the detector would feed its model for this image"""
+    max_side = max_side or DEFAULT_MAX_SIDE[role]
+    if role == 'yolo':
+        return load_and_prepare_image_ultra_fast(image_path, (max_side, max_side), enable_timing=False)[0]
+    if role == 'ocr':
+        return preprocess_det(image_path, max_side, enable_timing=False)[0]
+    raise ValueError(f"Unknown model role: {role}")
+
+# Per-channel DequantizeLinear (axis attribute) needs opset 13
+MIN_QDQ_OPSET = 13
+
+def _upgrade_opset(model_path: str, output_path: str) -> str:
+    """Copy of the model converted to MIN_QDQ_OPSET if it is older (PP-OCRv3 ships as opset 11)"""
+    import onnx
+    from onnx import version_converter
+
+    model = onnx.load(model_path)
+    opset = next((entry.version for entry in model.opset_import if entry.domain in ("", "ai.onnx")), MIN_QDQ_OPSET)
+    if opset >= MIN_QDQ_OPSET:
+        return model_path
+    onnx.save(version_converter.convert_version(model, MIN_QDQ_OPSET), output_path)
+    debug_print(f"  {os.path.basename(model_path)}: opset {opset} -> {MIN_QDQ_OPSET} for quantization")
+    return output_path
+
+def _calibration_reader(model_path: str, role: str, images: List[str], max_side: Optional[int]):
+    """CalibrationDataReader over screenshots (tensors are produced one at a time)"""
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class ScreenshotCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+            self.input_name = session.get_inputs()[0].name
+            self._images = iter(images)
+
+        def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+            for image_path in self._images:
+                try:
+                    return {self.input_name: np.ascontiguousarray(preprocess_for_role(role, image_path, max_side))}
+                except Exception as e:
+                    debug_print(f"  ⚠️  Calibration image skipped ({image_path}): {e}")
+            return None
+
+    return ScreenshotCalibrationReader()
+
+def quantize_model(model_path: str, role: str, variant: str = "int8_static", images: Optional[List[str]] = None,
+                   output_path: Optional[str] = None, max_side: Optional[int] = None,
+                   per_channel: bool = True) -> str:
+    """
+    Build one INT8 variant of a detection model
+
+    Args:
+        model_path: FP32 ONNX model
+        role: "yolo" or "ocr" (selects the calibration preprocessing)
+        variant: "int8_dynamic" (weights only, no calibration) or "int8_static" (QDQ, calibrated)
+        images: Calibration screenshots (default: calibration_images())
+        output_path: Default model_variant_path(model_path, variant)
+        max_side: Longest calibration input side (default: the detector's own limit)
+        per_channel: Per-output-channel weight scales (static only)
+
+    Returns:
+        Path of the written model
+    """
+    from onnxruntime.quantization import (CalibrationMethod, QuantFormat, QuantType,
+                                          quantize_dynamic, quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if variant == "fp32" or variant not in MODEL_VARIANTS:
+        raise ValueError(f"Not a quantized variant: {variant}")
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model not found: {model_path}")
+    output_path = output_path or model_variant_path(model_path, variant)
+
+    start = time.time()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Shape inference + graph cleanup first - the quantizer needs tensor shapes
+        upgraded = _upgrade_opset(model_path, os.path.join(temp_dir, "upgraded.onnx"))
+        source = os.path.join(temp_dir, "preprocessed.onnx")
+        try:
+            quant_pre_process(upgraded, source, skip_symbolic_shape=True)
+        except Exception as e:
+            debug_print(f"  ⚠️  Quantization pre-processing skipped for {model_path}: {e}")
+            source = upgraded
+
+        if variant == "int8_dynamic":
+            # ConvInteger on the CPU provider needs uint8 weights
+            quantize_dynamic(source, output_path, weight_type=QuantType.QUInt8)
+        else:
+            images = images if images is not None else calibration_images()
+            if not images:
+                raise ValueError(f"No calibration images for {model_path} (pattern {CALIBRATION_PATTERN})")
+            quantize_static(source, output_path, _calibration_reader(source, role, images, max_side),
+                            quant_format=QuantFormat.QDQ, per_channel=per_channel,
+                            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                            calibrate_method=CalibrationMethod.MinMax)
+
+    size_fp32 = os.path.getsize(model_path) / (1024 * 1024)
+    size_int8 = os.path.getsize(output_path) / (1024 * 1024)
+    print(f"✅ {variant}: {output_path} ({size_fp32:.1f} MB -> {size_int8:.1f} MB) in {time.time() - start:.1f}s"
+          + (f", calibrated on {len(images)} screenshots" if variant == "int8_static" else ""))
+    return output_path
+
+def test_quantization(model_path: str = DEFAULT_MODELS['ocr']) -> bool:
+    """Both variants of the OCR model build, load and produce FP32-shaped score maps close to FP32"""
+    if not os.path.exists(model_path):
+        print(f"⚠️  {model_path} not found - skipping quantization test")
+        return True
+
+    images = calibration_images(limit=2)
+    if not images:
+        print("⚠️  No apps/*/screenshots - skipping quantization test")
+        return True
+
+    tensor = preprocess_for_role('ocr', images[0], max_side=320)
+    reference = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+    expected = reference.run(None, {reference.get_inputs()[0].name: tensor})[0]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for variant in ("int8_dynamic", "int8_static"):
+            output_path = quantize_model(model_path, 'ocr', variant, images=images, max_side=320,
+                                         output_path=os.path.join(temp_dir, f"ocr.{variant}.onnx"))
+            session = ort.InferenceSession(output_path, providers=["CPUExecutionProvider"])
+            actual = session.run(None, {session.get_inputs()[0].name: tensor})[0]
+            assert actual.shape == expected.shape, (variant, actual.shape, expected.shape)
+
+            # Text masks: the thresholded score maps must mostly agree
+            agreement = np.mean((actual > 0.3) == (expected > 0.3))
+            assert agreement > 0.95, f"{variant}: only {agreement:.3f} of the mask agrees with FP32"
+            print(f"✅ {variant}: score-map agreement with FP32 {agreement:.4f}")
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build INT8 variants of the YOLO and OCR detection models")
+    parser.add_argument("--role", choices=("yolo", "ocr", "all"), default="all", help="Model(s) to quantize")
+    parser.add_argument("--variant", choices=("int8_dynamic", "int8_static", "all"), default="int8_static",
+                        help="Quantization mode (default: int8_static)")
+    parser.add_argument("--yolo-model", default=DEFAULT_MODELS['yolo'], help="FP32 YOLO model")
+    parser.add_argument("--ocr-model", default=DEFAULT_MODELS['ocr'], help="FP32 OCR detection model")
+    parser.add_argument("--images", default=CALIBRATION_PATTERN, help="Calibration screenshot glob")
+    parser.add_argument("--limit", type=int, default=32, help="Calibration screenshots to sample (0 = all)")
+    parser.add_argument("--max-side", type=int, help="Longest calibration input side (default: detector setting)")
+    parser.add_argument("--no-per-channel", action="store_true", help="Per-tensor weight scales (static only)")
+    parser.add_argument("--test", action="store_true", help="Run the quantization self-test")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_quantization(args.ocr_model) else 1)
+
+    roles = ("yolo", "ocr") if args.role == "all" else (args.role,)
+    variants = ("int8_dynamic", "int8_static") if args.variant == "all" else (args.variant,)
+    models = {'yolo': args.yolo_model, 'ocr': args.ocr_model}
+    images = calibration_images(args.images, args.limit)
+
+    failed = False
+    for role in roles:
+        for variant in variants:
+            try:
+                quantize_model(models[role], role, variant, images=images, max_side=args.max_side,
+                               per_channel=not args.no_per_channel)
+            except Exception as e:
+                print(f"❌ {role} {variant}: {e}")
+                failed = True
+    exit(1 if failed else 0)
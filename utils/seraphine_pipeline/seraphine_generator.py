@@ -4,6 +4,7 @@ import glob
 from typing import List, Dict, Any
 from PIL import Image
 from .helpers import debug_print
+from .frame_store import open_frame_image
 
 class FinalGroupImageGenerator:
     """
@@ -19,7 +20,8 @@ class FinalGroupImageGenerator:
         os.makedirs(self.output_dir, exist_ok=True)
     
     def create_grouped_images(self, image_path: str, seraphine_analysis: Dict[str, Any], 
-                            filename_base: str, return_direct_images: bool = False) -> List[str] | Dict[str, Any]:
+                            filename_base: str, return_direct_images: bool = False,
+                            exclude_labels: set = None) -> List[str] | Dict[str, Any]:
         """
         Generate group images using the BBoxProcessor, filtering to only explore=True groups
         
@@ -28,6 +30,7 @@ class FinalGroupImageGenerator:
             seraphine_analysis: Result from FinalSeraphineProcessor.process_detections()
             filename_base: Base filename for outputs
             return_direct_images: If True, returns PIL images directly for Gemini
+            exclude_labels: Item labels ("H1_2") to leave out of the composites (already labelled)
             
         Returns:
             If return_direct_images=False: List of generated image file paths (original behavior)
@@ -76,7 +79,7 @@ class FinalGroupImageGenerator:
         
         # Load original image into processor
         try:
-            bbox_processor.original_image = Image.open(image_path)
+            bbox_processor.original_image = open_frame_image(image_path)
             if self.enable_debug:
                 debug_print(f"📷 Loaded original image: {bbox_processor.original_image.size}")
         except Exception as e:
@@ -89,7 +92,7 @@ class FinalGroupImageGenerator:
         try:
             if return_direct_images:
                 # Generate with direct image return
-                result = bbox_processor.generate_images(self.output_dir, return_images=True)
+                result = bbox_processor.generate_images(self.output_dir, return_images=True, exclude_labels=exclude_labels)
                 
                 # Create file path list for compatibility
                 generated_files = result['saved_paths']
@@ -111,7 +114,7 @@ class FinalGroupImageGenerator:
                 }
             else:
                 # Original behavior - just save files
-                bbox_processor.generate_images(self.output_dir)
+                bbox_processor.generate_images(self.output_dir, exclude_labels=exclude_labels)
                 if self.save_mapping:
                     bbox_processor.save_mapping(self.output_dir)
                 
@@ -13,6 +13,8 @@ import cv2
 import numpy as np
 from PIL import Image
 import argparse
+from .frame_store import load_frame_bgr
+from .gemini_analyzer import get_shared_scheduler
 
 # Gemini imports
 try:
@@ -46,9 +48,11 @@ def create_group_visualization(final_groups: Dict, original_image_path: str,
     """    
     # Load original image using cv2 (same as postprocessor)
     try:
-        image = cv2.imread(original_image_path)
+        image = load_frame_bgr(original_image_path)
         if image is None:
             raise ValueError(f"Could not load image: {original_image_path}")
+        # Frame store pixels are shared and read-only - draw on our own copy
+        image = image.copy()
         
         img_height, img_width = image.shape[:2]
         # print(f"[PREPROCESSOR] Loaded image: {img_width}x{img_height}")
@@ -255,10 +259,13 @@ async def analyze_supergroups_with_gemini(image_path: str) -> Optional[str]:
         else:
             print(f"[PREPROCESSOR DEBUG] Image size OK: {width}x{height}, no scaling needed")
         
-        # Call Gemini API
-        response = await client.aio.models.generate_content(
-            model="gemini-2.0-flash-exp",
-            contents=[prompt, image],
+        # Call Gemini API through the process-wide scheduler - same key, same RPM budget as icon analysis
+        response = await get_shared_scheduler().run(
+            lambda: client.aio.models.generate_content(
+                model="gemini-2.0-flash-exp",
+                contents=[prompt, image],
+            ),
+            label="supergroups"
         )
         
         # # Print raw results on console
@@ -649,12 +656,52 @@ def integrate_supergroup_analysis(seraphine_analysis: Dict, supergroup_analysis_
         return seraphine_analysis
 
 
+def test_group_visualization_on_frame_store() -> bool:
+    """Grouping a screenshot that only lives in the frame store draws on a copy, never the shared frame"""
+    import tempfile
+    from .frame_store import Frame, frame_store
+    from .seraphine_processor import FinalSeraphineProcessor
+
+    detections = []
+    for row in range(3):
+        for col in range(4):
+            x, y = 40 + col * 90, 30 + row * 60
+            detections.append({'bbox': [x, y, x + 70, y + 24], 'id': f"M{len(detections) + 1:03d}",
+                               'merged_id': f"M{len(detections) + 1:03d}", 'type': 'icon',
+                               'source': 'yolo', 'confidence': 1.0})
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        frame_path = os.path.join(temp_dir, "S001.png")
+        pixels = np.full((240, 420, 3), 255, dtype=np.uint8)
+        frame = frame_store.put(Frame(bgr=pixels.copy(), path=frame_path), archive=False)
+        assert not frame.bgr.flags.writeable
+
+        analysis = FinalSeraphineProcessor(enable_timing=False).process_detections(detections)
+        final_groups = analysis['bbox_processor'].final_groups
+        assert final_groups, "expected at least one group"
+
+        output_path = create_group_visualization(final_groups, frame_path, temp_dir, "frame_store")
+        assert output_path and os.path.exists(output_path), "visualization was not written"
+        assert np.array_equal(frame.bgr, pixels), "shared frame was modified"
+        assert not np.array_equal(cv2.imread(output_path), pixels), "nothing was drawn"
+        frame_store.discard(frame_path)
+
+    print(f"✅ Group visualization drew {len(final_groups)} group(s) on a frame store screenshot")
+    return True
+
+
 def main():
     """Command-line interface for testing"""
     parser = argparse.ArgumentParser(description='Seraphine Group Visualizer')
-    parser.add_argument('--app-name', required=True, help='App name (e.g., notepad)')
+    parser.add_argument('--app-name', help='App name (e.g., notepad)')
+    parser.add_argument('--test', action='store_true', help='Run the frame store grouping self-test')
     args = parser.parse_args()
     
+    if args.test:
+        exit(0 if test_group_visualization_on_frame_store() else 1)
+    if not args.app_name:
+        parser.error('--app-name is required unless --test is given')
+    
     app_name = args.app_name
     app_dir = Path("apps") / app_name
     fdom_path = app_dir / "fdom.json"
@@ -6,9 +6,11 @@ from PIL import Image, ImageDraw, ImageFont
 import os
 import random
 import math
+import bisect
 import time
 import tempfile
 from .helpers import debug_print
+from .frame_store import open_frame_image
 import numpy as np
 
 @dataclass
@@ -261,45 +263,133 @@ class BBoxProcessor:
                 gap = bbox2.y1 - bbox1.y2
                 return gap  # Positive distance = gap
 
+    def _build_alignment_index(self, sorted_boxes: List[BBox], direction: str) -> Dict[int, Tuple[List[float], List[int]]]:
+        """
+        Bucket index used by the grouping scans
+        Horizontal: rows keyed by center_y // Y_VARIANCE_TOLERANCE, ordered by x1
+        Vertical: columns keyed by center_x // HORIZONTAL_TOLERANCE_PX, ordered by y1
+        Each bucket holds (leading edges, positions in sorted_boxes); both are ascending
+        because sorted_boxes is already sorted by that leading edge.
+        """
+        index: Dict[int, Tuple[List[float], List[int]]] = {}
+        
+        for position, bbox in enumerate(sorted_boxes):
+            if direction == 'horizontal':
+                key = math.floor(bbox.center_y / max(self.Y_VARIANCE_TOLERANCE, 1))
+                edge = bbox.x1
+            else:
+                key = math.floor(bbox.center_x / max(self.HORIZONTAL_TOLERANCE_PX, 1))
+                edge = bbox.y1
+            
+            edges, positions = index.setdefault(key, ([], []))
+            edges.append(edge)
+            positions.append(position)
+        
+        return index
+    
+    def _alignment_distance(self, current_bbox: BBox, next_bbox: BBox, direction: str) -> Optional[float]:
+        """Grouping acceptance test - returns the overlap-aware distance if next_bbox joins the group, else None"""
+        if direction == 'horizontal':
+            # Check if next box is horizontally aligned
+            if abs(next_bbox.center_y - current_bbox.center_y) > self.Y_VARIANCE_TOLERANCE:
+                return None
+            max_overlap = min(current_bbox.width, next_bbox.width) * 0.3  # 30% overlap allowed
+            max_gap = min(self.HORIZONTAL_TOLERANCE_PX, current_bbox.width)
+        else:
+            # Check if next box is vertically aligned
+            if abs(next_bbox.center_x - current_bbox.center_x) > self.HORIZONTAL_TOLERANCE_PX:
+                return None
+            max_overlap = min(current_bbox.height, next_bbox.height) * 0.3  # 30% overlap allowed
+            max_gap = self.HORIZONTAL_TOLERANCE_PX
+        
+        # FIXED: Use overlap-aware distance
+        distance = self.calculate_overlap_aware_distance(current_bbox, next_bbox, direction)
+        
+        if -max_overlap <= distance <= max_gap:  # Allows overlaps AND gaps
+            return distance
+        return None
+    
+    def _find_next_aligned(self, sorted_boxes: List[BBox], index: Dict[int, Tuple[List[float], List[int]]],
+                           current_bbox: BBox, after_position: int, used_boxes: set,
+                           direction: str) -> Optional[Tuple[int, float]]:
+        """
+        First box after after_position (in sorted_boxes order) that joins current_bbox's group
+        Same answer as rescanning the whole sorted list, but only the 3 neighbouring buckets
+        and the leading-edge window that can possibly pass _alignment_distance are visited.
+        """
+        if direction == 'horizontal':
+            key = math.floor(current_bbox.center_y / max(self.Y_VARIANCE_TOLERANCE, 1))
+            trailing_edge, extent = current_bbox.x2, current_bbox.width
+        else:
+            key = math.floor(current_bbox.center_x / max(self.HORIZONTAL_TOLERANCE_PX, 1))
+            trailing_edge, extent = current_bbox.y2, current_bbox.height
+        
+        # distance = next leading edge - current trailing edge, bounded by
+        # -30% of the current box below and HORIZONTAL_TOLERANCE_PX above (1px slack for float rounding)
+        edge_min = trailing_edge - abs(extent) * 0.3 - 1
+        edge_max = trailing_edge + self.HORIZONTAL_TOLERANCE_PX + 1
+        
+        best = None
+        for bucket_key in (key - 1, key, key + 1):
+            bucket = index.get(bucket_key)
+            if bucket is None:
+                continue
+            edges, positions = bucket
+            
+            start = bisect.bisect_left(edges, edge_min)
+            end = bisect.bisect_right(edges, edge_max)
+            for k in range(start, end):
+                position = positions[k]
+                if position <= after_position:
+                    continue
+                if best is not None and position >= best[0]:
+                    break  # Positions are ascending - nothing earlier left in this bucket
+                
+                next_bbox = sorted_boxes[position]
+                if next_bbox.merged_id in used_boxes:
+                    continue
+                
+                distance = self._alignment_distance(current_bbox, next_bbox, direction)
+                if distance is not None:
+                    best = (position, distance)
+                    break
+        
+        return best
+    
     def horizontal_grouping(self):
-        """FIXED: Horizontal grouping with overlap support"""
+        """FIXED: Horizontal grouping with overlap support (bucket-indexed neighbour search)"""
         self.log("Step 6: Performing horizontal grouping (overlap-aware)")
         
         used_boxes = set()
         group_id = 0
+        index = self._build_alignment_index(self.sort_x_list, 'horizontal')
         
-        for bbox in self.sort_x_list:
+        for seed_position, bbox in enumerate(self.sort_x_list):
             if bbox.merged_id in used_boxes:
                 continue
             
             current_group = [bbox]
             used_boxes.add(bbox.merged_id)
             current_bbox = bbox
+            position = seed_position
             
-            # Find horizontal neighbors
-            for next_bbox in self.sort_x_list:
-                if next_bbox.merged_id in used_boxes:
-                    continue
+            # Find horizontal neighbors (everything before the seed is already used)
+            while True:
+                match = self._find_next_aligned(self.sort_x_list, index, current_bbox, position,
+                                                used_boxes, 'horizontal')
+                if match is None:
+                    break
                 
-                # Check if next box is horizontally aligned
-                y_diff = abs(next_bbox.center_y - current_bbox.center_y)
-                if y_diff <= self.Y_VARIANCE_TOLERANCE:
-                    # FIXED: Use overlap-aware distance
-                    distance = self.calculate_overlap_aware_distance(current_bbox, next_bbox, 'horizontal')
-                    
-                    # Allow small overlaps and reasonable gaps
-                    max_overlap = min(current_bbox.width, next_bbox.width) * 0.3  # 30% overlap allowed
-                    max_gap = min(self.HORIZONTAL_TOLERANCE_PX, current_bbox.width)
-                    
-                    if -max_overlap <= distance <= max_gap:  # Allows overlaps AND gaps
-                        current_group.append(next_bbox)
-                        used_boxes.add(next_bbox.merged_id)
-                        current_bbox = next_bbox
-                        
-                        if distance < 0:
-                            self.log(f"OVERLAP: Grouped overlapping boxes (overlap: {-distance:.1f}px)")
-                        else:
-                            self.log(f"GAP: Grouped boxes with gap (gap: {distance:.1f}px)")
+                position, distance = match
+                next_bbox = self.sort_x_list[position]
+                current_group.append(next_bbox)
+                used_boxes.add(next_bbox.merged_id)
+                current_bbox = next_bbox
+                
+                if distance < 0:
+                    self.log(f"OVERLAP: Grouped overlapping boxes (overlap: {-distance:.1f}px)")
+                else:
+                    self.log(f"GAP: Grouped boxes with gap (gap: {distance:.1f}px)")
             
             if len(current_group) > 0:
                 self.horizontal_groups[group_id] = current_group
@@ -307,44 +397,39 @@ class BBoxProcessor:
                 group_id += 1
     
     def vertical_grouping(self):
-        """FIXED: Vertical grouping with overlap support"""
+        """FIXED: Vertical grouping with overlap support (bucket-indexed neighbour search)"""
         self.log("Step 7: Performing vertical grouping (overlap-aware)")
         
         used_boxes = set()
         group_id = 0
+        index = self._build_alignment_index(self.sort_y_list, 'vertical')
         
-        for bbox in self.sort_y_list:
+        for seed_position, bbox in enumerate(self.sort_y_list):
             if bbox.merged_id in used_boxes:
                 continue
             
             current_group = [bbox]
             used_boxes.add(bbox.merged_id)
             current_bbox = bbox
+            position = seed_position
             
-            # Find vertical neighbors
-            for next_bbox in self.sort_y_list:
-                if next_bbox.merged_id in used_boxes:
-                    continue
+            # Find vertical neighbors (everything before the seed is already used)
+            while True:
+                match = self._find_next_aligned(self.sort_y_list, index, current_bbox, position,
+                                                used_boxes, 'vertical')
+                if match is None:
+                    break
                 
-                # Check if next box is vertically aligned
-                x_diff = abs(next_bbox.center_x - current_bbox.center_x)
-                if x_diff <= self.HORIZONTAL_TOLERANCE_PX:
-                    # FIXED: Use overlap-aware distance
-                    distance = self.calculate_overlap_aware_distance(current_bbox, next_bbox, 'vertical')
-                    
-                    # Allow small overlaps and reasonable gaps
-                    max_overlap = min(current_bbox.height, next_bbox.height) * 0.3  # 30% overlap allowed
-                    max_gap = self.HORIZONTAL_TOLERANCE_PX
-                    
-                    if -max_overlap <= distance <= max_gap:  # Allows overlaps AND gaps
-                        current_group.append(next_bbox)
-                        used_boxes.add(next_bbox.merged_id)
-                        current_bbox = next_bbox
-                        
-                        if distance < 0:
-                            self.log(f"OVERLAP: Grouped overlapping boxes (overlap: {-distance:.1f}px)")
-                        else:
-                            self.log(f"GAP: Grouped boxes with gap (gap: {distance:.1f}px)")
+                position, distance = match
+                next_bbox = self.sort_y_list[position]
+                current_group.append(next_bbox)
+                used_boxes.add(next_bbox.merged_id)
+                current_bbox = next_bbox
+                
+                if distance < 0:
+                    self.log(f"OVERLAP: Grouped overlapping boxes (overlap: {-distance:.1f}px)")
+                else:
+                    self.log(f"GAP: Grouped boxes with gap (gap: {distance:.1f}px)")
             
             if len(current_group) > 0:
                 self.vertical_groups[group_id] = current_group
@@ -792,7 +877,7 @@ class BBoxProcessor:
         
         # Load the original image
         try:
-            original_image = Image.open(original_image_path)
+            original_image = open_frame_image(original_image_path)
             self.log(f"Loaded original image: {original_image.size}")
         except Exception as e:
             self.log(f"Error loading original image: {e}", "error")
@@ -943,7 +1028,7 @@ class BBoxProcessor:
         # Load original image first if provided
         if original_image_path:
             try:
-                self.original_image = Image.open(original_image_path)
+                self.original_image = open_frame_image(original_image_path)
                 self.log(f"Loaded original image for cropping: {self.original_image.size}")
             except Exception as e:
                 self.log(f"Error loading original image: {e}", "error")
@@ -966,8 +1051,11 @@ class BBoxProcessor:
         
         self.log("BBox processing pipeline completed")
 
-    def generate_images(self, output_dir: str = "outputs", return_images: bool = False):
-        """Steps 10-11: Generate images with grouped bboxes - combining H and V groups"""
+    def generate_images(self, output_dir: str = "outputs", return_images: bool = False, exclude_labels: set = None):
+        """
+        Steps 10-11: Generate images with grouped bboxes - combining H and V groups
+        exclude_labels: item labels ("H1_2") to leave out, e.g. crops already labelled from cache
+        """
         self.log("Steps 10-11: Generating images with combined H and V groups")
         
         os.makedirs(output_dir, exist_ok=True)
@@ -976,7 +1064,7 @@ class BBoxProcessor:
         
         # Use unified function for both modes
         image_count, generated_images = self._generate_combined_group_images(
-            all_groups, "combined_groups", output_dir, 0
+            all_groups, "combined_groups", output_dir, 0, exclude_labels
         )
         
         if return_images:
@@ -991,7 +1079,8 @@ class BBoxProcessor:
             return None
 
     def _generate_combined_group_images(self, groups: Dict[str, List[BBox]], base_name: str, 
-                                   output_dir: str, start_image_count: int) -> Tuple[int, List[Tuple]]:
+                                   output_dir: str, start_image_count: int,
+                                   exclude_labels: set = None) -> Tuple[int, List[Tuple]]:
         """Generate images and return them directly along with saving - UNIFIED VERSION"""
         image_count = start_image_count
         current_y = self.PADDING + self.LABEL_TOP_PADDING
@@ -1028,18 +1117,26 @@ class BBoxProcessor:
             max_height = 0
             
             for i, bbox in enumerate(boxes):
+                # Labels keep their original index so excluded items don't renumber the rest
+                label = f"{group_id}_{i+1}"
+                if exclude_labels and label in exclude_labels:
+                    continue
+                
                 width, height = self.scale_bbox_for_display(bbox)
                 cropped_image = self.crop_bbox_from_image(bbox)
                 
                 if cropped_image.size != (width, height):
                     cropped_image = cropped_image.resize((width, height), Image.Resampling.LANCZOS)
                 
-                label = f"{group_id}_{i+1}"
                 label_width = self.calculate_label_width(label, font)
                 
                 scaled_boxes.append((bbox, width, height, label, cropped_image, label_width))
                 max_height = max(max_height, height)
             
+            if not scaled_boxes:
+                self.log(f"SKIP: Group {group_id} fully excluded")
+                continue
+            
             # Calculate group width with dynamic gaps
             group_width = 0
             for i, (_, width, _, _, _, label_width) in enumerate(scaled_boxes):
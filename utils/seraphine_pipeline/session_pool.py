@@ -0,0 +1,299 @@
+"""
+Warm ONNX Runtime session pools
+One pool per (model, settings): N InferenceSessions with explicit intra/inter-op thread
+counts, optional thread-to-core pinning and a dummy-tensor warm-up at creation.
+YOLO and OCR run side by side in ParallelProcessor, so by default each model gets its
+own share of the cores instead of both spawning one thread per core and fighting.
+"""
+import os
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
+import onnxruntime as ort
+
+from .helpers import debug_print
+
+# Share of the available cores per model role when thread counts are left at 0 (auto)
+MODEL_CORE_SHARES = {'yolo': 0.5, 'ocr': 0.5}
+
+# Model files per variant: models/x.onnx (fp32), models/x.int8_dynamic.onnx, ... (see quantization.py)
+MODEL_VARIANTS = ("fp32", "int8_dynamic", "int8_static")
+
+# Repository root - the self-test's default model is looked up here, not in the working directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TEST_MODEL = "models/ch_PP-OCRv3_det_infer.onnx"
+
+_ONNX_DTYPES = {
+    'tensor(float)': np.float32,
+    'tensor(float16)': np.float16,
+    'tensor(double)': np.float64,
+    'tensor(uint8)': np.uint8,
+    'tensor(int32)': np.int32,
+    'tensor(int64)': np.int64,
+}
+
+@dataclass(frozen=True)
+class SessionPoolConfig:
+    """Threading / pooling settings for one model (hashable - used as the pool registry key)"""
+    role: str = ""                 # Key into MODEL_CORE_SHARES for the automatic core split
+    intra_op_threads: int = 0      # 0 = number of cores in this role's share
+    inter_op_threads: int = 1      # >1 switches to parallel execution mode
+    num_sessions: int = 1          # Sessions that can run concurrently
+    pin_threads: bool = False      # Pin intra-op worker threads to this role's cores
+    warmup: bool = True            # Run a dummy tensor through every session at creation
+    warmup_size: int = 640         # Value used for dynamic spatial dims of the dummy tensor
+
+def available_cores() -> List[int]:
+    """Logical CPUs this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def plan_core_split(shares: Dict[str, float] = None, cores: List[int] = None) -> Dict[str, List[int]]:
+    """
+    Disjoint, contiguous core ranges per role, proportional to its share
+    Every role gets at least one core; on machines with fewer cores than roles they overlap.
+    """
+    shares = shares or MODEL_CORE_SHARES
+    cores = cores if cores is not None else available_cores()
+    total_share = sum(shares.values()) or 1.0
+
+    split = {}
+    start = 0
+    for index, (role, share) in enumerate(shares.items()):
+        if index == len(shares) - 1:
+            count = len(cores) - start
+        else:
+            count = int(round(len(cores) * share / total_share))
+        count = max(1, count)
+        if start + count > len(cores):
+            split[role] = cores[-count:] if count <= len(cores) else list(cores)
+        else:
+            split[role] = cores[start:start + count]
+        start = min(start + count, len(cores))
+    return split
+
+def model_variant_path(model_path: str, variant: str = "fp32") -> str:
+    """File of one model variant - models/x.onnx -> models/x.int8_static.onnx"""
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant: {variant} (expected one of {', '.join(MODEL_VARIANTS)})")
+    if variant == "fp32":
+        return model_path
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.{variant}{ext or '.onnx'}"
+
+_missing_variants = set()
+
+def resolve_model_variant(model_path: str, variant: str = "fp32") -> str:
+    """Model file to load - the FP32 model when the requested variant has not been built"""
+    path = model_variant_path(model_path, variant)
+    if path != model_path and not os.path.exists(path):
+        if path not in _missing_variants:
+            _missing_variants.add(path)
+            debug_print(f"  ⚠️  {path} not found - using {model_path} "
+                        f"(build it with: python -m seraphine_pipeline.quantization --variant {variant})")
+        return model_path
+    return path
+
+class SessionPool:
+    """
+    Fixed set of InferenceSessions for one model
+    acquire() hands out a free session and blocks while all of them are busy.
+    """
+
+    def __init__(self, model_path: str, config: SessionPoolConfig = SessionPoolConfig()):
+        self.model_path = model_path
+        self.config = config
+
+        self.cores = plan_core_split().get(config.role, available_cores()) if config.role else available_cores()
+        self.intra_op_threads = config.intra_op_threads or len(self.cores)
+        self.stats = {'runs': 0, 'waits': 0, 'wait_seconds': 0.0, 'load_seconds': 0.0, 'warmup_seconds': 0.0}
+        self._stats_lock = threading.Lock()
+
+        load_start = time.time()
+        self.sessions = [self._create_session(index) for index in range(max(1, config.num_sessions))]
+        self.stats['load_seconds'] = time.time() - load_start
+
+        self.input_name = self.sessions[0].get_inputs()[0].name
+        self._available = queue.Queue()
+        for session in self.sessions:
+            self._available.put(session)
+
+        debug_print(f"  ONNX pool {os.path.basename(model_path)}: {len(self.sessions)} session(s), "
+                    f"intra={self.intra_op_threads} inter={config.inter_op_threads}"
+                    f"{' pinned to ' + str(self.cores) if config.pin_threads else ''} "
+                    f"({self.stats['load_seconds']:.3f}s)")
+
+        if config.warmup:
+            self.warmup()
+
+    def _session_cores(self, index: int) -> List[int]:
+        """Cores for one session - sessions share the role's cores round-robin when there are enough"""
+        count = max(1, self.config.num_sessions)
+        if len(self.cores) >= count:
+            return self.cores[index::count]
+        return self.cores
+
+    def _session_options(self, index: int) -> ort.SessionOptions:
+        so = ort.SessionOptions()
+        so.log_severity_level = 3
+        so.enable_mem_pattern = True
+        so.enable_mem_reuse = True
+        so.enable_cpu_mem_arena = True
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        so.intra_op_num_threads = self.intra_op_threads
+        so.inter_op_num_threads = max(1, self.config.inter_op_threads)
+        so.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if self.config.inter_op_threads > 1
+                             else ort.ExecutionMode.ORT_SEQUENTIAL)
+
+        if self.config.pin_threads and self.intra_op_threads > 1:
+            # One entry per intra-op worker thread (the calling thread is the first one and is not pinned).
+            # ONNX Runtime numbers logical processors from 1.
+            session_cores = self._session_cores(index)
+            affinities = [str(session_cores[(worker + 1) % len(session_cores)] + 1)
+                          for worker in range(self.intra_op_threads - 1)]
+            so.add_session_config_entry("session.intra_op_thread_affinities", ";".join(affinities))
+
+        return so
+
+    def _create_session(self, index: int) -> ort.InferenceSession:
+        providers = [("CPUExecutionProvider", {
+            "enable_cpu_mem_arena": True,
+            "arena_extend_strategy": "kSameAsRequested",
+            "initial_chunk_size_bytes": 1024 * 1024 * 32,
+            "max_mem": 1024 * 1024 * 512
+        })]
+        return ort.InferenceSession(self.model_path, sess_options=self._session_options(index), providers=providers)
+
+    def _dummy_feeds(self) -> Dict[str, np.ndarray]:
+        feeds = {}
+        for model_input in self.sessions[0].get_inputs():
+            shape = []
+            for axis, dim in enumerate(model_input.shape):
+                if isinstance(dim, int) and dim > 0:
+                    shape.append(dim)
+                else:
+                    shape.append(1 if axis == 0 else self.config.warmup_size)  # Batch 1, spatial warmup_size
+            feeds[model_input.name] = np.zeros(shape, dtype=_ONNX_DTYPES.get(model_input.type, np.float32))
+        return feeds
+
+    def warmup(self) -> float:
+        """Run one dummy inference per session so the first real image pays no first-run costs"""
+        warmup_start = time.time()
+        try:
+            feeds = self._dummy_feeds()
+            for session in self.sessions:
+                session.run(None, feeds)
+        except Exception as e:
+            debug_print(f"  ⚠️  ONNX warm-up skipped for {os.path.basename(self.model_path)}: {e}")
+        self.stats['warmup_seconds'] = time.time() - warmup_start
+        debug_print(f"  ONNX warm-up {os.path.basename(self.model_path)}: {self.stats['warmup_seconds']:.3f}s")
+        return self.stats['warmup_seconds']
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """Borrow a free session for the duration of the block"""
+        try:
+            session = self._available.get_nowait()
+        except queue.Empty:
+            wait_start = time.time()
+            session = self._available.get(timeout=timeout)
+            with self._stats_lock:
+                self.stats['waits'] += 1
+                self.stats['wait_seconds'] += time.time() - wait_start
+
+        try:
+            yield session
+        finally:
+            with self._stats_lock:
+                self.stats['runs'] += 1
+            self._available.put(session)
+
+    def run(self, output_names, feeds: Dict[str, Any]):
+        """session.run on whichever session is free"""
+        with self.acquire() as session:
+            return session.run(output_names, feeds)
+
+_pools: Dict[Tuple[str, SessionPoolConfig], SessionPool] = {}
+_pool_locks: Dict[Tuple[str, SessionPoolConfig], threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+def get_session_pool(model_path: str, config: SessionPoolConfig = SessionPoolConfig()) -> SessionPool:
+    """Process-wide pool for (model, settings); created - and warmed - on first use"""
+    key = (os.path.abspath(model_path), config)
+    with _registry_lock:
+        pool = _pools.get(key)
+        if pool is not None:
+            return pool
+        key_lock = _pool_locks.setdefault(key, threading.Lock())
+
+    # Different models load in parallel; the same model is only loaded once
+    with key_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SessionPool(model_path, config)
+            with _registry_lock:
+                _pools[key] = pool
+    return pool
+
+def clear_session_pools() -> None:
+    """Drop every pool (sessions are released once no caller holds them)"""
+    with _registry_lock:
+        _pools.clear()
+        _pool_locks.clear()
+
+def test_session_pool(model_path: str = TEST_MODEL) -> bool:
+    """
+    Thread plan, concurrent acquire, pinned sessions and identical outputs across sessions
+    A relative model_path is tried in the working directory, then under the repo root;
+    a missing model fails the test instead of silently skipping the session checks.
+    """
+    split = plan_core_split({'yolo': 0.5, 'ocr': 0.5}, cores=list(range(8)))
+    assert split == {'yolo': [0, 1, 2, 3], 'ocr': [4, 5, 6, 7]}, split
+    assert plan_core_split({'yolo': 0.5, 'ocr': 0.5}, cores=[0]) == {'yolo': [0], 'ocr': [0]}
+    assert model_variant_path("models/det.onnx", "int8_static") == "models/det.int8_static.onnx"
+    assert resolve_model_variant("models/missing.onnx", "int8_dynamic") == "models/missing.onnx"
+
+    if not os.path.exists(model_path) and not os.path.isabs(model_path):
+        model_path = os.path.join(REPO_ROOT, model_path)
+    if not os.path.exists(model_path):
+        print(f"❌ {model_path} not found - session tests need the model (pass --model)")
+        return False
+
+    config = SessionPoolConfig(role="ocr", intra_op_threads=2, num_sessions=2, pin_threads=True, warmup_size=64)
+    pool = get_session_pool(model_path, config)
+    assert get_session_pool(model_path, config) is pool
+    assert len(pool.sessions) == 2 and pool.stats['warmup_seconds'] > 0
+
+    feeds = {pool.input_name: np.random.default_rng(0).random((1, 3, 96, 128), dtype=np.float32)}
+    with pool.acquire() as first, pool.acquire() as second:
+        assert first is not second
+        np.testing.assert_allclose(first.run(None, feeds)[0], second.run(None, feeds)[0], rtol=1e-5, atol=1e-5)
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        outputs = list(executor.map(lambda _: pool.run(None, feeds)[0], range(8)))
+    assert all(output.shape == (1, 1, 96, 128) for output in outputs)
+    clear_session_pools()
+
+    print(f"✅ Session pool: {len(pool.sessions)} sessions, stats {pool.stats}")
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Warm ONNX Runtime session pools")
+    parser.add_argument("--test", action="store_true", help="Run the session pool self-test")
+    parser.add_argument("--model", default=TEST_MODEL, help="Model used by the self-test (relative to the repo root if not found)")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_session_pool(args.model) else 1)
+    else:
+        print("Usage: python -m seraphine_pipeline.session_pool --test")
@@ -12,6 +12,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from gui_controller import SimpleWindowAPI
 from fdom.screenshot_manager import ScreenshotManager  
 from fdom.visual_differ import VisualDiffer
+from seraphine_pipeline.frame_store import frame_store
+from seraphine_pipeline.frame_stability import StabilityConfig, wait_for_screen_to_settle
 
 def handle_splash_screen_if_needed(seraphine_analysis: Dict, screenshot_path: str, fdom_path: str) -> Dict:
     """Handle splash screen and replace original screenshot"""
@@ -70,7 +72,7 @@ def handle_splash_screen_if_needed(seraphine_analysis: Dict, screenshot_path: st
                     
                     # ✅ TAKE NEW SCREENSHOT
                     print("📸 Taking new screenshot after splash screen dismissal...")
-                    time.sleep(2.0)  # Give UI time to settle
+                    wait_for_screen_to_settle(config=StabilityConfig(timeout=2.0))  # Give UI time to settle
                     new_screenshot_path = take_new_app_screenshot(screenshot_path)
                     
                     if new_screenshot_path:
@@ -80,6 +82,10 @@ def handle_splash_screen_if_needed(seraphine_analysis: Dict, screenshot_path: st
                         import shutil
                         import os
                         
+                        # Captured frames are archived in the background - make sure the PNGs exist
+                        frame_store.wait_archived(screenshot_path)
+                        frame_store.wait_archived(new_screenshot_path)
+                        
                         # Backup original (optional)
                         backup_path = screenshot_path.replace('.png', '_with_splash.png')
                         shutil.copy2(screenshot_path, backup_path)
@@ -87,6 +93,7 @@ def handle_splash_screen_if_needed(seraphine_analysis: Dict, screenshot_path: st
                         
                         # Replace original with clean screenshot
                         shutil.copy2(new_screenshot_path, screenshot_path)
+                        frame_store.discard(screenshot_path)  # Old in-memory pixels are stale now
                         print(f"🔄 Replaced {os.path.basename(screenshot_path)} with splash-free version")
                         
                         # Clean up temp file
@@ -154,7 +161,8 @@ def verify_screen_changed_simple(before_screenshot: str, click_x: int, click_y:
     """Simplified screen change verification using basic image comparison"""
     try:
         print("📸 Taking after screenshot for comparison...")
-        time.sleep(2.0)  # Give UI more time to respond
+        # Give UI time to respond: until the screen left the before screenshot and settled, at most 2s
+        wait_for_screen_to_settle(config=StabilityConfig(timeout=2.0), reference_path=before_screenshot)
         
         # Take after screenshot
         after_screenshot = take_simple_screenshot("splash_after")
@@ -292,7 +300,7 @@ def perform_enhanced_click(abs_x: int, abs_y: int, element_name: str) -> bool:
         click_input.mi.dwFlags = 0x8004  # MOUSEEVENTF_LEFTUP + MOUSEEVENTF_ABSOLUTE
         user32.SendInput(1, ctypes.byref(click_input), ctypes.sizeof(INPUT))
         
-        time.sleep(2.0)  # Wait for splash screen to respond
+        # No fixed wait for the splash screen - verify_screen_changed_simple waits until the screen settles
         return True
         
     except Exception as e:
@@ -0,0 +1,319 @@
+"""
+Lightweight pipeline tracing
+Nested spans timed with the monotonic clock, reported into by every pipeline stage.
+A finished trace can be printed as a compact span tree (deploy_mcp), exported as
+OTLP/JSON lines, or replayed into OpenTelemetry when the SDK is installed.
+Outside an active trace every span() call is a no-op.
+"""
+import os
+import json
+import time
+import inspect
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Optional, Dict, Any, List, Iterator, Callable
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("seraphine_current_span", default=None)
+
+@dataclass
+class Span:
+    """One timed stage; children may be appended from worker threads"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent: Optional["Span"] = None
+    start_ns: int = field(default_factory=time.perf_counter_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    children: List["Span"] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        # Anchor monotonic timestamps to wall-clock time once per trace (for export only)
+        root = self.root
+        if root is self:
+            self.wall_anchor_ns = time.time_ns() - self.start_ns
+
+    @property
+    def root(self) -> "Span":
+        span = self
+        while span.parent is not None:
+            span = span.parent
+        return span
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set(self, **attributes) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def add_child(self, child: "Span") -> None:
+        with self._lock:
+            self.children.append(child)
+
+    def finish(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.perf_counter_ns()
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in sorted(self.children, key=lambda span: span.start_ns):
+            yield from child.walk()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain nested dict (durations in ms) - safe for JSON"""
+        return {
+            'name': self.name,
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+            'children': [child.to_dict() for child in sorted(self.children, key=lambda span: span.start_ns)]
+        }
+
+def _new_id(num_bytes: int) -> str:
+    return os.urandom(num_bytes).hex()
+
+def current_span() -> Optional[Span]:
+    """Innermost active span of this task/thread, or None outside a trace"""
+    return _current_span.get()
+
+def new_trace(name: str, **attributes) -> Span:
+    """Root span that is not yet active - for work that hops between threads (see use_span)"""
+    return Span(name=name, trace_id=_new_id(16), span_id=_new_id(8), attributes=attributes)
+
+@contextmanager
+def use_span(active: Optional[Span]):
+    """Make an existing span current in this thread/task without closing it on exit"""
+    token = _current_span.set(active)
+    try:
+        yield active
+    finally:
+        _current_span.reset(token)
+
+@contextmanager
+def start_trace(name: str, on_finish: Optional[Callable[[Span], None]] = None, **attributes):
+    """
+    Root span of one trace (e.g. one processed image)
+    on_finish(root) runs once the trace is closed - also on early return or exception.
+    """
+    root = new_trace(name, **attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        root.finish()
+        _current_span.reset(token)
+        if on_finish:
+            try:
+                on_finish(root)
+            except Exception as e:
+                print(f"Trace reporting failed: {e}")
+
+@contextmanager
+def span(name: str, parent: Optional[Span] = None, **attributes):
+    """
+    Child span of the current span (or of `parent`, for work handed to other threads)
+    Yields None - and records nothing - when no trace is active.
+    """
+    parent = parent or _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name=name, trace_id=parent.trace_id, span_id=_new_id(8), parent=parent, attributes=attributes)
+    parent.add_child(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+def traced(name: str = None):
+    """Decorator form of span() for sync and async functions"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def format_span_tree(root: Span, compact: bool = True, min_ms: float = 0.0) -> str:
+    """
+    Render a finished trace
+
+    compact=True gives one line for logs:
+        seraphine 812.4ms [detection 431.0 (yolo 301.2, ocr 420.7), merge 0.3, grouping 4.1]
+    compact=False gives an indented tree with attributes.
+    """
+    if compact:
+        def render(span_node: Span) -> str:
+            children = [child for child in sorted(span_node.children, key=lambda s: s.start_ns) if child.duration_ms >= min_ms]
+            text = f"{span_node.name} {span_node.duration_ms:.1f}"
+            if span_node.error:
+                text += " !"
+            if children:
+                text += " (" + ", ".join(render(child) for child in children) + ")"
+            return text
+
+        children = [child for child in sorted(root.children, key=lambda s: s.start_ns) if child.duration_ms >= min_ms]
+        return f"{root.name} {root.duration_ms:.1f}ms [" + ", ".join(render(child) for child in children) + "]"
+
+    lines = []
+    def render_tree(span_node: Span, depth: int):
+        if depth and span_node.duration_ms < min_ms:
+            return
+        attributes = " ".join(f"{key}={value}" for key, value in span_node.attributes.items())
+        error = f" ERROR {span_node.error}" if span_node.error else ""
+        lines.append(f"{'  ' * depth}{span_node.name:<{max(1, 32 - 2 * depth)}} {span_node.duration_ms:10.2f} ms  {attributes}{error}".rstrip())
+        for child in sorted(span_node.children, key=lambda s: s.start_ns):
+            render_tree(child, depth + 1)
+    render_tree(root, 0)
+    return "\n".join(lines)
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def to_otlp_json(root: Span, service_name: str = "seraphine") -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest for one trace (accepted by OTel collectors)"""
+    anchor = root.wall_anchor_ns
+    spans = []
+    for span_node in root.walk():
+        spans.append({
+            'traceId': span_node.trace_id,
+            'spanId': span_node.span_id,
+            'parentSpanId': span_node.parent.span_id if span_node.parent else '',
+            'name': span_node.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(anchor + span_node.start_ns),
+            'endTimeUnixNano': str(anchor + (span_node.end_ns or span_node.start_ns)),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in span_node.attributes.items()],
+            'status': {'code': 2, 'message': span_node.error} if span_node.error else {'code': 1}
+        })
+
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'seraphine_pipeline.tracing'}, 'spans': spans}]
+        }]
+    }
+
+def export_trace(root: Span, config: Dict[str, Any]) -> None:
+    """
+    Export according to config.json:
+        tracing_export_path: append one OTLP/JSON line per trace
+        tracing_otel: replay into the OpenTelemetry SDK tracer (if installed and configured)
+    """
+    export_path = config.get("tracing_export_path")
+    if export_path:
+        try:
+            export_dir = os.path.dirname(export_path)
+            if export_dir:
+                os.makedirs(export_dir, exist_ok=True)
+            with open(export_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(to_otlp_json(root)) + "\n")
+        except OSError as e:
+            print(f"Trace export failed: {e}")
+
+    if config.get("tracing_otel", False):
+        _export_to_opentelemetry(root)
+
+def _export_to_opentelemetry(root: Span) -> None:
+    """Re-create the finished spans with their real timestamps through the OTel API"""
+    try:
+        from opentelemetry import trace as otel_trace
+    except ImportError:
+        return
+
+    tracer = otel_trace.get_tracer("seraphine_pipeline.tracing")
+    anchor = root.wall_anchor_ns
+
+    def replay(span_node: Span, parent_context):
+        otel_span = tracer.start_span(span_node.name, context=parent_context,
+                                      start_time=anchor + span_node.start_ns,
+                                      attributes={key: value if isinstance(value, (bool, int, float, str)) else str(value)
+                                                  for key, value in span_node.attributes.items()})
+        if span_node.error:
+            otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, span_node.error))
+        child_context = otel_trace.set_span_in_context(otel_span)
+        for child in sorted(span_node.children, key=lambda s: s.start_ns):
+            replay(child, child_context)
+        otel_span.end(end_time=anchor + (span_node.end_ns or span_node.start_ns))
+
+    replay(root, None)
+
+def test_tracing() -> bool:
+    """Nesting across threads, no-op outside traces, and OTLP export shape"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with span("outside") as outside:
+        assert outside is None
+
+    with start_trace("image", image="S001.png") as root:
+        with span("detection"):
+            parent = current_span()
+
+            def worker(name):
+                with span(name, parent=parent) as s:
+                    time.sleep(0.01)
+                    s.set(count=3)
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(worker, ["yolo", "ocr"]))
+        with span("merge"):
+            pass
+
+    names = [s.name for s in root.walk()]
+    assert names[:2] == ["image", "detection"] and set(names[2:4]) == {"yolo", "ocr"} and names[4] == "merge"
+    assert all(s.end_ns is not None and s.end_ns >= s.start_ns for s in root.walk())
+    assert root.children[0].duration_ms >= 10
+
+    otlp = to_otlp_json(root)
+    spans = otlp['resourceSpans'][0]['scopeSpans'][0]['spans']
+    assert len(spans) == 5 and len({s['traceId'] for s in spans}) == 1
+    assert all(int(s['endTimeUnixNano']) >= int(s['startTimeUnixNano']) for s in spans)
+
+    print("✅ " + format_span_tree(root))
+    print(format_span_tree(root, compact=False))
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seraphine pipeline tracing")
+    parser.add_argument("--test", action="store_true", help="Run the tracing self-test")
+    args = parser.parse_args()
+
+    if args.test:
+        exit(0 if test_tracing() else 1)
+    else:
+        print("Usage: python -m seraphine_pipeline.tracing --test")